@@ -0,0 +1,175 @@
+'''
+Benchmark every DataCleaning.clean_*_data pipeline on seeded synthetic tables of each source, recording the
+throughput and peak memory of each run in a results file, to compare them between commits.
+
+Each pipeline and table size is run in a fresh process, so the peak memory of a run is not affected by the
+previous ones. The results of each run are appended to the results file (one JSON object per line), with the
+commit they were measured on, and compared with the latest results of the previous commit.
+
+Usage:
+    python benchmarks/bench_cleaning.py
+    python benchmarks/bench_cleaning.py --rows 10000 1000000 --pipelines users products
+    python benchmarks/bench_cleaning.py --dtype-backend pyarrow
+    python benchmarks/bench_cleaning.py --pipelines users orders --cleaning-workers 8
+    python benchmarks/bench_cleaning.py --quarantine
+'''
+
+# Library imports
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Project class imports
+from data_cleaning import DataCleaning
+from metrics_utils import peak_rss_mb
+from quarantine_utils import QuarantineStore
+import synthetic_data
+
+
+# Synthetic data generator and cleaning method of each pipeline
+PIPELINES = {
+    'users': ('generate_users', 'clean_user_data'),
+    'cards': ('generate_cards', 'clean_card_data'),
+    'stores': ('generate_stores', 'called_clean_store_data'),
+    'products': ('generate_products', 'clean_products_data'),
+    'orders': ('generate_orders', 'clean_orders_data'),
+    'dates': ('generate_dates', 'clean_dates_data'),
+}
+
+RESULTS_FILEPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'cleaning.jsonl')
+
+
+def git_commit() -> str:
+    '''
+    Returns the short hash of the current commit, with a '-dirty' suffix if there are uncommitted changes.
+    '''
+    repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo_dir, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo_dir, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+    return f'{commit}-dirty' if dirty else commit
+
+
+def run_pipeline(pipeline: str, rows: int, seed: int, dtype_backend: str = None, cleaning_workers: int = 1,
+                 quarantine: bool = False) -> dict:
+    '''
+    Generate the synthetic table of the pipeline and clean it, returning the time, throughput and memory of the run.
+    If dtype_backend is given (e.g. 'pyarrow'), the table is converted to it first, as DataExtractor would load it.
+    With cleaning_workers > 1, the table is cleaned in row shards by DataCleaning.clean_parallel (the time includes
+    starting the worker processes). With quarantine=True, the rejected rows are written to a temporary quarantine
+    (the time includes writing them). Meant to be run in a fresh process.
+    '''
+    warnings.simplefilter('ignore')
+    generator_name, clean_method_name = PIPELINES[pipeline]
+
+    df = getattr(synthetic_data, generator_name)(rows, seed=seed)
+    if dtype_backend is not None:
+        df = df.convert_dtypes(dtype_backend=dtype_backend)
+    data_mb = df.memory_usage(deep=True).sum() / 1024 ** 2
+    quarantine_dir = tempfile.TemporaryDirectory() if quarantine else None
+    cleaner = DataCleaning(quarantine=QuarantineStore(quarantine_dir.name) if quarantine else None)
+
+    start = time.perf_counter()
+    df_cleaned = cleaner.clean_parallel(df, clean_method_name, cleaning_workers)
+    if quarantine:
+        cleaner.quarantine.close()
+    seconds = time.perf_counter() - start
+    cleaner.close_workers()
+    if quarantine:
+        quarantine_dir.cleanup()
+
+    return {
+        'pipeline': pipeline,
+        'dtype_backend': dtype_backend,
+        'cleaning_workers': cleaning_workers,
+        'quarantine': quarantine,
+        'rows': rows,
+        'rows_kept': len(df_cleaned),
+        'seconds': round(seconds, 4),
+        'rows_per_second': round(rows / seconds),
+        'data_mb': round(data_mb, 1),
+        'peak_rss_mb': peak_rss_mb() and round(peak_rss_mb(), 1),
+    }
+
+
+def load_results(filepath: str) -> list:
+    if not os.path.exists(filepath):
+        return []
+
+    with open(filepath, 'r') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def print_comparison(results: list, previous_results: list):
+    '''
+    Print the results of this run, next to the latest results of the same pipeline and size from another commit.
+    '''
+    print(f'\n{"pipeline":<10} {"rows":>10} {"kept":>10} {"seconds":>9} {"rows/s":>12} {"data MB":>9} {"peak MB":>9}   vs previous commit')
+    for result in results:
+        previous = [other for other in previous_results if other['commit'] != result['commit']
+                    and all(other.get(key) == result[key] for key in ('pipeline', 'dtype_backend', 'rows', 'seed'))
+                    and other.get('cleaning_workers', 1) == result['cleaning_workers']
+                    and other.get('quarantine', False) == result['quarantine']]
+        comparison = ''
+        if previous:
+            other = previous[-1]
+            comparison = f"{other['commit']}: {other['seconds'] / result['seconds']:.2f}x speed, {other['peak_rss_mb']} peak MB"
+
+        print(f"{result['pipeline']:<10} {result['rows']:>10} {result['rows_kept']:>10} {result['seconds']:>9.3f} "
+              f"{result['rows_per_second']:>12} {result['data_mb']:>9} {result['peak_rss_mb']:>9}   {comparison}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000], help='Table sizes to benchmark')
+    parser.add_argument('--pipelines', nargs='+', choices=list(PIPELINES), default=list(PIPELINES), help='Pipelines to benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic data generators')
+    parser.add_argument('--dtype-backend', choices=['numpy_nullable', 'pyarrow'], default=None,
+                        help='Dtype backend of the tables (default: NumPy object columns)')
+    parser.add_argument('--cleaning-workers', type=int, default=1,
+                        help='Number of processes cleaning each table in row shards (default: cleaned in the benchmark process)')
+    parser.add_argument('--quarantine', action='store_true',
+                        help='Write the rejected rows to a quarantine, to measure its cost')
+    parser.add_argument('--results', type=str, default=RESULTS_FILEPATH, help='File where the results are appended')
+    args = parser.parse_args()
+
+    previous_results = load_results(args.results)
+    run_info = {
+        'commit': git_commit(),
+        'run_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'seed': args.seed,
+    }
+
+    results = []
+    for pipeline in args.pipelines:
+        for rows in args.rows:
+            print(f'Running {pipeline} with {rows} rows...')
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = {**run_info, **executor.submit(run_pipeline, pipeline, rows, args.seed, args.dtype_backend,
+                                                              args.cleaning_workers, args.quarantine).result()}
+            results.append(result)
+
+            # Write each result as soon as it is measured, so an interrupted run keeps the previous ones
+            os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+            with open(args.results, 'a') as file:
+                file.write(json.dumps(result) + '\n')
+
+    print_comparison(results, previous_results)
+    print(f'\nResults appended to {args.results}')
@@ -0,0 +1,52 @@
+'''
+Benchmark DataExtractor.parse_pdf (pages extracted in parallel batches) against a single tabula call over all
+the pages, on a synthetic multi-page 'card_details.pdf'. Requires Java, as tabula does.
+
+Usage:
+    python benchmarks/bench_pdf_extraction.py --pages 280 --workers 8
+'''
+
+# Library imports
+from tabula.io import read_pdf
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Project class imports
+from data_extraction import DataExtractor
+from synthetic_data import generate_cards, write_table_pdf
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=280, help='Number of pages of the synthetic PDF')
+    parser.add_argument('--rows-per-page', type=int, default=60, help='Number of table rows on each page')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes')
+    args = parser.parse_args()
+
+    df_cards = generate_cards(args.pages * args.rows_per_page, dirt_fraction=0)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filepath = os.path.join(tmp_dir, 'card_details.pdf')
+        write_table_pdf(df_cards, filepath, args.rows_per_page, column_widths=[110, 70, 150, 100])
+
+        start = time.perf_counter()
+        tables_single = read_pdf(filepath, multiple_tables=True, pages='all', output_format='dataframe')
+        time_single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        df_parallel = DataExtractor.parse_pdf(filepath, max_workers=args.workers)
+        time_parallel = time.perf_counter() - start
+
+    # Every row of every page must be extracted once, with the header of the table
+    assert df_parallel.equals(df_cards), 'Extracted table differs from the generated one'
+
+    print(f'Pages: {args.pages}, rows: {len(df_cards)}, workers: {args.workers}')
+    print(f'read_pdf (single call): {time_single:.3f} s ({sum(len(table) for table in tables_single)} rows in {len(tables_single)} tables)')
+    print(f'parse_pdf (parallel):   {time_parallel:.3f} s ({time_single / time_parallel:.1f}x faster)')
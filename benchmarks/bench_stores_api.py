@@ -0,0 +1,118 @@
+'''
+Benchmark sequential against concurrent retrieval of the store details through a local stub
+of the stores API. The stub adds a fixed latency to every request to mimic the round-trip time
+to the real API.
+
+Usage:
+    python benchmarks/bench_stores_api.py --stores 200 --latency 0.05 --workers 1 8 32
+'''
+
+# Library imports
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Project class imports
+from data_extraction import DataExtractor
+
+
+def make_stub_handler(num_stores: int, latency: float):
+    '''
+    Returns a request handler class serving the 'number_stores' and 'store_details' endpoints.
+    '''
+    class StubStoresApiHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+
+            if self.path.endswith('/number_stores'):
+                body = {'statusCode': 200, 'number_stores': num_stores}
+            else:
+                store_id = int(self.path.rsplit('/', 1)[1])
+                body = {
+                    'index': store_id,
+                    'address': f'{store_id} High Street',
+                    'longitude': '-0.1276',
+                    'lat': None,
+                    'locality': 'London',
+                    'store_code': f'LO-{store_id:08d}',
+                    'staff_numbers': '12',
+                    'opening_date': '2010-01-01',
+                    'store_type': 'Local',
+                    'latitude': '51.5072',
+                    'country_code': 'GB',
+                    'continent': 'Europe',
+                }
+
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubStoresApiHandler
+
+
+def make_extractor(tmp_dir: str, base_url: str) -> DataExtractor:
+    '''
+    Create a DataExtractor pointing to the stub API, with dummy credential files.
+    '''
+    api_creds_filepath = os.path.join(tmp_dir, 'db_creds_aws_api.yaml')
+    sso_creds_filepath = os.path.join(tmp_dir, 'db_creds_aws_sso.yaml')
+
+    with open(api_creds_filepath, 'w') as file:
+        yaml.safe_dump({'X_API_KEY': 'stub'}, file)
+    with open(sso_creds_filepath, 'w') as file:
+        yaml.safe_dump({'AWS_ACCESS_KEY': 'stub', 'AWS_SECRET_ACCESS_KEY': 'stub'}, file)
+
+    return DataExtractor(sso_creds_filepath, api_creds_filepath, base_url)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stores', type=int, default=200, help='Number of stores served by the stub API')
+    parser.add_argument('--latency', type=float, default=0.05, help='Latency in seconds added to every request')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 32], help='Concurrency limits to benchmark')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_stub_handler(args.stores, args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}/prod'
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        reference = None
+        results = []
+        for max_workers in args.workers:
+            extractor = make_extractor(tmp_dir, base_url)
+
+            start = time.perf_counter()
+            df_stores = extractor.retrieve_stores_data(max_workers=max_workers)
+            elapsed = time.perf_counter() - start
+
+            # All concurrency levels must return the same DataFrame, in store_id order
+            if reference is None:
+                reference = df_stores
+            assert df_stores.equals(reference), 'Concurrent result differs from the sequential one'
+
+            results.append((max_workers, elapsed))
+
+    server.shutdown()
+
+    print(f'\n\n{"workers":>8} {"time (s)":>10} {"speedup":>8}')
+    for max_workers, elapsed in results:
+        print(f'{max_workers:>8} {elapsed:>10.3f} {results[0][1] / elapsed:>7.1f}x')
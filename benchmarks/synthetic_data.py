@@ -0,0 +1,230 @@
+'''
+Seeded generators of synthetic source tables, reproducing the shape and the dirt of the real sources
+(e.g. 'NULL' strings, malformed UUIDs, bad phone formats), so the cleaning pipelines can be
+benchmarked without any AWS credentials.
+'''
+
+# Library imports
+import numpy as np
+import pandas as pd
+
+
+FIRST_NAMES = np.array(['John', 'Jane', 'Émile', 'Zoë', 'Mary-Ann', 'Peter', 'Anna Lena', 'Oliver', 'Sophie', 'Ralf'], dtype=object)
+LAST_NAMES = np.array(['Smith', 'Müller', 'Jones', "O'Brien", 'Brown', 'Schmidt', 'Taylor', 'Fischer', 'Wilson', 'Evans'], dtype=object)
+COUNTRIES = np.array([('United Kingdom', 'GB'), ('Germany', 'DE'), ('United States', 'US')], dtype=object)
+PHONES = np.array(['+44(0)1632 960123', '01632 960 123', '(01632) 960123', '020 7946 0958', '+49 30 901820', '001-555-0123x88'], dtype=object)
+NULL_STRINGS = np.array(['NULL', 'None', 'N/A', 'nan'], dtype=object)
+STORE_LOCATIONS = np.array([('Cowes', 'CO', 'GB', 'Europe'), ('High Wycombe', 'HI', 'GB', 'Europe'), ('Frankfurt', 'FR', 'DE', 'Europe'),
+                            ('München', 'MUN', 'DE', 'Europe'), ('Chapletown', 'CH', 'US', 'America'), ('Boston', 'BO', 'US', 'America')], dtype=object)
+STORE_TYPES = np.array(['Local', 'Super Store', 'Mall Kiosk', 'Outlet'], dtype=object)
+PRODUCT_WEIGHTS = np.array(['1.6kg', '0.45kg', '590g', '77g .', '12 x 100g', '3 x 2g', '16oz', '1.5l', '400ml'], dtype=object)
+PRODUCT_CATEGORIES = np.array(['toys-and-games', 'sports-and-leisure', 'pets', 'homeware', 'health-and-beauty', 'food-and-drink'], dtype=object)
+TIME_PERIODS = np.array(['Morning', 'Midday', 'Evening', 'Late_Hours'], dtype=object)
+CARD_PROVIDERS = np.array(['VISA 16 digit', 'VISA 13 digit', 'Mastercard', 'American Express', 'Diners Club / Carte Blanche', 'JCB 16 digit'], dtype=object)
+
+
+def random_hex(rng: np.random.Generator, n: int, length: int) -> np.ndarray:
+    '''
+    Returns an array of n random lowercase hexadecimal strings of the given length.
+    '''
+    digits = rng.integers(0, 16, size=(n, length), dtype=np.uint8)
+    chars = np.frombuffer(b'0123456789abcdef', dtype='S1')[digits]
+    return chars.view(f'S{length}').ravel().astype(str).astype(object)
+
+
+def random_uuids(rng: np.random.Generator, n: int) -> np.ndarray:
+    '''
+    Returns an array of n random UUID strings.
+    '''
+    parts = [random_hex(rng, n, length) for length in (8, 4, 4, 4, 12)]
+    uuids = parts[0]
+    for part in parts[1:]:
+        uuids = uuids + '-' + part
+    return uuids
+
+
+def random_dates(rng: np.random.Generator, n: int, start: str, end: str) -> np.ndarray:
+    '''
+    Returns an array of n random 'YYYY-MM-DD' date strings between start and end.
+    '''
+    start_day = np.datetime64(start, 'D').astype(np.int64)
+    end_day = np.datetime64(end, 'D').astype(np.int64)
+    days = rng.integers(start_day, end_day, size=n).astype('datetime64[D]')
+    return np.datetime_as_string(days).astype(object)
+
+
+def add_dirt(rng: np.random.Generator, df: pd.DataFrame, dirt_fraction: float) -> pd.DataFrame:
+    '''
+    Replace a fraction of the rows with rows of random garbage or with NULL strings and NaN values,
+    as found in the legacy sources.
+    '''
+    n = len(df)
+
+    # Rows where every column holds the same random garbage string (e.g. 'VSM4IZ4EL3')
+    garbage_rows = rng.random(n) < dirt_fraction / 2
+    garbage = random_hex(rng, int(garbage_rows.sum()), 10)
+    for column in df.columns:
+        if df[column].dtype == object:
+            df.loc[garbage_rows, column] = garbage
+
+    # Rows where every value is a 'NULL' string or NaN
+    null_rows = rng.random(n) < dirt_fraction / 2
+    for column in df.columns:
+        if df[column].dtype == object:
+            df.loc[null_rows, column] = rng.choice(NULL_STRINGS, size=int(null_rows.sum()))
+
+    return df
+
+
+def generate_users(n: int, seed: int = 0, dirt_fraction: float = 0.02) -> pd.DataFrame:
+    '''
+    Returns a synthetic 'legacy_users' table with n rows.
+    '''
+    rng = np.random.default_rng(seed)
+    countries = COUNTRIES[rng.integers(0, len(COUNTRIES), size=n)]
+
+    df = pd.DataFrame({
+        'index': np.arange(n),
+        'first_name': rng.choice(FIRST_NAMES, size=n),
+        'last_name': rng.choice(LAST_NAMES, size=n),
+        'date_of_birth': random_dates(rng, n, '1940-01-01', '2006-01-01'),
+        'company': rng.choice(np.array(['Acme Ltd', 'Globex', 'Initech GmbH'], dtype=object), size=n),
+        'email_address': rng.choice(np.array(['a@example.com', 'b@example.org', 'c@example.de'], dtype=object), size=n),
+        'address': rng.choice(np.array(['1 High Street\nLondon', 'Hauptstr. 5\n10115 Berlin', '12 Main St\nBoston'], dtype=object), size=n),
+        'country': countries[:, 0],
+        'country_code': countries[:, 1],
+        'phone_number': rng.choice(PHONES, size=n),
+        'join_date': random_dates(rng, n, '2006-01-01', '2023-01-01'),
+        'user_uuid': random_uuids(rng, n),
+    })
+
+    # Typos found in the real source
+    df.loc[rng.random(n) < 0.001, 'country_code'] = 'GGB'
+
+    return add_dirt(rng, df, dirt_fraction)
+
+
+def generate_orders(n: int, seed: int = 0) -> pd.DataFrame:
+    '''
+    Returns a synthetic 'orders_table' with n rows, including the columns removed by clean_orders_data.
+    '''
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame({
+        'level_0': np.arange(n),
+        'index': np.arange(n),
+        'date_uuid': random_uuids(rng, n),
+        'first_name': np.full(n, None, dtype=object),
+        'last_name': np.full(n, None, dtype=object),
+        'user_uuid': random_uuids(rng, n),
+        'card_number': rng.integers(10 ** 11, 10 ** 16, size=n).astype(str).astype(object),
+        'store_code': 'BL-' + random_hex(rng, n, 8),
+        'product_code': 'A' + rng.integers(0, 10, size=n).astype(str).astype(object) + '-' + random_hex(rng, n, 7) + 'q',
+        '1': np.full(n, np.nan),
+        'product_quantity': rng.integers(1, 14, size=n),
+    })
+
+
+def malform(rng: np.random.Generator, values: np.ndarray, fraction: float, prefix: str = '', length: int = None) -> np.ndarray:
+    '''
+    Malform a fraction of the string values, adding a prefix (e.g. '??' before card numbers) or truncating them
+    (e.g. UUIDs with missing characters).
+    '''
+    values = values.copy()
+    rows = rng.random(len(values)) < fraction
+    values[rows] = [prefix + value[:length] for value in values[rows]]
+    return values
+
+
+def generate_cards(n: int, seed: int = 0, dirt_fraction: float = 0.02) -> pd.DataFrame:
+    '''
+    Returns a synthetic 'card_details' table with n rows, as strings (as they are read from the PDF).
+    '''
+    rng = np.random.default_rng(seed)
+    expiry_months = rng.integers(1, 13, size=n)
+    expiry_years = rng.integers(22, 32, size=n)
+    card_numbers = rng.integers(10 ** 11, 10 ** 16, size=n).astype(str).astype(object)
+
+    df = pd.DataFrame({
+        # Card numbers prefixed with question marks found in the real source
+        'card_number': malform(rng, card_numbers, dirt_fraction / 2, prefix='??'),
+        'expiry_date': np.char.add(np.char.add(np.char.zfill(expiry_months.astype(str), 2), '/'), expiry_years.astype(str)).astype(object),
+        'card_provider': rng.choice(CARD_PROVIDERS, size=n),
+        'date_payment_confirmed': random_dates(rng, n, '1990-01-01', '2023-01-01'),
+    })
+
+    return add_dirt(rng, df, dirt_fraction)
+
+
+def generate_stores(n: int, seed: int = 0, dirt_fraction: float = 0.02) -> pd.DataFrame:
+    '''
+    Returns a synthetic 'store_details' table with n rows, as returned by the stores API.
+    '''
+    rng = np.random.default_rng(seed)
+    locations = STORE_LOCATIONS[rng.integers(0, len(STORE_LOCATIONS), size=n)]
+
+    df = pd.DataFrame({
+        'index': np.arange(n),
+        'address': rng.choice(np.array(['Flat 72W\nSally isle\nEast Deantown', 'Heckerstr. 4/5\n50491 Säckingen', '5 Harbour Road'], dtype=object), size=n),
+        'longitude': rng.uniform(-180, 180, size=n).round(5).astype(str).astype(object),
+        'lat': np.full(n, None, dtype=object),
+        'locality': locations[:, 0],
+        'store_code': locations[:, 1] + '-' + np.char.upper(random_hex(rng, n, 8).astype(str)).astype(object),
+        'staff_numbers': rng.integers(5, 100, size=n).astype(str).astype(object),
+        'opening_date': random_dates(rng, n, '1990-01-01', '2023-01-01'),
+        'store_type': rng.choice(STORE_TYPES, size=n),
+        'latitude': rng.uniform(-90, 90, size=n).round(5).astype(str).astype(object),
+        'country_code': locations[:, 2],
+        'continent': locations[:, 3],
+    })
+
+    # Continent typos and staff numbers with letters found in the real source
+    typos = rng.random(n) < dirt_fraction
+    df.loc[typos, 'continent'] = 'ee' + df.loc[typos, 'continent']
+    df.loc[rng.random(n) < dirt_fraction / 2, 'staff_numbers'] = 'J78'
+
+    return add_dirt(rng, df, dirt_fraction)
+
+
+def generate_products(n: int, seed: int = 0, dirt_fraction: float = 0.02) -> pd.DataFrame:
+    '''
+    Returns a synthetic 'products' table with n rows, as read from the products CSV file.
+    '''
+    rng = np.random.default_rng(seed)
+
+    df = pd.DataFrame({
+        'Unnamed: 0': np.arange(n),
+        'product_name': rng.choice(np.array(['FurReal Dazzlin\' Dimples', 'Tiffany Tea Towel', 'Dog Bed 90cm', 'Organic Coffee 1kg'], dtype=object), size=n),
+        'product_price': np.char.add('£', rng.uniform(0.5, 500, size=n).round(2).astype(str)).astype(object),
+        # Mixed weight units and multipacks (e.g. '12 x 100g')
+        'weight': rng.choice(PRODUCT_WEIGHTS, size=n),
+        'category': rng.choice(PRODUCT_CATEGORIES, size=n),
+        'EAN': rng.integers(10 ** 12, 10 ** 13, size=n).astype(str).astype(object),
+        'date_added': random_dates(rng, n, '2000-01-01', '2023-01-01'),
+        'uuid': malform(rng, random_uuids(rng, n), dirt_fraction / 2, length=30),
+        'removed': rng.choice(np.array(['Still_avaliable', 'Removed'], dtype=object), size=n, p=[0.9, 0.1]),
+        'product_code': np.char.add(np.char.add(random_hex(rng, n, 2).astype(str), '-'), random_hex(rng, n, 7).astype(str)).astype(object),
+    })
+
+    return add_dirt(rng, df, dirt_fraction)
+
+
+def generate_dates(n: int, seed: int = 0, dirt_fraction: float = 0.02) -> pd.DataFrame:
+    '''
+    Returns a synthetic 'date_details' table with n rows, as read from the date details JSON file.
+    '''
+    rng = np.random.default_rng(seed)
+    seconds = rng.integers(0, 24 * 3600, size=n)
+    days = pd.Series(random_dates(rng, n, '1992-01-01', '2023-01-01'))
+    times = pd.to_datetime(seconds, unit='s')
+
+    df = pd.DataFrame({
+        'timestamp': times.strftime('%H:%M:%S').to_numpy(dtype=object),
+        'month': days.str[5:7].str.lstrip('0').to_numpy(),
+        'year': days.str[:4].to_numpy(),
+        'day': days.str[8:10].str.lstrip('0').to_numpy(),
+        'time_period': TIME_PERIODS[np.minimum(seconds // (6 * 3600), 3)],
+        'date_uuid': malform(rng, random_uuids(rng, n), dirt_fraction / 2, length=30),
+    })
+
+    return add_dirt(rng, df, dirt_fraction)
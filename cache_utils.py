@@ -0,0 +1,180 @@
+# Library imports
+from typing import Iterable, Optional
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+# Project class imports
+from metrics_utils import add_bytes_transferred
+
+
+class DownloadCache():
+    '''
+    Utility class to keep a persistent on-disk cache of downloaded source files, and of the DataFrames
+    parsed from them (stored as Parquet).
+
+    Each file is stored under a name derived from its URL and version (ETag, Last-Modified), so a new version of a source
+    never overwrites the previous one while it is being downloaded. The ETag and Last-Modified values are
+    kept to send conditional requests, and the least recently used entries are evicted when the cache
+    grows over its maximum size.
+
+    Parameters:
+    ----------
+    cache_dir: str
+        Directory where the cached files and the cache index are stored
+    max_size_bytes: int
+        Maximum total size of the cached files
+    '''
+    def __init__(self, cache_dir: str = 'download_cache', max_size_bytes: int = 2 * 1024 ** 3) -> None:
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.index_filepath = os.path.join(cache_dir, 'index.json')
+        self._lock = threading.RLock()
+        self.index = self.load_index()
+
+    # ------------- Index -------------
+    def load_index(self) -> dict:
+        '''
+        Load the cache index, mapping each URL to its cached version: {url: {etag, last_modified, filepath, ...}}.
+        '''
+        if not os.path.exists(self.index_filepath):
+            return {}
+
+        with open(self.index_filepath, 'r') as file:
+            return json.load(file)
+
+    def save_index(self):
+        '''
+        Write the cache index to disk. The file is replaced atomically, so a crash never leaves a partial index.
+        '''
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_filepath = f'{self.index_filepath}.tmp'
+        with open(tmp_filepath, 'w') as file:
+            json.dump(self.index, file)
+        os.replace(tmp_filepath, self.index_filepath)
+
+    def get_entry(self, url: str) -> Optional[dict]:
+        '''
+        Returns the cache entry of the URL (with its 'etag', 'last_modified' and 'filepath'), or None if the URL
+        is not cached or its file is missing.
+        '''
+        with self._lock:
+            entry = self.index.get(url)
+            if entry is None or not os.path.exists(entry['filepath']):
+                return None
+
+            entry['last_access'] = time.time()
+            self.save_index()
+            return dict(entry)
+
+    # ------------- Files -------------
+    def put_file(self, url: str, etag: str, last_modified: str, chunks: Iterable[bytes], suffix: str = '') -> dict:
+        '''
+        Store a new version of the file downloaded from the URL, given as an iterable of byte chunks, and
+        return its cache entry. The previous version and its parsed DataFrame are removed.
+        '''
+        key = hashlib.sha256(f'{url}\n{etag}\n{last_modified}'.encode()).hexdigest()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        filepath = os.path.join(self.cache_dir, f'{key}{suffix}')
+
+        # Download to a temporary file first, so an interrupted download is never used
+        tmp_filepath = f'{filepath}.part'
+        with open(tmp_filepath, 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk)
+                add_bytes_transferred(len(chunk))
+        os.replace(tmp_filepath, filepath)
+
+        with self._lock:
+            previous_entry = self.index.get(url)
+            if previous_entry is not None and previous_entry['filepath'] != filepath:
+                self.remove_files(previous_entry)
+
+            self.index[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'filepath': filepath,
+                'parsed_filepath': None,
+                'last_access': time.time(),
+            }
+            self.evict()
+            self.save_index()
+            return dict(self.index[url])
+
+    def read_dataframe(self, url: str) -> Optional[pd.DataFrame]:
+        '''
+        Returns the DataFrame parsed from the cached version of the URL, or None if it was not cached.
+        '''
+        with self._lock:
+            entry = self.index.get(url)
+            parsed_filepath = entry and entry['parsed_filepath']
+            if not parsed_filepath or not os.path.exists(parsed_filepath):
+                return None
+
+        return pd.read_parquet(parsed_filepath)
+
+    def write_dataframe(self, url: str, df: pd.DataFrame):
+        '''
+        Store the DataFrame parsed from the cached version of the URL as Parquet. DataFrames which cannot be
+        converted to Parquet (e.g. object columns mixing numbers and strings) are not cached.
+        '''
+        with self._lock:
+            entry = self.index.get(url)
+            if entry is None:
+                return
+            parsed_filepath = f'{entry["filepath"]}.parquet'
+
+        try:
+            df.to_parquet(parsed_filepath)
+        except (ImportError, TypeError, ValueError) as ex:
+            print(f'Parsed data from {url} could not be cached: {ex}')
+            return
+
+        with self._lock:
+            # A newer version may have been downloaded meanwhile
+            if self.index.get(url) is not entry:
+                os.remove(parsed_filepath)
+                return
+
+            entry['parsed_filepath'] = parsed_filepath
+            self.evict()
+            self.save_index()
+
+    # ------------- Eviction -------------
+    @staticmethod
+    def remove_files(entry: dict):
+        '''
+        Remove the cached file of an entry and its parsed DataFrame.
+        '''
+        for filepath in (entry['filepath'], entry.get('parsed_filepath')):
+            if filepath and os.path.exists(filepath):
+                os.remove(filepath)
+
+    @staticmethod
+    def entry_size(entry: dict) -> int:
+        '''
+        Returns the size on disk of an entry's cached file and parsed DataFrame.
+        '''
+        return sum(os.path.getsize(filepath) for filepath in (entry['filepath'], entry.get('parsed_filepath'))
+                   if filepath and os.path.exists(filepath))
+
+    def evict(self):
+        '''
+        Remove the least recently used entries until the cache is under its maximum size.
+        The most recently used entry is always kept.
+        '''
+        with self._lock:
+            entries = sorted(self.index.items(), key=lambda item: item[1]['last_access'])
+            total_size = sum(self.entry_size(entry) for _, entry in entries)
+
+            for url, entry in entries[:-1]:
+                if total_size <= self.max_size_bytes:
+                    break
+                total_size -= self.entry_size(entry)
+                self.remove_files(entry)
+                del self.index[url]
@@ -1,25 +1,422 @@
 # Library imports
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
-from typing import List
+from itertools import product
+from sqlalchemy import BigInteger, Boolean, Float, Integer, SmallInteger, String, Uuid
+from sqlalchemy.types import TypeEngine
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
 from unidecode import unidecode
 
+import multiprocessing
 import numpy as np
+import os
 import pandas as pd
+import pickle
+import pyarrow as pa
+import pyarrow.compute as pc
 import re
+import shutil
 import string
+import tempfile
+import threading
 import yaml
 
 # Project class imports
 from database_utils import DatabaseConnector
 from data_extraction import DataExtractor
+from quarantine_utils import QuarantineStore
+from staging_utils import arrow_to_frame, frame_to_arrow
+from table_schemas import TABLE_SCHEMAS
+
+
+# Values with accents or other non-ASCII characters, which are transliterated before being validated
+NON_ASCII_PATTERN = re.compile(r'[^\x00-\x7f]')
+
+# Product weights: an optional multiplier (e.g. '12 x 100g'), a number and a unit. Anything after the unit is ignored.
+WEIGHT_PATTERN = re.compile(r'^\s*(?:(?P<multiplier>[0-9]*\.?[0-9]+)\s*x\s*)?(?P<value>[0-9]*\.?[0-9]+)\s*(?P<unit>kg|g|ml|l|oz)')
+
+# Factor converting each weight unit to kg, in the order of the lookup array. Volumes use a 1:1 ratio
+# of ml to g as a rough estimate.
+WEIGHT_UNITS = ('kg', 'g', 'ml', 'l', 'oz')
+WEIGHT_UNIT_FACTORS = np.array([1.0, 0.001, 0.001, 1.0, 0.028349523125])
+
+# Product prices in pounds sterling (e.g. '£12.99')
+PRICE_PATTERN = re.compile(r'£\s*(?P<value>[0-9]*\.?[0-9]+)\s*$')
+
+# Weight classes of the products, for weights (in kg) under each bound, and over the last one
+WEIGHT_CLASSES = np.array(['Light', 'Mid_Sized', 'Heavy', 'Truck_Required'], dtype=object)
+WEIGHT_CLASS_BOUNDS = np.array([2, 40, 140])
+
+# Values of the 'removed' column of the products, as the still_available booleans
+PRODUCT_AVAILABILITY = {'Still_avaliable': True, 'Removed': False}
+
+# Database table of each cleaned table, whose column types (see table_schemas.py) the cleaned data is cast to
+TARGET_TABLES = {
+    'users': 'dim_users',
+    'cards': 'dim_card_details',
+    'stores': 'dim_store_details',
+    'products': 'dim_products',
+    'orders': 'orders_table',
+    'dates': 'dim_date_times',
+}
+
+# Pandas dtype of the integer column types. The nullable dtypes keep the NULL values.
+INTEGER_DTYPES = ((SmallInteger, 'Int16'), (BigInteger, 'Int64'), (Integer, 'Int32'))
+
+# Strings treated as NULL values, in any letter case. Every case variant is precomputed, so the
+# values can be checked with a single isin, without lowercasing the columns first.
+NULL_STRINGS = ('null', 'none', 'n/a', 'nan')
+NULL_STRINGS_ANY_CASE = frozenset(
+    ''.join(chars) for null_str in NULL_STRINGS for chars in product(*[{char.lower(), char.upper()} for char in null_str])
+)
+
+# Minimum number of rows of each shard cleaned by a worker process (see DataCleaning.clean_parallel).
+# Smaller tables are cleaned in the calling process, as transferring them would cost more than cleaning them.
+MIN_SHARD_ROWS = 20000
+
+# Directory where the shards are written for the worker processes: a memory-backed filesystem where available,
+# so the shards are transferred through shared memory rather than the disk
+SHARD_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+class RowFilter():
+    '''
+    Cleaning plan of a DataFrame. The cleaning rules add the rows they keep to a single boolean mask, and the
+    columns they convert, drop or rename, without copying the DataFrame: the cleaned DataFrame is only
+    materialized once, by apply().
+
+    The rows rejected by each rule are counted in rejection_counts. A row rejected by several rules is only
+    counted by the first one, so the counts add up to the number of rows removed. The rule rejecting each row
+    is recorded too, so the rejected rows can be quarantined with it (see rejected_rows).
+
+    Parameters:
+    ----------
+    df: pd.DataFrame
+        DataFrame to clean. It is never modified.
+    '''
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.df = df
+        self.keep = np.ones(len(df), dtype=bool)
+        self.rejection_counts: Dict[str, int] = {}
+
+        # Rule rejecting each row (its position in rejection_rules: (rule, reason)), -1 if the row is kept.
+        # Only allocated once a rule rejects a row.
+        self.rejected_by: np.ndarray = None
+        self.rejection_rules: List[Tuple[str, str]] = []
+
+        self._converted_columns: Dict[str, pd.Series] = {}
+        self._dropped_columns: List[str] = []
+        self._renamed_columns: Dict[str, str] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        '''
+        Names of the columns not dropped, before renaming.
+        '''
+        return [column for column in self.df.columns if column not in self._dropped_columns]
+
+    def column(self, column_name: str) -> pd.Series:
+        '''
+        Returns the values of the column for all the rows, with the conversions applied so far.
+        '''
+        if column_name in self._converted_columns:
+            return self._converted_columns[column_name]
+        return self.df[column_name]
+
+    def convert_column(self, column_name: str, values: pd.Series):
+        '''
+        Replace the values of the column, given for all the rows (e.g. the column converted to dates).
+        '''
+        self._converted_columns[column_name] = values
+
+    def drop_columns(self, *column_names):
+        self._dropped_columns.extend(column_names)
+
+    def rename_columns(self, columns: Dict[str, str]):
+        self._renamed_columns.update(columns)
+
+    def keep_rows(self, rule_name: str, mask: np.ndarray, reason: str = None):
+        '''
+        Only keep the rows where the mask is True, counting the rows it rejects that no previous rule rejected,
+        and recording the rule (and the reason, by default the rule name) rejecting them.
+        '''
+        rejected = self.keep & ~mask
+        num_rejected = int(np.count_nonzero(rejected))
+        self.rejection_counts[rule_name] = self.rejection_counts.get(rule_name, 0) + num_rejected
+
+        if num_rejected:
+            if self.rejected_by is None:
+                self.rejected_by = np.full(len(self.df), -1, dtype=np.int16)
+            self.rejected_by[rejected] = len(self.rejection_rules)
+            self.rejection_rules.append((rule_name, reason or rule_name))
+        self.keep &= mask
+
+    def rejected_rows(self) -> pd.DataFrame:
+        '''
+        Returns the rows rejected by the rules, as given (before any conversion), with the rule rejecting each row
+        and the reason in the '_rule' and '_reason' columns.
+        '''
+        if self.rejected_by is None:
+            rows = np.array([], dtype=np.intp)
+        else:
+            rows = np.flatnonzero(self.rejected_by >= 0)
+
+        rule_names = np.array([rule_name for rule_name, _ in self.rejection_rules] or [''], dtype=object)
+        reasons = np.array([reason for _, reason in self.rejection_rules] or [''], dtype=object)
+        rules = self.rejected_by[rows] if self.rejected_by is not None else rows
+
+        df = self.df.take(rows)
+        df['_rule'] = rule_names[rules]
+        df['_reason'] = reasons[rules]
+        return df
+
+    def apply(self) -> pd.DataFrame:
+        '''
+        Returns the cleaned DataFrame: the rows kept by every rule, with the columns converted, dropped and renamed.
+        '''
+        if self.keep.all():
+            df = self.df.copy(deep=False)
+            rows = slice(None)
+        else:
+            rows = np.flatnonzero(self.keep)
+            df = self.df.take(rows)
+
+        for column in self._dropped_columns:
+            del df[column]
+
+        for column, values in self._converted_columns.items():
+            if column not in self._dropped_columns:
+                df[column] = values.iloc[rows].array
+
+        if self._renamed_columns:
+            df.columns = [self._renamed_columns.get(column, column) for column in df.columns]
+
+        return df
+
+class ColumnRule():
+    '''
+    Vectorized checks of a column, compiled once from its rules in the 'validation_rules' section of
+    validation_utils.yaml (see the description of each rule there). The regular expressions are compiled and
+    the enum values are precomputed as sets, so applying the rule to a table costs O(rows).
+
+    Parameters:
+    ----------
+    column_name: str
+        Column checked by the rule
+    spec: dict
+        Rules of the column, e.g. {'regex': '[0-9]{8,19}', 'exclude_regex': '0+'}
+    validation_utils: dict
+        Content of validation_utils.yaml, with the lists the enum rules refer to
+    '''
+    RULE_NAMES = ('replace', 'date', 'numeric', 'regex', 'transliterate', 'exclude_regex', 'enum', 'case')
+    DATE_OPTIONS = ('format', 'yearfirst', 'not_future', 'not_before')
+    NUMERIC_OPTIONS = ('range',)
+
+    def __init__(self, column_name: str, spec: dict, validation_utils: dict) -> None:
+        self.column_name = column_name
+        self.check_spec(spec)
+        self.spec = spec
+
+        self.replace = spec.get('replace')
+        self.date = spec.get('date')
+        self.numeric = spec.get('numeric')
+        self.regex = re.compile(spec['regex']) if 'regex' in spec else None
+        self.transliterate = spec.get('transliterate', False)
+        self.exclude_regex = re.compile(spec['exclude_regex']) if 'exclude_regex' in spec else None
+        self.case = spec.get('case')
+        self.enum = self.compile_enum(spec['enum'], validation_utils) if 'enum' in spec else None
+
+    def check_spec(self, spec: dict):
+        '''
+        Raise a ValueError if the spec has unknown rules or options, so typos are caught when the rules are loaded.
+        '''
+        unknown = set(spec) - set(self.RULE_NAMES)
+        unknown |= set(spec.get('date') or {}) - set(self.DATE_OPTIONS)
+        unknown |= set(spec.get('numeric') or {}) - set(self.NUMERIC_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown validation rules for column '{self.column_name}': {sorted(unknown)}")
+
+        if spec.get('case') not in (None, 'lower', 'upper'):
+            raise ValueError(f"Invalid case for column '{self.column_name}': {spec['case']}")
+
+    def compile_enum(self, enum, validation_utils: dict) -> frozenset:
+        '''
+        Returns the set of valid values, from a list given in the spec or from a list (or the keys of a mapping)
+        of validation_utils.yaml, in the letter case of the rule.
+        '''
+        if isinstance(enum, str):
+            if enum not in validation_utils:
+                raise ValueError(f"Unknown enum '{enum}' for column '{self.column_name}'")
+            enum = validation_utils[enum]
+
+        return frozenset(self.apply_case(str(value)) for value in enum)
+
+    def describe(self) -> str:
+        '''
+        Returns the checks of the rule (e.g. 'regex, exclude_regex'), as the reason of the rows it rejects. The
+        patterns of the regex checks are in validation_utils.yaml.
+        '''
+        checks = [rule_name for rule_name in ('regex', 'exclude_regex') if rule_name in self.spec]
+        if self.enum is not None:
+            checks.append(f"enum {self.spec['enum']}" if isinstance(self.spec['enum'], str) else 'enum')
+        if self.date is not None:
+            checks.append(f"date {self.date.get('format') or 'parseable'}" + (', not in the future' if self.date.get('not_future') else ''))
+        if self.numeric is not None:
+            checks.append(f"numeric in {self.numeric['range']}" if 'range' in self.numeric else 'numeric')
+        return ', '.join(checks) or 'valid'
+
+    def apply_case(self, value: str) -> str:
+        if self.case == 'lower':
+            return value.lower()
+        if self.case == 'upper':
+            return value.upper()
+        return value
+
+    def apply(self, rows: RowFilter):
+        '''
+        Convert the column of the rows and only keep the rows passing every check.
+        '''
+        values = rows.column(self.column_name)
+        mask = np.ones(len(values), dtype=bool)
+
+        if self.replace:
+            values = values.replace(self.replace)
+            rows.convert_column(self.column_name, values)
+
+        if self.date is not None:
+            values = pd.to_datetime(values, errors='coerce', format=self.date.get('format'),
+                                    yearfirst=self.date.get('yearfirst', False)).dt.date
+            # Without any valid date (e.g. a chunk of invalid dates), the column is left as datetime64 NaT values,
+            # which cannot be compared with dates
+            if values.dtype != object:
+                values = values.astype(object)
+            rows.convert_column(self.column_name, values)
+
+            # Remove rows where the date is before the date in another column
+            not_before = self.date.get('not_before')
+            if not_before is not None:
+                rows.keep_rows(f'{self.column_name} before {not_before}',
+                               ~(values < rows.column(not_before)).to_numpy(dtype=bool),
+                               reason=f'{self.column_name} is before {not_before}')
+
+            # Remove rows where the date is after the current date
+            if self.date.get('not_future'):
+                mask &= ~(values > date.today()).to_numpy(dtype=bool)
+
+        if self.numeric is not None:
+            values = pd.to_numeric(values, errors='coerce')
+            rows.convert_column(self.column_name, values)
+
+            if 'range' in self.numeric:
+                min_value, max_value = self.numeric['range']
+                mask &= values.between(min_value, max_value).to_numpy(dtype=bool)
+
+        if self.regex is not None:
+            mask &= self.transliterated_match_mask(values, self.regex) if self.transliterate else self.match_mask(values, self.regex)
+
+        if self.exclude_regex is not None:
+            mask &= ~self.match_mask(values, self.exclude_regex)
+
+        if self.enum is not None:
+            if self.case == 'lower':
+                values = values.str.lower()
+            elif self.case == 'upper':
+                values = values.str.upper()
+            mask &= values.isin(self.enum).to_numpy(dtype=bool)
+
+        rows.keep_rows(self.column_name, mask, reason=f'{self.column_name} fails: {self.describe()}')
+
+    # ------------- Vectorized validation utils -------------    
+    @staticmethod
+    def is_arrow_string(series: pd.Series) -> bool:
+        '''
+        Check if the series holds strings backed by a pyarrow array (e.g. 'string[pyarrow]'), which can be
+        validated with the Arrow compute kernels.
+        '''
+        if isinstance(series.dtype, pd.ArrowDtype):
+            return pa.types.is_string(series.dtype.pyarrow_dtype) or pa.types.is_large_string(series.dtype.pyarrow_dtype)
+        return isinstance(series.dtype, pd.StringDtype) and series.dtype.storage == 'pyarrow'
+
+    @staticmethod
+    def arrow_regex_mask(series: pd.Series, pattern: re.Pattern, full_match: bool) -> np.ndarray:
+        '''
+        Returns a boolean mask of the values of an Arrow string series matching the compiled pattern, using the
+        Arrow regex kernel (RE2 syntax, which the patterns of the validation rules must be compatible with).
+        Nulls never match.
+        '''
+        regex = f'^(?:{pattern.pattern})$' if full_match else pattern.pattern
+        if pattern.flags & re.DOTALL:
+            regex = f'(?s){regex}'
+
+        matches = pc.match_substring_regex(pa.array(series.array), regex)
+        return matches.fill_null(False).to_numpy(zero_copy_only=False)
+
+    @staticmethod
+    def match_mask(series: pd.Series, pattern: re.Pattern) -> np.ndarray:
+        '''
+        Returns a boolean mask of the values in the series fully matching the compiled pattern.
+        Non-string values never match.
+        '''
+        if ColumnRule.is_arrow_string(series):
+            return ColumnRule.arrow_regex_mask(series, pattern, full_match=True)
+        return series.str.fullmatch(pattern, na=False).to_numpy(dtype=bool)
+
+    @staticmethod
+    def search_mask(series: pd.Series, pattern: re.Pattern) -> np.ndarray:
+        '''
+        Returns a boolean mask of the values in the series containing a match of the compiled pattern.
+        Non-string values never match.
+        '''
+        if ColumnRule.is_arrow_string(series):
+            return ColumnRule.arrow_regex_mask(series, pattern, full_match=False)
+        return series.str.contains(pattern, na=False).to_numpy(dtype=bool)
+
+    @staticmethod
+    def transliterated_match_mask(series: pd.Series, pattern: re.Pattern) -> np.ndarray:
+        '''
+        Returns a boolean mask of the values fully matching the compiled pattern once accents are removed
+        (e.g. names). Only the values with non-ASCII characters go through unidecode.
+        '''
+        mask = ColumnRule.match_mask(series, pattern)
+
+        non_ascii = ColumnRule.search_mask(series, NON_ASCII_PATTERN)
+        if non_ascii.any():
+            values_without_accents = series[non_ascii].map(unidecode)
+            mask[non_ascii] = ColumnRule.match_mask(values_without_accents, pattern)
+
+        return mask
 
 
 class DataCleaning():
     '''
     Utility class to clean data from specific data sources.
+
+    Each data cleanser (e.g. clean_user_data) builds a RowFilter of the DataFrame, applies its cleaning rules
+    to it (e.g. clean_nulls, and the validation rules of the table), and materializes the cleaned DataFrame once.
+    The rows rejected by each rule are added up in rejection_counts, by table.
+
+    The validation rules of each table are declared in the 'validation_rules' section of validation_utils.yaml,
+    and compiled once into ColumnRule checks.
+
+    All the cleaning rules are row-independent, so large tables can be cleaned in row shards by a pool of worker
+    processes (see clean_parallel).
+
+    If a QuarantineStore is given, the rows rejected by each rule are added to it, tagged with the rule and the
+    reason, instead of being dropped.
     '''
-    def __init__(self):
-        self.validation_utils = self.load_yaml('validation_utils.yaml')
+    def __init__(self, validation_filepath: str = 'validation_utils.yaml', quarantine: QuarantineStore = None):
+        self.validation_filepath = validation_filepath
+        self.quarantine = quarantine
+        self.validation_utils = self.load_yaml(validation_filepath)
+        self.validation_rules = self.compile_rules(self.validation_utils['validation_rules'])
+
+        # Rows rejected by each rule, by table: {table: {rule: rows}}. Tables may be cleaned by several threads.
+        self.rejection_counts: Dict[str, Dict[str, int]] = {}
+        self._rejection_counts_lock = threading.Lock()
+
+        # Pool of worker processes of clean_parallel, started on first use
+        self._executor: ProcessPoolExecutor = None
+        self._executor_lock = threading.Lock()
 
     # ------------- Init utils-------------    
     def load_yaml(self, filepath: str) -> object:
@@ -27,187 +424,303 @@ class DataCleaning():
             info = yaml.safe_load(file)
         return info
 
+    def compile_rules(self, rules_spec: dict) -> Dict[str, List[ColumnRule]]:
+        '''
+        Compile the validation rules of each table: {table: [ColumnRule, ...]}, in the order they are declared.
+        '''
+        validation_rules = {}
+        for table_name, columns_spec in rules_spec.items():
+            table_rules = []
+            for column_name, spec in (columns_spec or {}).items():
+                rule = ColumnRule(column_name, spec, self.validation_utils)
+
+                # Dates compared to another column need that column to be converted to dates first
+                not_before = (rule.date or {}).get('not_before')
+                if not_before is not None and not any(other.column_name == not_before and other.date is not None for other in table_rules):
+                    raise ValueError(f"'{column_name}' of '{table_name}' must be declared after the date column '{not_before}'")
+
+                table_rules.append(rule)
+            validation_rules[table_name] = table_rules
+
+        return validation_rules
+
     # ------------- Main data cleansers -------------    
     def clean_user_data(self, df: pd.DataFrame):
         '''
         Clean the user data from NULL values, errors with dates, incorrectly typed values 
         and rows filled with the wrong information.
         '''
+        rows = RowFilter(df)
+
         # Clean columns
-        df = self.clean_nulls(df)                               # Remove rows containing NULL values
-        df = self.clean_user_dates(df)                          # Remove rows with errors in dates
-        df = self.clean_names(df, 'first_name', 'last_name')    # Remove rows with incorrect formatting in first_name and last_name
-        df = self.clean_phones(df, 'phone_number')              # Remove rows with wrong phone_number formatting
+        self.clean_nulls(rows)                 # Remove rows containing NULL values
+        self.apply_rules(rows, 'users')        # Remove rows with errors in dates, names or phone numbers
 
-        # Final cleaning of nulls
-        df = self.clean_nulls(df) 
+        # Final cleaning of nulls (dates which could not be parsed)
+        self.clean_nulls(rows, 'date_of_birth', 'join_date', rule_name='nulls after conversion')
 
-        return df
+        return self.apply_filter(rows, 'users')
     
     def clean_card_data(self, df: pd.DataFrame) -> pd.DataFrame:
         '''
         Clean card data, removing any erroneous values, NULL values or errors with formatting.
         '''
+        rows = RowFilter(df)
+
         # Clean columns
-        df = self.clean_nulls(df)                       # Remove rows containing NULL values
-        df = self.clean_card_dates(df)                  # Remove rows with errors in dates
-        df = self.clean_card_number(df, 'card_number')  # Remove invalid card numbers
+        self.clean_nulls(rows)                 # Remove rows containing NULL values
+        self.apply_rules(rows, 'cards')        # Remove rows with errors in dates or invalid card numbers
 
-        # Final cleaning of nulls
-        df = self.clean_nulls(df) 
+        # Final cleaning of nulls (dates which could not be parsed)
+        self.clean_nulls(rows, 'expiry_date', 'date_payment_confirmed', rule_name='nulls after conversion')
 
-        return df
+        return self.apply_filter(rows, 'cards')
     
     def called_clean_store_data(self, df: pd.DataFrame) -> pd.DataFrame:
         '''
         Clean store data, removing any erroneous values, NULL values or errors with formatting.
         '''
-        df.drop(columns=['lat'], inplace=True)        # Remove the 'lat' column, as it seems to be an empty duplicate of 'latitude'
-
-        # Clean store-specific columns
-        df = self.clean_store_code(df)                # Remove rows containing invalid store codes
-
-        # Clean other columns
-        df = df.replace('eeEurope','Europe')       # Correct continent typo
-        df = self.clean_country_codes(df)                   # Remove rows containing invalid or non-UN approved country codes
-        df = self.clean_continents(df, 'continent')         # Remove rows containing wrong continent names
-        df = self.remove_future_dates(df, 'opening_date')   # Remove rows containing invalid opening dates
+        rows = RowFilter(df)
+        rows.drop_columns('lat')                       # Remove the 'lat' column, as it seems to be an empty duplicate of 'latitude'
 
-        # Convert columns to numeric
-        df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
-        df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
-        df['staff_numbers'] = pd.to_numeric(df['staff_numbers'], errors='coerce')
+        # Remove rows containing invalid store codes, wrong continent names or invalid opening dates,
+        # and convert the coordinates and staff numbers to numeric
+        self.apply_rules(rows, 'stores')
 
-        return df
+        return self.apply_filter(rows, 'stores')
     
     def clean_products_data(self, df: pd.DataFrame) -> pd.DataFrame:
         '''
         Clean products data, removing any erroneous values, NULL values or errors with formatting.
         '''
-        df = self.clean_nulls(df)                               # Remove rows containing NULL values
+        rows = RowFilter(df)
+        self.clean_nulls(rows)                               # Remove rows containing NULL values
+
+        # Convert all weights to a common measurement unit (kg), and classify the products by weight
+        self.convert_product_weights(rows, 'weight')
+        self.add_weight_class(rows, 'weight')
+        rows.rename_columns({'weight': 'weight_in_kg'})
+
+        # Convert prices to float values in GBP
+        self.convert_product_prices(rows, 'product_price')
+        rows.rename_columns({'product_price': 'product_price_in_gbp'})
 
-        # Convert all weights to a common measurement unit (kg)
-        df = self.convert_product_weights(df, 'weight')
-        df = df.rename(columns={'weight': 'weight_in_kg'})
+        # Convert the availability of the products to boolean
+        rows.convert_column('removed', rows.column('removed').map(PRODUCT_AVAILABILITY).astype('boolean'))
+        rows.rename_columns({'removed': 'still_available'})
 
         # Clean other columns
-        df = self.clean_uuid(df, 'uuid')                 # Remove rows containing invalid UUID
-        df = self.remove_future_dates(df, 'date_added')  # Remove rows containing invalid dates added
+        self.apply_rules(rows, 'products')     # Remove rows containing invalid UUID or dates added
 
-        # Final cleaning of nulls
-        df = self.clean_nulls(df)          
+        # Final cleaning of nulls (weights, prices and dates which could not be parsed)
+        self.clean_nulls(rows, 'weight', 'product_price', 'date_added', rule_name='nulls after conversion')
 
-        return df
+        return self.apply_filter(rows, 'products')
     
     def clean_orders_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        rows = RowFilter(df)
+
         # Remove unnecessary columns
-        df = df.drop(columns=['first_name', 'last_name', '1', 'level_0'])
+        rows.drop_columns('first_name', 'last_name', '1', 'level_0')
         
         # Remove rows containing NULL values
-        df = self.clean_nulls(df)
+        self.clean_nulls(rows)
+        self.apply_rules(rows, 'orders')
 
-        return df
+        return self.apply_filter(rows, 'orders')
     
     def clean_dates_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        rows = RowFilter(df)
+
         # Remove rows containing NULL values
-        df = self.clean_nulls(df)
+        self.clean_nulls(rows)
 
         # Clean other columns
-        df = self.clean_uuid(df, 'date_uuid')                 # Remove rows containing invalid UUID
+        self.apply_rules(rows, 'dates')        # Remove rows containing invalid UUID
 
-        return df
+        # Timestamp of each sale, from its date and time of day
+        self.add_sale_timestamps(rows)
+
+        return self.apply_filter(rows, 'dates')
+
+    def apply_rules(self, rows: RowFilter, table_name: str):
+        '''
+        Apply the validation rules of the table to the rows, in the order they are declared.
+        '''
+        for rule in self.validation_rules.get(table_name, []):
+            rule.apply(rows)
+
+    def apply_filter(self, rows: RowFilter, table_name: str) -> pd.DataFrame:
+        '''
+        Materialize the cleaned DataFrame, cast to the column types of its database table, and add the rows
+        rejected by each rule to the counts of the table (and to the quarantine).
+        '''
+        self.add_rejection_counts(table_name, rows.rejection_counts)
+        if self.quarantine is not None:
+            self.quarantine.add(table_name, rows.rejected_rows())
+        return self.cast_to_schema(rows.apply(), TABLE_SCHEMAS.get(TARGET_TABLES.get(table_name), {}))
 
-    # ------------- General data cleaning utils -------------    
-    def clean_nulls(self, df: pd.DataFrame) -> pd.DataFrame:
-        # Remove rows with any value being NULL or NaN
-        df.dropna(inplace=True)
-
-        # Remove rows with any value being a string 'NULL'
-        for column in list(df.columns.values):
-            df = df[~(df[column].apply(self.is_null_str))]
-            
-        return df
-    
     @staticmethod
-    def is_null_str(var: str) -> bool:
-        var_str =  str(var)
-        var_str_lowercase = var_str.lower()
-        
-        list_null_str = ['null', 'none', 'n/a', 'nan']
-        
-        if var_str_lowercase in list_null_str:
-            return True
-        else:
-            return False   
-    
-    def clean_names(self, df:pd.DataFrame, *column_names) -> pd.DataFrame:
-        # Remove rows with incorrect formatting
-        for column in column_names:
-            df = df[(df[column].apply(self.is_valid_name))]
+    def cast_to_schema(df: pd.DataFrame, column_types: Dict[str, TypeEngine]) -> pd.DataFrame:
+        '''
+        Cast the columns of the cleaned DataFrame to the dtypes matching the column types of its database table,
+        so it can be bulk-loaded into a table created with these types. The DataFrame is modified in place:
+        - integer columns to the nullable integer dtypes (e.g. smallint to Int16), rounding any decimals
+        - float columns to float64, and boolean columns to the nullable boolean dtype
+        - string and UUID columns holding numbers (e.g. card numbers read as integers) to strings
+        Date columns are converted to dates by the cleaning rules.
+        '''
+        for column, column_type in column_types.items():
+            if column not in df.columns:
+                continue
+            values = df[column]
+
+            if isinstance(column_type, Integer):
+                dtype = next(dtype for integer_type, dtype in INTEGER_DTYPES if isinstance(column_type, integer_type))
+                df[column] = pd.to_numeric(values, errors='coerce').round().astype(dtype)
+            elif isinstance(column_type, Float):
+                if not pd.api.types.is_float_dtype(values.dtype):
+                    df[column] = pd.to_numeric(values, errors='coerce').astype(float)
+            elif isinstance(column_type, Boolean):
+                if not pd.api.types.is_bool_dtype(values.dtype):
+                    df[column] = values.astype('boolean')
+            elif isinstance(column_type, (String, Uuid)):
+                if not pd.api.types.is_string_dtype(values.dtype):
+                    df[column] = values.astype('string')
 
         return df
 
-    @staticmethod
-    def is_valid_name(name: str) -> bool:
-        valid_name_characters = list(string.ascii_lowercase) + list(string.ascii_uppercase) + list(['-', ' '])
-        
-        name_without_accents = unidecode(name)
-        for char in name_without_accents:
-            if char not in valid_name_characters:
-                return False
-        return True
-    
-    def remove_future_dates(self, df: pd.DataFrame, *column_names) -> pd.DataFrame:
+    def add_rejection_counts(self, table_name: str, rule_counts: Dict[str, int]):
         '''
-        Remove any dates that are later than the current time in the given columns of the dataframe and return the
-        cleaned dataframe.
+        Add the rows rejected by each rule ({rule: rows}) to the counts of the table.
         '''
-        for column in column_names:
-            # Remove rows with wrong date formatting
-            df[column] = pd.to_datetime(df[column], errors='coerce', yearfirst=True).dt.date  
-            #df.dropna(inplace=True)
+        with self._rejection_counts_lock:
+            table_counts = self.rejection_counts.setdefault(table_name, {})
+            for rule_name, rejected in rule_counts.items():
+                table_counts[rule_name] = table_counts.get(rule_name, 0) + rejected
 
-            # Remove rows where dates are after the current date
-            current_date = date.today()
-            df = df[~(df[column] > current_date)]
+    def print_rejection_counts(self):
+        '''
+        Print the number of rows rejected by each cleaning rule, by table.
+        '''
+        print('\n----- ROWS REJECTED BY EACH CLEANING RULE: -----')
+        with self._rejection_counts_lock:
+            for table_name, table_counts in self.rejection_counts.items():
+                print(f'{table_name}:')
+                for rule_name, rejected in table_counts.items():
+                    print(f'  {rule_name:<30} {rejected:>10}')
+
+    def clean_chunks(self, chunks: Iterable[pd.DataFrame], clean_function: Callable[[pd.DataFrame], pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        '''
+        Lazily apply a data cleanser (e.g. self.clean_orders_data) to each chunk of a table streamed from its source.
+        All the cleaning rules are row-independent, so cleaning the chunks gives the same rows as cleaning the whole table.
+        '''
+        for chunk in chunks:
+            yield clean_function(chunk)
 
-        return df
-    
-    def clean_phones(self, df: pd.DataFrame, column_name: str) -> pd.DataFrame:
-        # Remove rows with wrong phone_number formatting
-        regex_expression = '^(?:(?:\(?(?:0(?:0|11)\)?[\s-]?\(?|\+)44\)?[\s-]?(?:\(?0\)?[\s-]?)?)|(?:\(?0))(?:(?:\d{5}\)?[\s-]?\d{4,5})|(?:\d{4}\)?[\s-]?(?:\d{5}|\d{3}[\s-]?\d{3}))|(?:\d{3}\)?[\s-]?\d{3}[\s-]?\d{3,4})|(?:\d{2}\)?[\s-]?\d{4}[\s-]?\d{4}))(?:[\s-]?(?:x|ext\.?|\#)\d{3,4})?$'
-        df.loc[~df[column_name].str.match(regex_expression), 'phone_number'] = np.nan         # For every row  where the Phone column does not match our regular expression, replace the value with NaN
-        df.dropna(inplace=True)
+    # ------------- Parallel cleaning -------------
+    def clean_parallel(self, df: pd.DataFrame, clean_method_name: str, max_workers: int = None) -> pd.DataFrame:
+        '''
+        Clean a large DataFrame with one of the data cleansers (e.g. 'clean_orders_data'), split into row shards
+        cleaned in parallel by a pool of worker processes. The cleaned shards are concatenated in order, so the
+        result is the same as cleaning the whole DataFrame in this process, and the rows rejected by the workers
+        are added to rejection_counts (and to the quarantine).
+
+        The shards are written as Arrow IPC files (see write_frame_file) to a memory-backed directory, and
+        memory-mapped by the workers, so they are not pickled through the pipes of the pool.
+
+        Parameters:
+        ----------
+        df: pd.DataFrame
+            DataFrame to clean
+        clean_method_name: str
+            Name of the data cleanser of the table
+        max_workers: int
+            Number of worker processes (default: number of CPUs). The pool is started on the first call and
+            reused by the following ones, until close_workers() is called.
+
+        Returns:
+        ----------
+        pd.DataFrame
+            Cleaned DataFrame
+        '''
+        max_workers = max_workers or os.cpu_count()
+        num_shards = min(max_workers, len(df) // MIN_SHARD_ROWS)
 
-        return df
-    
-    def clean_continents(self, df: pd.DataFrame, *column_names) -> pd.DataFrame:
-        # Remove rows with invalid or wrong continent names
-        for column in column_names:
-            df = df[(df[column].apply(self.is_valid_continent))]
-        return df
-    
-    def is_valid_continent(self, continent: str) -> bool:
-        # Import valid country codes from yaml       
-        continent_lowercase = continent.lower()
-        if continent_lowercase in list(self.validation_utils['continent_list']):
-            return True
-        else: return False
+        # Small table or single worker: no need for worker processes
+        if num_shards <= 1:
+            return getattr(self, clean_method_name)(df)
 
-    def clean_country_codes(self, df: pd.DataFrame, *column_names) -> pd.DataFrame:
-        # Remove rows with non UN-approved country codes
-        for column in column_names:
-            df = df[(df[column].apply(self.is_valid_country_code))]
-        return df
+        executor = self.start_workers(max_workers)
+        shard_dir = tempfile.mkdtemp(prefix='cleaning_shards_', dir=SHARD_DIR)
+        try:
+            futures = []
+            shard_bounds = np.linspace(0, len(df), num_shards + 1).astype(int)
+            for shard_index, (start, end) in enumerate(zip(shard_bounds[:-1], shard_bounds[1:])):
+                shard_filepath = write_frame_file(df.iloc[start:end], os.path.join(shard_dir, f'shard_{shard_index}'))
+                futures.append(executor.submit(_clean_shard, clean_method_name, shard_filepath,
+                                               os.path.join(shard_dir, f'cleaned_{shard_index}')))
+
+            shards_cleaned = []
+            for future in futures:
+                cleaned_filepath, rejection_counts, rejected_filepaths = future.result()
+                shards_cleaned.append(read_frame_file(cleaned_filepath))
+                for table_name, rule_counts in rejection_counts.items():
+                    self.add_rejection_counts(table_name, rule_counts)
+                for table_name, rejected_filepath in rejected_filepaths.items():
+                    self.quarantine.add(table_name, read_frame_file(rejected_filepath))
+        finally:
+            shutil.rmtree(shard_dir, ignore_errors=True)
+
+        return pd.concat(shards_cleaned)
+
+    def start_workers(self, max_workers: int) -> ProcessPoolExecutor:
+        '''
+        Returns the pool of worker processes of clean_parallel, starting it if needed. Each worker loads the
+        validation rules once, when it starts, and buffers the rows it rejects if they are quarantined.
+        '''
+        with self._executor_lock:
+            if self._executor is None:
+                # The workers are not forked, as the cleaners may be called from the threads of the pipeline
+                start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = ProcessPoolExecutor(max_workers=max_workers,
+                                                     mp_context=multiprocessing.get_context(start_method),
+                                                     initializer=_start_cleaning_worker,
+                                                     initargs=(os.path.abspath(self.validation_filepath), self.quarantine is not None))
+            return self._executor
+
+    def close_workers(self):
+        '''
+        Stop the pool of worker processes of clean_parallel, if it was started.
+        '''
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    # ------------- General data cleaning utils -------------    
+    def clean_nulls(self, rows: RowFilter, *column_names, rule_name: str = 'nulls'):
+        '''
+        Remove rows with any value being NULL or NaN, or a string such as 'NULL' or 'N/A', in the given columns
+        (by default, in all the columns). The rows are rejected column by column, so the reason names the column.
+        '''
+        for column in column_names or rows.columns:
+            values = rows.column(column)
+
+            # Rows with the value being NULL or NaN
+            mask = values.notna().to_numpy(dtype=bool)
+
+            # Rows with the value being a string 'NULL'. Only object and string columns can hold strings.
+            if pd.api.types.is_string_dtype(values.dtype):
+                mask &= ~values.isin(NULL_STRINGS_ANY_CASE).to_numpy(dtype=bool)
+
+            rows.keep_rows(rule_name, mask, reason=f'NULL value in {column}')
     
-    def is_valid_country_code(self, country_code: str) -> bool:
-        # Import valid country codes from yaml       
-        country_code_uppercase = country_code.upper()
-        if country_code_uppercase in list(self.validation_utils['un_country_list'].keys()):
-            return True
-        else: return False
+    @staticmethod
+    def is_null_str(var: str) -> bool:
+        return str(var).lower() in NULL_STRINGS
     
-    def convert_boolean(self, df: pd.DataFrame, column_names_arr: List[str], true_value: str, false_value: str) -> pd.DataFrame:
+    def convert_boolean(self, rows: RowFilter, column_names_arr: List[str], true_value: str, false_value: str):
         '''
         Convert values in a dataframe column into boolean
         '''
@@ -217,9 +730,7 @@ class DataCleaning():
             false_value_lowercase = false_value.lower()
 
             # Convert to boolean
-            df[column] = df[column].apply(self.is_true, args=(true_value_lowercase, false_value_lowercase))
-
-        return df
+            rows.convert_column(column, rows.column(column).apply(self.is_true, args=(true_value_lowercase, false_value_lowercase)))
     
     @staticmethod
     def is_true(string_to_check: str, true_value: str, false_value: str) -> bool:
@@ -272,277 +783,181 @@ class DataCleaning():
         except ValueError:
             return False
         
-    # ------------- User table specific data cleaning utils -------------    
-    def clean_user_dates(self, df: pd.DataFrame) -> pd.DataFrame:
-        # Remove rows with wrong date formatting
-        df['date_of_birth'] = pd.to_datetime(df['date_of_birth'], errors='coerce').dt.date  
-        df['join_date'] = pd.to_datetime(df['join_date'], errors='coerce').dt.date
+    # ------------- Date table specific data cleaning utils -------------
+    def add_sale_timestamps(self, rows: RowFilter):
+        """
+        Add a 'sale_ts' timestamp column, combining the year, month, day and timestamp (time of day) of each sale,
+        so the sales can be ordered in time without parsing the strings in every query. The rows whose date or
+        time is invalid are removed. The year, month and day are converted to integers, taken from the timestamps.
+        """
+        sale_ts = self.parse_sale_timestamps(*(rows.column(column) for column in ('year', 'month', 'day', 'timestamp')))
+        rows.keep_rows('sale_ts', ~np.isnat(sale_ts), reason='invalid year, month, day or timestamp')
+        rows.convert_column('sale_ts', pd.Series(sale_ts, index=rows.df.index))
 
-        # Remove rows where joint_date is after date_of_birth
-        df = df[~(df['join_date'] < df['date_of_birth'])]
+        sale_ts = pd.DatetimeIndex(sale_ts)
+        for column, values in (('year', sale_ts.year), ('month', sale_ts.month), ('day', sale_ts.day)):
+            rows.convert_column(column, pd.Series(values, index=rows.df.index).astype('Int16'))
 
-        # Remove rows where dates are after the current date
-        current_date = date.today()
-        df = df[~(df['date_of_birth'] > current_date)]
-        df = df[~(df['join_date'] > current_date)]
+    @staticmethod
+    def parse_sale_timestamps(years: pd.Series, months: pd.Series, days: pd.Series, times: pd.Series) -> np.ndarray:
+        """
+        Parse the date (e.g. '2012', '9', '19') and time of day (e.g. '22:00:06', or '22:00:06.123' with fractional
+        seconds) strings of each sale into datetime64 values, NaT where invalid. Arrow-backed strings are joined and
+        parsed with the Arrow compute kernels.
+        """
+        columns = (years, months, days, times)
+        if all(ColumnRule.is_arrow_string(column) for column in columns):
+            arrays = [pa.array(column.array) for column in columns]
+            # strptime does not parse fractional seconds, so they are removed and added back as microseconds
+            fractions = pc.struct_field(pc.extract_regex(arrays[3], r'\.(?P<fraction>\d{1,9})$'), [0])
+            microseconds = pc.cast(pc.utf8_slice_codeunits(pc.utf8_rpad(fractions, 6, '0'), 0, 6), pa.int64())
+            times = pc.replace_substring_regex(arrays[3], r'\.\d{1,9}$', '')
+
+            dates = pc.binary_join_element_wise(*arrays[:3], '-')
+            timestamps = pc.strptime(pc.binary_join_element_wise(dates, times, ' '),
+                                     format='%Y-%m-%d %H:%M:%S', unit='us', error_is_null=True)
+            timestamps = pc.add(timestamps, pc.cast(pc.fill_null(microseconds, 0), pa.duration('us')))
+            return timestamps.to_numpy(zero_copy_only=False).astype('datetime64[ns]')
+
+        years, months, days, times = (column.astype(str) for column in columns)
+        timestamps = years + '-' + months + '-' + days + ' ' + times
+        parsed = pd.to_datetime(timestamps, format='%Y-%m-%d %H:%M:%S', errors='coerce')
+        # The times with fractional seconds are parsed again with their fraction
+        fractional = parsed.isna() & times.str.contains(r'\.\d{1,9}$')
+        if fractional.any():
+            parsed[fractional] = pd.to_datetime(timestamps[fractional], format='%Y-%m-%d %H:%M:%S.%f', errors='coerce')
+        return parsed.to_numpy()
 
-        return df
-    
-    # ------------- Card table specific data cleaning utils -------------    
-    def clean_card_dates(self, df: pd.DataFrame) -> pd.DataFrame:
-        # Remove rows with wrong date formatting
-        df['expiry_date'] = pd.to_datetime(df['expiry_date'], format='%m/%y', errors='coerce').dt.date  
-        df['date_payment_confirmed'] = pd.to_datetime(df['date_payment_confirmed'], errors='coerce').dt.date
+    # ------------- Product table specific data cleaning utils -------------    
+    @staticmethod
+    def extract_groups(series: pd.Series, pattern: re.Pattern) -> pd.DataFrame:
+        """
+        Returns the named groups of the first match of the pattern in each value, with a column per group.
+        Values such as weights and prices repeat a lot, so each distinct value is only matched once.
+        """
+        codes, uniques = pd.factorize(series)
+        uniques = pd.Series(uniques)
 
-        # NOTE: Do we want to check if a payment was made after expiry date? Maybe it's not part of what the
-        # data cleaning function should do
+        # str.extract is not implemented for pd.ArrowDtype strings, but it is for the pyarrow-backed StringDtype
+        if isinstance(uniques.dtype, pd.ArrowDtype) and ColumnRule.is_arrow_string(uniques):
+            uniques = uniques.astype(pd.StringDtype('pyarrow'))
+        elif not pd.api.types.is_string_dtype(uniques.dtype):
+            uniques = uniques.astype(object)
 
-        # Remove rows where dates are before or after the current date
-        current_date = date.today()
-        # df = df[~(df['expiry_date'] < current_date)]    # NOTE: Keeping expired card data as it might be useful
-        df = df[~(df['date_payment_confirmed'] > current_date)]
+        # Missing values have code -1, which is not in the index of the groups: their groups are NaN
+        groups = uniques.str.extract(pattern).reindex(codes)
+        groups.index = series.index
+        return groups
 
-        return df
-    
-    def clean_card_number(self, df: pd.DataFrame, column_name: str) -> pd.DataFrame:
-        # Check if it's a valid card number: positive integer with 8 to 19 digits, , if not remove
-        df = df[(df[column_name].apply(self.is_valid_card_number))]
+    def convert_product_weights(self, rows: RowFilter, *column_names):
+        """
+        Convert the given weight columns of the rows, so all values are represented in kg (float64).
+        Weights which cannot be parsed are set to NaN.
+        """
+        for column in column_names:
+            rows.convert_column(column, self.parse_weights(rows.column(column)))
 
-        return df
-    
     @staticmethod
-    def is_valid_card_number(card_number: str) -> bool:
-        # Check that it is a positive integer number
-        if card_number.isnumeric():
-            if int(card_number) > 0:
-                # Note: Payment card numbers are composed of 8 to 19 digits.
-                if len(card_number) >= 8 and len(card_number) <= 19:
-                    return True
-        return False
-
-    # ------------- Store table specific data cleaning utils -------------       
-    def clean_lat_lon(self, df: pd.DataFrame) -> pd.DataFrame:
-        # Check if it's a valid latitude and longitude, if not remove
-        df = df[(df['latitude'].apply(self.is_valid_lat))]
-        df = df[(df['longitude'].apply(self.is_valid_lon))]
-
-        # Convert to float
-        df['latitude'] = pd.to_numeric(df['latitude'])
-        df['longitude'] = pd.to_numeric(df['longitude'])
+    def parse_weights(weights: pd.Series) -> pd.Series:
+        """
+        Parse weights such as '1.6kg', '590g', '400ml', '16oz' or '12 x 100g' into kg, in a single vectorized pass:
+        the parts of every weight are extracted with one regex, and the units are converted with a lookup array.
+        """
+        parts = DataCleaning.extract_groups(weights, WEIGHT_PATTERN)
 
-        return df
-      
-    def is_valid_lat(self, latitude: str) -> bool:
-        # Check it is a numeric value
-        if self.is_float(latitude):
-            # Check it is in the correct range (-90 to 90 deg)
-            if -90 <= float(latitude) <= 90:
-                return True
-            else: 
-                return False
-        else:
-            return False
-          
-    def is_valid_lon(self, longitude: str) -> bool:
-        # Check it is a numeric value
-        if self.is_float(longitude):
-            # Check it is in the correct range (-180 to 180 deg)
-            if -180 <= float(longitude) <= 180:
-                return True
-            else: 
-                return False
-        else:
-            return False
-    
-    def clean_store_code(self, df: pd.DataFrame) -> pd.DataFrame:
-        # Check if it's a valid store code (e.g. CH-99475026), if not remove
-        df = df[(df['store_code'].apply(self.is_valid_store_code))]        
-        return df
+        multiplier = pd.to_numeric(parts['multiplier']).fillna(1).to_numpy(dtype=float, na_value=np.nan)
+        value = pd.to_numeric(parts['value']).to_numpy(dtype=float, na_value=np.nan)
 
-    @staticmethod
-    def is_valid_store_code(store_code: str) -> bool:
-        # Check if it's a valid store code (e.g. CH-99475026)
-        # Split code
-        try:
-            code_prefix = store_code.split('-')[0]
-            code_suffix = store_code.split('-')[1]
-
-            # First 2 chars should be letters
-            if len(code_prefix) == 2 or len(code_prefix) == 3:
-                valid_characters_prefix = list(string.ascii_lowercase)
-            
-                prefix_lowercase = code_prefix.lower()
-                for char in prefix_lowercase:
-                    if char not in valid_characters_prefix:
-                        return False
-            else: return False
-        
-            # Last 8 chars can be a mix of alphabetical letters and numbers
-            if len(code_suffix) == 8:
-                valid_characters_suffix = list(string.ascii_lowercase) +  [str(num) for num in range(10)]
-            
-                suffix_lowercase = code_suffix.lower()
-                for char in suffix_lowercase:
-                    if char not in valid_characters_suffix:
-                        return False
-            else: return False
+        # Units which did not match have code -1, which is the NaN appended to the factors
+        unit_codes = pd.Categorical(parts['unit'], categories=WEIGHT_UNITS).codes
+        factors = np.append(WEIGHT_UNIT_FACTORS, np.nan)[unit_codes]
 
-            return True
-        
-        except IndexError:
-            return False
+        return pd.Series((multiplier * value * factors).round(3), index=weights.index)
 
-    # ------------- Product table specific data cleaning utils -------------    
-    def convert_product_weights(self, df: pd.DataFrame, *column_names) -> pd.DataFrame:
+    def add_weight_class(self, rows: RowFilter, weight_column: str):
+        """
+        Add a 'weight_class' column classifying the products by their weight in kg, which must be converted first:
+        'Light' (under 2 kg), 'Mid_Sized' (under 40 kg), 'Heavy' (under 140 kg) or 'Truck_Required'.
         """
-        Given a pandas dataframe, return a new dataframe with cleaned weight columns, where all values are represented in kg.
+        weights = rows.column(weight_column).to_numpy(dtype=float)
+        weight_classes = WEIGHT_CLASSES[np.searchsorted(WEIGHT_CLASS_BOUNDS, weights, side='right')]
+        weight_classes[np.isnan(weights)] = None
 
-        For volumes, it uses a 1:1 ratio of ml to g as a rough estimate for the rows containing ml.
+        rows.convert_column('weight_class', pd.Series(weight_classes, index=rows.df.index))
+
+    def convert_product_prices(self, rows: RowFilter, *column_names):
+        """
+        Convert the given price columns of the rows (e.g. '£12.99') to float64 values representing GBP.
+        Prices which cannot be parsed are set to NaN.
         """
-        # Apply weight conversion function to all values in the given column
         for column in column_names:
-            df[column] = df[column].apply(self.convert_to_kg)
+            rows.convert_column(column, self.parse_prices(rows.column(column)))
 
-        return df
-    
     @staticmethod
-    def convert_to_kg(weight: str) -> float:
-        try:
-            # Separate numeric value from units name (e.g. g, kg, ml)    
-            value = re.split('\s*(?:kg|g|l|ml)', weight)[0]
-            units = re.findall('\s*(?:kg|g|l|ml)', weight)[0]
-
-            # Returned converted value
-            if units == 'kg' or units == 'l':
-                return round(float(value), 3)               # Assume 1:1 conversion ratio from l to kg
-            elif units == 'g' or units == 'ml':
-                return round((float(value) * 0.001), 3)     # Assume 1:1 conversion ratio from ml to g
-            else:
-                return 'NaN'
-            
-        except:
-            return 'NaN'
-    
-    def convert_product_prices(self, df: pd.DataFrame, *column_names) -> pd.DataFrame:
+    def parse_prices(prices: pd.Series) -> pd.Series:
         """
-        Given a pandas dataframe, return a new dataframe with prices parsed and converted to pounds sterling (GBP).
+        Parse prices in pounds sterling (e.g. '£12.99') into float values, in a single vectorized pass.
         """
-        # Convert product prices to float values representing GBP
-        for column in column_names:
-            df[column] = df[column].apply(self.convert_to_gbp)
+        value = pd.to_numeric(DataCleaning.extract_groups(prices, PRICE_PATTERN)['value']).to_numpy(dtype=float, na_value=np.nan)
+        return pd.Series(value.round(2), index=prices.index)
 
-        return df
-    
-    @staticmethod
-    def convert_to_gbp(price: str) -> float:
-        try:
-            # Separate numeric value from units name (e.g. g, kg, ml)    
-            value = re.split('\s*(?:£)', price)[1]
-            units = re.findall('\s*(?:£)', price)[0]
-
-            # Return value
-            if units == '£':
-                return round(float(value), 2)
-            else:
-                return 'NaN'
-            
-        except:
-            return 'NaN'
-    
-    def clean_ean(self, df: pd.DataFrame, column_name: str) -> pd.DataFrame:
-        # Check if it's a valid EAN number: positive integer with 13 digits, , if not remove
-        df = df[(df[column_name].apply(self.is_valid_ean))]
 
-        return df
-    
-    @staticmethod
-    def is_valid_ean(ean: str) -> bool:
-        # Check that it is a positive integer number
-        if ean.isnumeric():
-            if int(ean) > 0:
-                # Note: EAN codes in Europe are composed of 13 digits.
-                if len(ean) == 13:
-                    return True
-        return False
-    
-    def clean_uuid(self, df: pd.DataFrame, column_name: str) -> pd.DataFrame:
-        '''
-        Remove rows with invalid UUIDs in the given columns and returns the cleaned dataframe.
-        '''
-        df = df[(df[column_name].apply(self.is_valid_uuid))]
+# ------------- Worker processes of DataCleaning.clean_parallel -------------
+# Data cleaner of each worker process, with its validation rules compiled once
+_worker_cleaner: DataCleaning = None
 
-        return df
-    
-    @staticmethod
-    def is_valid_uuid(uuid: str) -> bool:
-        '''
-        Check if it's a valid UUID: 36 character alphanumeric string
-        # (e.g. acde070d-8c4c-4f0d-9d8a-162843c10333), if not remove.
-        '''
-        try:
-            # Split UUID
-            uuid_split_arr = uuid.split('-')
-
-            time_low = uuid_split_arr[0]
-            time_mid = uuid_split_arr[1]
-            time_hi_and_version = uuid_split_arr[2]
-            clock_seq_hi_and_reserved = uuid_split_arr[3]
-            mac_address = uuid_split_arr[4]
-
-            # Check that lengths are correct
-            if len(time_low)==8 and len(time_mid)==len(time_hi_and_version)==len(clock_seq_hi_and_reserved)==4 and len(mac_address)==12:
-                # Check that all values are alphanumerical or hyphen
-                valid_characters = list(string.ascii_lowercase) + [str(num) for num in range(10)] + ['-']
-                uuid_lowercase = uuid.lower()
-                for char in uuid_lowercase:
-                    if char not in valid_characters:
-                        print(f'Invalid char: {char}')
-                        return False
-                return True
-            else: 
-                return False
-        
-        except:
-            return False
-        
-    def clean_product_code(self, df: pd.DataFrame) -> pd.DataFrame:
-        # Check if it's a valid product code (e.g. U3-5148457q), if not remove
-        df = df[(df['product_code'].apply(self.is_valid_product_code))]      
 
-        return df
+def _start_cleaning_worker(validation_filepath: str, quarantine: bool):
+    global _worker_cleaner
+    # The rejected rows are only buffered by the workers, and written by the quarantine of the main process
+    _worker_cleaner = DataCleaning(validation_filepath, QuarantineStore(None) if quarantine else None)
 
-    @staticmethod
-    def is_valid_product_code(product_code: str) -> bool:
-        # Check if it's a valid product code (e.g. U3-5148457q)
-        # Split code
-        try:
-            code_prefix = product_code.split('-')[0]
-            code_suffix = product_code.split('-')[1]
-
-            # First 2 chars should be letters
-            if len(code_prefix) == 2:
-                valid_characters_prefix = list(string.ascii_lowercase) + [str(num) for num in range(10)]
-            
-                prefix_lowercase = code_prefix.lower()
-                for char in prefix_lowercase:
-                    if char not in valid_characters_prefix:
-                        return False
-            else: return False
-        
-            # Last 8 chars can be a mix of alphabetical letters and numbers
-            if len(code_suffix) == 8:
-                valid_characters_suffix = list(string.ascii_lowercase) +  [str(num) for num in range(10)]
-            
-                suffix_lowercase = code_suffix.lower()
-                for char in suffix_lowercase:
-                    if char not in valid_characters_suffix:
-                        return False
-            else: return False
 
-            return True
-        
-        except IndexError:
-            return False
+def _clean_shard(clean_method_name: str, shard_filepath: str, cleaned_filepath: str) -> tuple:
+    '''
+    Clean a shard written by DataCleaning.clean_parallel in a worker process. Returns the path of the cleaned
+    shard, the rows rejected by each rule ({table: {rule: rows}}) while cleaning it, and the paths of the
+    rejected rows of each table ({table: path}), if they are quarantined.
+    '''
+    _worker_cleaner.rejection_counts = {}
+    df_cleaned = getattr(_worker_cleaner, clean_method_name)(read_frame_file(shard_filepath))
+
+    rejected_filepaths = {}
+    if _worker_cleaner.quarantine is not None:
+        for table_name, df_rejected in _worker_cleaner.quarantine.pop_rows().items():
+            rejected_filepaths[table_name] = write_frame_file(df_rejected, f'{cleaned_filepath}_rejected_{table_name}')
+
+    return write_frame_file(df_cleaned, cleaned_filepath), _worker_cleaner.rejection_counts, rejected_filepaths
+
+
+def write_frame_file(df: pd.DataFrame, filepath: str) -> str:
+    '''
+    Write a DataFrame, with its index, to an Arrow IPC file ('{filepath}.arrow'), which can be memory-mapped
+    without copying the columns. DataFrames that Arrow cannot convert (e.g. object columns mixing strings and
+    numbers) are pickled instead ('{filepath}.pickle'), with protocol 5. Returns the path of the written file.
+    '''
+    try:
+        table = frame_to_arrow(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        with open(f'{filepath}.pickle', 'wb') as file:
+            pickle.dump(df, file, protocol=5)
+        return f'{filepath}.pickle'
+
+    with pa.OSFile(f'{filepath}.arrow', 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return f'{filepath}.arrow'
+
+
+def read_frame_file(filepath: str) -> pd.DataFrame:
+    '''
+    Read a DataFrame written by write_frame_file, with the same index and column dtypes.
+    '''
+    if filepath.endswith('.pickle'):
+        with open(filepath, 'rb') as file:
+            return pickle.load(file)
+
+    with pa.memory_map(filepath) as source:
+        return arrow_to_frame(pa.ipc.open_file(source).read_all())
 
 
 if __name__ == '__main__':
@@ -555,3 +970,4 @@ if __name__ == '__main__':
     cleaner = DataCleaning()
     df = cleaner.clean_user_data(df)
     print(df)
+    cleaner.print_rejection_counts()
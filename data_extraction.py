@@ -1,15 +1,27 @@
 # Library imports
+from botocore.exceptions import ClientError
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from pypdf import PdfReader
+from requests.adapters import HTTPAdapter
+from sqlalchemy import MetaData, Select, Table, func, or_, select
 from tabula.io import read_pdf
+from typing import Any, Callable, Iterator, List, Tuple, Union
 
 import boto3
+import itertools
+import multiprocessing
 import os
 import pandas as pd
 import requests
 import sys
+import threading
+import time
 import yaml
 
 # Project class imports
+from cache_utils import DownloadCache
 from database_utils import DatabaseConnector
+from metrics_utils import add_bytes_transferred
 
 
 class DataExtractor():
@@ -17,15 +29,34 @@ class DataExtractor():
     Utility class to extract data from multiple sources, including: REST APIs, S3 buckets, 
     structured and unstructured data files (e.g. .csv, .json, .pdf).
     '''
-    def __init__(self, aws_credentials_filepath: str):
+    def __init__(self, aws_credentials_filepath: str,
+                 api_credentials_filepath: str = 'db_creds_aws_api.yaml',
+                 api_stores_base_url: str = 'https://aqj7u5id95.execute-api.eu-west-1.amazonaws.com/prod',
+                 cache_dir: str = 'download_cache', cache_max_size_bytes: int = 2 * 1024 ** 3,
+                 dtype_backend: str = None):
         '''
         Initialise DataExtractor class and load class variables
         '''
+        # Dtype backend of the extracted DataFrames: None (NumPy, with strings as object columns), 'numpy_nullable'
+        # or 'pyarrow'. Arrow-backed strings use a fraction of the memory and are validated with Arrow kernels.
+        self.dtype_backend = dtype_backend
+        self._read_options = {'dtype_backend': dtype_backend} if dtype_backend is not None else {}
+
+        # Cache of the downloaded source files (S3 objects, PDF) and of the DataFrames parsed from them
+        self.download_cache = DownloadCache(cache_dir, cache_max_size_bytes)
+
         # Parameters to receive data from the AWS API - Store data
         self._api_stores_headers = {
-            'x-api-key': self.retrieve_creds('db_creds_aws_api.yaml')['X_API_KEY']
+            'x-api-key': self.retrieve_creds(api_credentials_filepath)['X_API_KEY']
             }
-        self._api_stores_base_url = 'https://aqj7u5id95.execute-api.eu-west-1.amazonaws.com/prod'
+        self._api_stores_base_url = api_stores_base_url
+
+        # Pooled HTTP session shared by all the store API requests, so connections are reused
+        self._api_session = None
+        self._api_session_lock = threading.Lock()
+
+        # Timestamp (time.monotonic) until which all API requests wait after a rate-limit response
+        self._api_paused_until = 0.0
 
         # Parameters to receive data from the AWS S3 Bucket - Product data
         self._aws_access_key = self.read_db_creds(aws_credentials_filepath)['AWS_ACCESS_KEY']
@@ -40,26 +71,329 @@ class DataExtractor():
 
         return credentials
 
-    def read_rds_table(self, db_connector: DatabaseConnector, table_name: str) -> pd.DataFrame:
+    def read_rds_table(self, db_connector: DatabaseConnector, table_name: str, chunksize: int = None,
+                       key_column: str = None, watermark: Any = None, num_partitions: int = None) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         '''
         Extract the database table to a pandas DataFrame.
+
+        If chunksize is given, return instead an iterator of DataFrames with up to chunksize rows each
+        (see stream_rds_table). If key_column and watermark are given, only extract the rows with a key
+        greater than the watermark, ordered by key (see build_delta_query).
+
+        If key_column and num_partitions are given, the table is read in num_partitions key ranges over concurrent
+        connections (see read_rds_partitions), and the partitions are merged in key order.
         '''
-        table = pd.read_sql_table(table_name, db_connector.engine)
+        if num_partitions is not None and key_column is not None and chunksize is None:
+            partitions = list(self.read_rds_partitions(db_connector, table_name, key_column, num_partitions, watermark=watermark))
+            return pd.concat(partitions).sort_values(key_column, ignore_index=True)
+
+        if chunksize is not None:
+            return self.stream_rds_table(db_connector, table_name, chunksize, key_column, watermark)
+
+        if key_column is None:
+            table = pd.read_sql_table(table_name, db_connector.engine, **self._read_options)
+        else:
+            table = pd.read_sql(self.build_delta_query(db_connector, table_name, key_column, watermark), db_connector.engine,
+                                **self._read_options)
 
         return table
+
+    def stream_rds_table(self, db_connector: DatabaseConnector, table_name: str, chunksize: int,
+                         key_column: str = None, watermark: Any = None) -> Iterator[pd.DataFrame]:
+        '''
+        Extract the database table in chunks, yielding a pandas DataFrame of up to chunksize rows at a time.
+        Rows are fetched through a server-side cursor, so only one chunk is held in memory.
+        '''
+        with db_connector.engine.connect().execution_options(stream_results=True, max_row_buffer=chunksize) as connection:
+            if key_column is None:
+                chunks = pd.read_sql_table(table_name, connection, chunksize=chunksize, **self._read_options)
+            else:
+                query = self.build_delta_query(db_connector, table_name, key_column, watermark)
+                chunks = pd.read_sql(query, connection, chunksize=chunksize, **self._read_options)
+
+            for chunk in chunks:
+                yield chunk
+
+    def build_delta_query(self, db_connector: DatabaseConnector, table_name: str, key_column: str, watermark: Any = None) -> Select:
+        '''
+        Returns a query selecting the rows of the table with a key_column value greater than the watermark
+        (i.e. the highest key already extracted), ordered by key_column. If watermark is None, all rows are selected.
+        '''
+        table = Table(table_name, MetaData(), autoload_with=db_connector.engine)
+        query = select(table).order_by(table.c[key_column])
+
+        if watermark is not None:
+            query = query.where(table.c[key_column] > watermark)
+
+        return query
+
+    def read_rds_partitions(self, db_connector: DatabaseConnector, table_name: str, key_column: str, num_partitions: int,
+                            max_workers: int = None, watermark: Any = None) -> Iterator[pd.DataFrame]:
+        '''
+        Extract the database table in num_partitions key ranges (see build_partition_queries), read concurrently
+        over up to max_workers pooled connections, yielding each partition as a pandas DataFrame as soon as it is
+        read. Partitions are therefore not yielded in key order.
+
+        At most two partitions per worker are read ahead of the ones consumed, so a slow consumer (e.g. a
+        clean and upload pipeline, see DataCleaning.clean_chunks) bounds the memory used.
+
+        Parameters:
+        ----------
+        db_connector: DatabaseConnector
+            Connector to the database
+        table_name: str
+            Name of the table
+        key_column: str
+            Column the table is partitioned on (e.g. 'index', or a UUID column)
+        num_partitions: int
+            Number of key ranges the table is split into. More partitions than workers keep each one smaller.
+        max_workers: int
+            Number of partitions read at the same time (default: the pool size of the engine)
+        watermark: Any
+            Optional, only extract the rows with a key greater than the watermark
+        '''
+        queries = iter(self.build_partition_queries(db_connector, table_name, key_column, num_partitions, watermark))
+        max_workers = max_workers or min(num_partitions, getattr(db_connector.engine.pool, 'size', lambda: num_partitions)())
+
+        def read_partition(query: Select) -> pd.DataFrame:
+            with db_connector.engine.connect() as connection:
+                return pd.read_sql(query, connection, **self._read_options)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {executor.submit(read_partition, query) for query in itertools.islice(queries, 2 * max_workers)}
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        # Read the next partition in place of each one consumed
+                        for query in itertools.islice(queries, 1):
+                            pending.add(executor.submit(read_partition, query))
+                        yield future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def build_partition_queries(self, db_connector: DatabaseConnector, table_name: str, key_column: str, num_partitions: int,
+                                watermark: Any = None) -> List[Select]:
+        '''
+        Returns num_partitions queries selecting disjoint key ranges of the table, which together select every row
+        (with a key greater than the watermark, if given). Each partition is ordered by key.
+
+        - Numeric keys (e.g. 'index') are split into ranges of equal width between the lowest and highest key.
+        - Other keys are assumed to be spread evenly, like the UUIDs: they are split on their first 4 hexadecimal
+          characters (e.g. '4000' <= date_uuid < '8000').
+
+        The first and last ranges are open-ended (and the first one includes the NULL keys), so no row is missed
+        if the keys are not spread as expected: the partitions are only less balanced.
+        '''
+        table = Table(table_name, MetaData(), autoload_with=db_connector.engine)
+        key = table.c[key_column]
+
+        try:
+            is_numeric = key.type.python_type in (int, float)
+        except NotImplementedError:
+            is_numeric = False
+
+        if is_numeric:
+            bounds_query = select(func.min(key), func.max(key))
+            if watermark is not None:
+                bounds_query = bounds_query.where(key > watermark)
+            with db_connector.engine.connect() as connection:
+                lowest, highest = connection.execute(bounds_query).one()
+
+            if lowest is None:
+                boundaries = []
+            elif key.type.python_type is int:
+                boundaries = [lowest + (i * (highest - lowest + 1)) // num_partitions for i in range(1, num_partitions)]
+            else:
+                boundaries = [lowest + i * (highest - lowest) / num_partitions for i in range(1, num_partitions)]
+        else:
+            boundaries = [f'{(i * 16 ** 4) // num_partitions:04x}' for i in range(1, num_partitions)]
+
+        # Remove duplicated boundaries (e.g. fewer keys than partitions)
+        boundaries = sorted(set(boundaries))
+
+        queries = []
+        for lower, upper in zip([None] + boundaries, boundaries + [None]):
+            query = select(table).order_by(key)
+            if watermark is not None:
+                query = query.where(key > watermark)
+            if lower is not None:
+                query = query.where(key >= lower)
+            if upper is not None:
+                query = query.where(or_(key < upper, key.is_(None)) if lower is None else key < upper)
+            queries.append(query)
+
+        return queries
     
-    def retrieve_pdf_data(self, url: str) -> pd.DataFrame:
+    def retrieve_pdf_data(self, url: str, max_workers: int = None, pages_per_batch: int = None) -> pd.DataFrame:
         '''
         Extract data from from a table in a PDF file, given a URL link. Then, return a Pandas
         DataFrame with the table information.
+
+        The PDF and the extracted table are cached, so an unchanged PDF is neither downloaded nor parsed again.
+        The pages are extracted in parallel (see parse_pdf).
         '''
-        # Read remote pdf into a list of DataFrame
-        extracted_data = read_pdf(url, multiple_tables=True, pages="all", output_format="dataframe")
+        return self.extract_cached(url, self.download_url,
+                                   lambda filepath: self.parse_pdf(filepath, max_workers, pages_per_batch))
 
-        # Convert to Pandas dataframe
-        df = extracted_data[0]
-        
-        return df 
+    @classmethod
+    def parse_pdf(cls, filepath: str, max_workers: int = None, pages_per_batch: int = None) -> pd.DataFrame:
+        '''
+        Extract the table spanning the pages of a local PDF file to a pandas DataFrame.
+
+        The pages are split into batches of consecutive pages, which are extracted in parallel worker processes
+        (each running its own tabula JVM), and the tables of every page are concatenated in page order. The worker
+        processes are started by a fork server (or spawned), as forking a process running threads can deadlock.
+
+        Parameters:
+        ----------
+        filepath: str
+            Path of the PDF file
+        max_workers: int
+            Number of worker processes (default: number of CPUs)
+        pages_per_batch: int
+            Number of pages extracted by each call to tabula (default: pages split evenly between the workers).
+            Each call starts a JVM, so batches should not be too small.
+        '''
+        num_pages = len(PdfReader(filepath).pages)
+        max_workers = max_workers or os.cpu_count()
+        pages_per_batch = pages_per_batch or -(-num_pages // max_workers)
+        page_ranges = [f'{first_page}-{min(first_page + pages_per_batch - 1, num_pages)}'
+                       for first_page in range(1, num_pages + 1, pages_per_batch)]
+
+        # Single batch: no need for worker processes
+        if len(page_ranges) == 1:
+            return cls.concat_pdf_tables(cls.read_pdf_pages(filepath, page_ranges[0]))
+
+        # The workers are not forked, as the PDF may be parsed from the threads of the pipeline
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(page_ranges)),
+                                 mp_context=multiprocessing.get_context(start_method)) as executor:
+            batches = executor.map(cls.read_pdf_pages, [filepath] * len(page_ranges), page_ranges)
+            tables = [table for batch in batches for table in batch]
+
+        return cls.concat_pdf_tables(tables)
+
+    @staticmethod
+    def read_pdf_pages(filepath: str, pages: str) -> List[pd.DataFrame]:
+        '''
+        Extract the tables of a range of pages (e.g. '1-10') of a local PDF file. The rows are read as they are,
+        without a header, and all the values are read as strings, so the result does not depend on the page where
+        each batch starts.
+        '''
+        return read_pdf(filepath, multiple_tables=True, pages=pages, output_format="dataframe",
+                        pandas_options={'header': None, 'dtype': str})
+
+    @staticmethod
+    def concat_pdf_tables(tables: List[pd.DataFrame]) -> pd.DataFrame:
+        '''
+        Concatenate the tables extracted from each page into a single DataFrame. The first row is the header,
+        and the header rows repeated on the following pages are removed.
+
+        The tables with a different number of columns than the first one are aligned to its columns if they only
+        differ by empty columns (e.g. a column split by tabula), and skipped with a warning otherwise, so a single
+        misread page does not abort the whole extraction.
+        '''
+        tables = [table for table in tables if len(table) > 0]
+        if not tables:
+            return pd.DataFrame()
+
+        num_columns = len(tables[0].columns)
+        aligned_tables = []
+        for table_index, table in enumerate(tables):
+            if len(table.columns) != num_columns:
+                table = table.dropna(axis=1, how='all')
+                if len(table.columns) != num_columns:
+                    print(f'PDF table {table_index} skipped: {len(table.columns)} non-empty columns instead of {num_columns}, '
+                          f'{len(table)} rows not extracted')
+                    continue
+            aligned_tables.append(table.set_axis(tables[0].columns, axis=1))
+
+        df = pd.concat(aligned_tables, ignore_index=True)
+        header = df.iloc[0]
+
+        # Remove the header rows
+        is_header = (df == header).all(axis=1).to_numpy()
+        df = df[~is_header].reset_index(drop=True)
+        df.columns = header.to_list()
+
+        return df
+
+    def extract_cached(self, url: str, download_function: Callable[[str], dict], parse_function: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+        '''
+        Download the file from the URL to the cache if it changed (see download_url and download_s3_object), and
+        return its parsed DataFrame. If the file is unchanged, the DataFrame is read from the Parquet cache.
+        '''
+        cache_entry = download_function(url)
+
+        df = self.download_cache.read_dataframe(url)
+        if df is None:
+            df = parse_function(cache_entry['filepath'])
+            self.download_cache.write_dataframe(url, df)
+
+        return self.convert_dtype_backend(df)
+
+    def convert_dtype_backend(self, df: pd.DataFrame) -> pd.DataFrame:
+        '''
+        Convert the columns of the DataFrame to the dtype backend of the extractor, for the sources which cannot
+        be read with it directly (e.g. PDF tables, API responses, cached DataFrames).
+        '''
+        if self.dtype_backend is None:
+            return df
+
+        return df.convert_dtypes(dtype_backend=self.dtype_backend)
+
+    def download_url(self, url: str, max_retries: int = 3, backoff_factor: float = 0.5,
+                     timeout: Tuple[float, float] = (10, 60)) -> dict:
+        '''
+        Download a file over HTTP to the cache and return its cache entry. If the file is already cached, a
+        conditional GET is sent, and the file is only downloaded again if it changed.
+
+        Connection errors and timeouts, including a download stalled part way, are retried from the start with
+        exponential backoff (backoff_factor * 2^attempt seconds), as the API requests are (see request_api).
+
+        Parameters:
+        ----------
+        url: str
+            URL of the file
+        max_retries: int
+            Number of retries after the first failed attempt
+        backoff_factor: float
+            Base waiting time in seconds between retries
+        timeout: Tuple[float, float]
+            Time in seconds to connect to the server, and to wait for each read of the file, so a stalled download
+            is retried instead of blocking the pipeline
+
+        Returns:
+        -------
+        cache_entry: dict
+            Cache entry of the file (see DownloadCache)
+        '''
+        cache_entry = self.download_cache.get_entry(url)
+
+        headers = {}
+        if cache_entry is not None:
+            if cache_entry['etag']:
+                headers['If-None-Match'] = cache_entry['etag']
+            if cache_entry['last_modified']:
+                headers['If-Modified-Since'] = cache_entry['last_modified']
+
+        for attempt in range(max_retries + 1):
+            try:
+                with requests.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                    # Not modified: use the cached file
+                    if response.status_code == 304 and cache_entry is not None:
+                        return cache_entry
+
+                    response.raise_for_status()
+                    suffix = os.path.splitext(url.split('?')[0])[1]
+                    return self.download_cache.put_file(url, response.headers.get('ETag', ''), response.headers.get('Last-Modified', ''),
+                                                        response.iter_content(chunk_size=1024 * 1024), suffix)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == max_retries:
+                    raise
+                time.sleep(backoff_factor * (2 ** attempt))
     
     def retrieve_creds(self, filepath: str) -> dict:
         '''
@@ -80,15 +414,91 @@ class DataExtractor():
             creds = yaml.safe_load(file)
         return creds
     
+    def get_api_session(self, pool_size: int = 10) -> requests.Session:
+        '''
+        Returns the pooled HTTP session used for the store API requests. The session is created
+        on first use and keeps up to pool_size connections alive to the API host.
+        '''
+        with self._api_session_lock:
+            if self._api_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(self._api_stores_headers)
+                self._api_session = session
+
+        return self._api_session
+
+    def request_api(self, endpoint_url: str, max_retries: int = 3, backoff_factor: float = 0.5,
+                    timeout: float = 10) -> requests.Response:
+        '''
+        Send a GET request to the stores API through the pooled session, retrying failed requests.
+
+        Connection errors, timeouts and 5xx responses are retried with exponential backoff (backoff_factor * 2^attempt
+        seconds). A 429 (Too Many Requests) response pauses every worker sharing this extractor for the
+        time given in its 'Retry-After' header (or the backoff time if missing) before retrying.
+
+        Parameters:
+        ----------
+        endpoint_url: str
+            Full URL of the API endpoint
+        max_retries: int
+            Number of retries after the first failed attempt
+        backoff_factor: float
+            Base waiting time in seconds between retries
+        timeout: float
+            Time in seconds to connect to the API and to wait for each read of its response, so a stalled request
+            is retried instead of blocking its worker
+
+        Returns:
+        -------
+        response: requests.Response
+            Last response received from the API
+        '''
+        session = self.get_api_session()
+
+        for attempt in range(max_retries + 1):
+            # Wait if the API asked us to slow down
+            pause = self._api_paused_until - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+
+            backoff = backoff_factor * (2 ** attempt)
+            try:
+                response = session.get(endpoint_url, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == max_retries:
+                    raise
+                time.sleep(backoff)
+                continue
+
+            # Rate limited: pause all the requests for the time given by the API
+            if response.status_code == 429 and attempt < max_retries:
+                retry_after = response.headers.get('Retry-After')
+                try:
+                    wait = float(retry_after)
+                except (TypeError, ValueError):
+                    wait = backoff
+                self._api_paused_until = max(self._api_paused_until, time.monotonic() + wait)
+                continue
+
+            # Server error: retry with exponential backoff
+            if response.status_code >= 500 and attempt < max_retries:
+                time.sleep(backoff)
+                continue
+
+            add_bytes_transferred(len(response.content))
+            return response
+
     def list_number_of_stores(self) -> int:
         '''
         Returns the number of stores to extract. It should take in the number of stores endpoint and header dictionary as an argument.
         '''
         # Send a GET request to the API
         endpoint_url = f'{self._api_stores_base_url}/number_stores'
-        headers = self._api_stores_headers
 
-        response = requests.get(endpoint_url, headers=headers)
+        response = self.request_api(endpoint_url)
 
         # Check if the request was successful (status code 200)
         if response.status_code == 200:
@@ -107,9 +517,8 @@ class DataExtractor():
     def retrieve_store_data(self, store_id: int) -> pd.DataFrame:
         # Send a GET request to the API
         endpoint_url = f'{self._api_stores_base_url}/store_details/{store_id}'
-        headers = self._api_stores_headers
 
-        response = requests.get(endpoint_url, headers=headers)
+        response = self.request_api(endpoint_url)
 
         # Check if the request was successful (status code 200). If so, return data.
         if response.status_code == 200:
@@ -121,61 +530,108 @@ class DataExtractor():
             print(f"Response Text: {response.text}")
             raise requests.exceptions.RequestException("Request failed")
         
-    def retrieve_stores_data(self) -> pd.DataFrame:
+    def retrieve_stores_data(self, max_workers: int = 1) -> pd.DataFrame:
         '''
         Extracts and returns all the stores from the API in a pandas Dataframe format.
+
+        With max_workers > 1, the stores are requested concurrently by a bounded pool of threads
+        sharing one pooled HTTP session. The DataFrame is always returned in store_id order.
         '''
         # Get number of stores from API
         num_stores = self.list_number_of_stores()
 
-        # Loop through all stores and save the data
-        stores_data = []
-        for store_id in range(num_stores):
-            # Get store details and append to list
-            store_data = self.retrieve_store_data(store_id)
-            stores_data.append(store_data)
+        # Make sure the session keeps a connection alive for every worker
+        self.get_api_session(pool_size=max(max_workers, 10))
+
+        # Request all stores and save the data by store_id
+        stores_data = [None] * num_stores
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.retrieve_store_data, store_id): store_id for store_id in range(num_stores)}
+
+            for num_retrieved, future in enumerate(as_completed(futures), start=1):
+                stores_data[futures[future]] = future.result()
 
-            # Print progress
-            retrieval_progress_pct = round(((store_id + 1) / num_stores * 100))
-            sys.stdout.write(f'\rRetrieving data from stores... {retrieval_progress_pct}% ({store_id}/{num_stores})')
-            sys.stdout.flush()
+                # Print progress
+                retrieval_progress_pct = round((num_retrieved / num_stores * 100))
+                sys.stdout.write(f'\rRetrieving data from stores... {retrieval_progress_pct}% ({num_retrieved}/{num_stores})')
+                sys.stdout.flush()
 
         df_stores_data = pd.concat(stores_data)
-        return df_stores_data
+        return self.convert_dtype_backend(df_stores_data)
     
-    def extract_from_s3(self, s3_url: str) -> pd.DataFrame:
+    @staticmethod
+    def parse_s3_url(s3_url: str) -> Tuple[str, str]:
         '''
-        Download and extract the information from an AWS S3 bucket and return a pandas dataframe.
-        This is in the format: s3://{bucket}/{key} , where the file to be parsed must be a .csv or .json.
+        Returns the bucket and key of an S3 object, given its URL in the format s3://{bucket}/{key}
+        or https://{bucket}.s3.{region}.amazonaws.com/{key}.
         '''
-        # Parse url
         bucket = s3_url.split('/')[2]
         if '.' in bucket:
             bucket = bucket.split('.')[0]
 
         key = s3_url.split('/')[3]
-        download_dir = 's3_downloads'
-        download_filepath = f"{download_dir}/{key}"
 
-        # Check whether the specified path exists or not
-        isExist = os.path.exists(download_dir)
-        if not isExist:     
-            os.makedirs(download_dir)   # Create a new directory if it does not exist
-            print(f"Created a new directory to store S3 Bucket data: {download_dir}")
+        return bucket, key
 
-        # Load AWS credentials and S3 client
-        s3 = boto3.client('s3',
+    def get_s3_client(self):
+        '''
+        Returns an S3 client authenticated with the AWS credentials.
+        '''
+        return boto3.client('s3',
             aws_access_key_id=self._aws_access_key,
             aws_secret_access_key= self._aws_secret_key)
-        
-        # Download file
-        s3.download_file(bucket, key, download_filepath)
+
+    def get_s3_etag(self, s3_url: str) -> str:
+        '''
+        Returns the ETag of an S3 object, which changes whenever the object content changes.
+        Only the object metadata is requested (HEAD), the object is not downloaded.
+        '''
+        bucket, key = self.parse_s3_url(s3_url)
+        response = self.get_s3_client().head_object(Bucket=bucket, Key=key)
+
+        return response['ETag']
+
+    def download_s3_object(self, s3_url: str) -> dict:
+        '''
+        Download an S3 object to the cache and return its cache entry. If the object is already cached, a
+        conditional GET is sent, and the object is only downloaded again if its ETag changed.
+        '''
+        bucket, key = self.parse_s3_url(s3_url)
+        cache_entry = self.download_cache.get_entry(s3_url)
+
+        # Load AWS credentials and S3 client
+        s3 = self.get_s3_client()
+
+        try:
+            if cache_entry is not None:
+                response = s3.get_object(Bucket=bucket, Key=key, IfNoneMatch=cache_entry['etag'])
+            else:
+                response = s3.get_object(Bucket=bucket, Key=key)
+
+        except ClientError as ex:
+            # Not modified: use the cached file
+            if cache_entry is not None and ex.response['ResponseMetadata']['HTTPStatusCode'] == 304:
+                return cache_entry
+            raise
+
+        return self.download_cache.put_file(s3_url, response['ETag'], response['LastModified'].isoformat(),
+                                            response['Body'].iter_chunks(), os.path.splitext(key)[1])
+
+    def extract_from_s3(self, s3_url: str) -> pd.DataFrame:
+        '''
+        Download and extract the information from an AWS S3 bucket and return a pandas dataframe.
+        This is in the format: s3://{bucket}/{key} , where the file to be parsed must be a .csv or .json.
+
+        The object and the parsed DataFrame are cached, so an unchanged object is neither downloaded nor parsed again.
+        '''
+        # Parse url
+        bucket, key = self.parse_s3_url(s3_url)
 
         # Convert to pandas dataframe
         if key.split('.')[1] == 'csv':
-            return pd.read_csv(download_filepath)
+            return self.extract_cached(s3_url, self.download_s3_object, lambda filepath: pd.read_csv(filepath, **self._read_options))
         elif key.split('.')[1] == 'json':
-            return pd.read_json(download_filepath)
+            return self.extract_cached(s3_url, self.download_s3_object, lambda filepath: pd.read_json(filepath, **self._read_options))
         else:
             raise TypeError('Cannot parse file! The file format must be a .csv or .json')
 
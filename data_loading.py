@@ -0,0 +1,143 @@
+# Library imports
+from datetime import datetime
+from sqlalchemy import Column, DateTime, MetaData, String, Table, Text, delete, insert, select
+from typing import Any, Callable, List
+
+import json
+import pandas as pd
+
+# Project class imports
+from database_utils import DatabaseConnector
+from data_cleaning import DataCleaning
+from data_extraction import DataExtractor
+from table_schemas import TABLE_SCHEMAS
+
+
+class IncrementalLoader():
+    '''
+    Utility class to extract, clean and upsert only the new or changed rows of each data source, instead of
+    replacing every table on each run.
+
+    The state of each source (its watermark) is stored in the 'etl_watermarks' table of the target database:
+    - RDS tables: the highest key extracted so far
+    - S3 objects: the ETag of the object last loaded
+    - Stores API: a hash of the data of each store
+
+    Parameters:
+    ----------
+    extractor: DataExtractor
+        Utility class instance used to extract the data
+    cleaner: DataCleaning
+        Utility class instance used to clean the data
+    target_connector: DatabaseConnector
+        Connector to the database the data is uploaded to
+    '''
+    def __init__(self, extractor: DataExtractor, cleaner: DataCleaning, target_connector: DatabaseConnector) -> None:
+        self.extractor = extractor
+        self.cleaner = cleaner
+        self.target_connector = target_connector
+
+        # Table storing the watermark of each source
+        self.watermarks_table = Table(
+            'etl_watermarks', MetaData(),
+            Column('source', String(255), primary_key=True),
+            Column('watermark', Text),
+            Column('updated_at', DateTime),
+        )
+        self.watermarks_table.create(self.target_connector.engine, checkfirst=True)
+
+    # ------------- Watermarks -------------
+    def read_watermark(self, source: str) -> Any:
+        '''
+        Returns the watermark stored for the source, or None if the source was never loaded.
+        '''
+        query = select(self.watermarks_table.c.watermark).where(self.watermarks_table.c.source == source)
+        with self.target_connector.engine.connect() as connection:
+            watermark = connection.execute(query).scalar()
+
+        return json.loads(watermark) if watermark is not None else None
+
+    def write_watermark(self, source: str, watermark: Any):
+        '''
+        Store the watermark of the source. It must be JSON serialisable (NumPy scalars are converted).
+        '''
+        watermark_json = json.dumps(watermark, default=lambda value: value.item())
+
+        with self.target_connector.engine.begin() as connection:
+            connection.execute(delete(self.watermarks_table).where(self.watermarks_table.c.source == source))
+            connection.execute(insert(self.watermarks_table).values(source=source, watermark=watermark_json, updated_at=datetime.now()))
+
+    # ------------- Incremental loaders -------------
+    def load_rds_table(self, rds_connector: DatabaseConnector, source_table: str, target_table: str, key_column: str,
+                       target_key_columns: List[str], clean_function: Callable[[pd.DataFrame], pd.DataFrame], chunksize: int = 100000):
+        '''
+        Extract the rows of an RDS table with a key greater than the stored watermark, clean them and upsert
+        them into the target table. The watermark is updated after every chunk, so an interrupted run resumes
+        from the last chunk uploaded.
+        '''
+        source = f'rds:{source_table}'
+        watermark = self.read_watermark(source)
+        print(f'Loading rows of {source_table} with {key_column} > {watermark}...')
+
+        chunks = self.extractor.read_rds_table(rds_connector, source_table, chunksize=chunksize,
+                                               key_column=key_column, watermark=watermark)
+
+        num_rows = 0
+        for chunk in chunks:
+            if len(chunk) == 0:
+                continue
+
+            # Rows are read in key order, so the last one holds the new watermark. It is taken before cleaning,
+            # so the rejected rows are not extracted again on the next run.
+            chunk_watermark = chunk[key_column].iloc[-1]
+
+            self.target_connector.upsert_to_db(clean_function(chunk), target_table, target_key_columns,
+                                               column_types=TABLE_SCHEMAS.get(target_table))
+            self.write_watermark(source, chunk_watermark)
+            num_rows += len(chunk)
+
+        print(f'{num_rows} new rows extracted from {source_table}')
+
+    def load_s3_object(self, s3_url: str, target_table: str, target_key_columns: List[str],
+                       clean_function: Callable[[pd.DataFrame], pd.DataFrame], extract_function: Callable[[str], pd.DataFrame] = None):
+        '''
+        Extract, clean and upsert the data of an S3 object into the target table, only if the object changed
+        since the last load (i.e. its ETag is different). Otherwise, only a HEAD request is made.
+
+        By default, the object is extracted with DataExtractor.extract_from_s3. Other extraction methods taking
+        the URL (e.g. DataExtractor.retrieve_pdf_data) can be given as extract_function.
+        '''
+        source = f's3:{s3_url}'
+        etag = self.extractor.get_s3_etag(s3_url)
+        if etag == self.read_watermark(source):
+            print(f'{s3_url} is unchanged since the last load, skipping.')
+            return
+
+        extract_function = extract_function or self.extractor.extract_from_s3
+        df = clean_function(extract_function(s3_url))
+
+        self.target_connector.upsert_to_db(df, target_table, target_key_columns,
+                                           column_types=TABLE_SCHEMAS.get(target_table))
+        self.write_watermark(source, etag)
+
+    def load_stores(self, target_table: str, target_key_columns: List[str],
+                    clean_function: Callable[[pd.DataFrame], pd.DataFrame], max_workers: int = 16):
+        '''
+        Retrieve all the stores from the API, then clean and upsert only the stores whose data changed since the
+        last load, comparing a hash of each store's data with the stored one.
+        '''
+        source = 'api:store_details'
+        stored_hashes = self.read_watermark(source) or {}
+
+        df_stores = self.extractor.retrieve_stores_data(max_workers=max_workers).reset_index(drop=True)
+
+        # Hash the raw data of each store, identified by its index in the API
+        store_ids = df_stores['index'].astype(str)
+        store_hashes = pd.util.hash_pandas_object(df_stores.astype(str), index=False).astype(str)
+        changed = (store_ids.map(stored_hashes) != store_hashes).to_numpy()
+        print(f'\n{changed.sum()} of {len(df_stores)} stores are new or changed')
+
+        if changed.any():
+            self.target_connector.upsert_to_db(clean_function(df_stores[changed]), target_table, target_key_columns,
+                                               column_types=TABLE_SCHEMAS.get(target_table))
+        self.write_watermark(source, dict(zip(store_ids, store_hashes)))
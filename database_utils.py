@@ -1,9 +1,39 @@
 # Library imports
-from sqlalchemy import Engine, create_engine, inspect
+from sqlalchemy import URL, Connection, Engine, create_engine, inspect
+from sqlalchemy.exc import CompileError
+from sqlalchemy.types import TypeEngine
+from typing import Dict, Iterable, List, Union
+
+import io
+import os
+import threading
 
 import pandas as pd
 import yaml
 
+# Project class imports
+from metrics_utils import add_bytes_transferred
+
+
+# Marker written for NULL values in the CSV streamed through COPY, so that empty strings are kept as such
+COPY_NULL = '\\N'
+
+# Default settings of the connection pool of each engine, which can be overridden in the credentials yaml file
+POOL_DEFAULTS = {
+    'RDS_POOL_SIZE': 5,                         # Connections kept open in the pool
+    'RDS_MAX_OVERFLOW': 10,                     # Connections opened on top of the pool size when it is exhausted
+    'RDS_POOL_TIMEOUT': 30,                     # Seconds to wait for a connection when the pool is exhausted
+    'RDS_POOL_RECYCLE': 1800,                   # Seconds after which a connection is replaced, before the server drops it
+    'RDS_POOL_PRE_PING': True,                  # Check each connection is alive before using it
+    'RDS_STATEMENT_TIMEOUT_MS': None,           # Cancel statements running for longer (no limit by default)
+    'RDS_EXECUTEMANY_MODE': 'values_plus_batch',  # How psycopg2 sends executemany batches (e.g. the upserts)
+}
+
+# Engines shared by all the connectors of the process with the same database and pool settings:
+# {(process id, URL, settings): engine}. Engines are not shared with forked processes, which get their own.
+_engines: Dict[tuple, Engine] = {}
+_engines_lock = threading.Lock()
+
 
 class DatabaseConnector():
     '''
@@ -13,20 +43,35 @@ class DatabaseConnector():
     ----------
     credentials_filepath: str
         Path to the credentials yaml file
+    engine: Engine
+        Optional, already initialised engine to use instead of the one built from the credentials
+        (e.g. a local SQLite engine for testing)
 
     Methods:
     -------
     read_db_creds()
         Read the credentials yaml file and return a dictionary of the credentials.
     init_db_engine()
-        Initialise and return a database engine using the credentials input into the class.
+        Initialise and return a database engine using the credentials input into the class, with a connection pool.
+        Connectors with the same credentials share the same engine.
     list_db_tables()
         Prints the names of the different tables in each database schema. It also returns a dictionary containing each schemas' tables.
+    upload_to_db()
+        Upload a pandas dataframe to the database, in a table created with the given column types, using COPY
+        for PostgreSQL and multi-row inserts otherwise.
+    copy_to_db()
+        Bulk-load a pandas dataframe into a PostgreSQL table through COPY FROM STDIN.
+    upsert_to_db()
+        Insert new rows and update changed rows of a pandas dataframe into a database table, matching rows on key columns.
+    execute_sql_file()
+        Execute the SQL statements of a .sql file (e.g. the sql_schema/ scripts) in a single transaction.
+    explain_sql_file()
+        Returns the EXPLAIN ANALYZE query plan of the query of a .sql file (e.g. the sql_analysis/ queries).
     '''
-    def __init__(self, credentials_filepath: str) -> None:
+    def __init__(self, credentials_filepath: str = None, engine: Engine = None) -> None:
         self.credentials_filepath = credentials_filepath
-        self.credentials = self.read_db_creds()
-        self.engine = self.init_db_engine()
+        self.credentials = self.read_db_creds() if credentials_filepath is not None else {}
+        self.engine = engine if engine is not None else self.init_db_engine()
         self.db_tables = {}
         
     def read_db_creds(self) -> dict:
@@ -46,7 +91,10 @@ class DatabaseConnector():
     def init_db_engine(self) -> Engine:
         '''
         Read the credentials from the input filepath. Then, initialise and return 
-        an sqlalchemy database engine.
+        an sqlalchemy database engine, with the pool settings of the credentials (see POOL_DEFAULTS).
+
+        The engine is shared by all the connectors of the process with the same credentials, so connecting to
+        a database from several connectors (or threads) reuses the connections of a single pool.
 
         Returns:
         -------
@@ -60,16 +108,43 @@ class DatabaseConnector():
         user=self.credentials['RDS_USER']
         password=self.credentials['RDS_PASSWORD']
 
-        # Try to create engine
-        try: 
-            engine = create_engine(
-                url="postgresql://{0}:{1}@{2}:{3}/{4}".format(user, password, host, port, database)
-            )
-            print(f"Connection to the '{host}' for user '{user}' created successfully.")
-            return engine
+        # Build the URL from its parts, so special characters in the password are escaped
+        url = URL.create('postgresql+psycopg2', username=user, password=password, host=host, port=port, database=database)
+        settings = {key: self.credentials.get(key, default) for key, default in POOL_DEFAULTS.items()}
+        engine_key = (os.getpid(), url.render_as_string(hide_password=False), tuple(sorted(settings.items())))
+
+        # Try to create engine, unless one was already created for the same database and settings
+        with _engines_lock:
+            if engine_key in _engines:
+                return _engines[engine_key]
+
+            try: 
+                engine = create_engine(url, **self.engine_options(settings))
+                print(f"Connection to the '{host}' for user '{user}' created successfully.")
+                _engines[engine_key] = engine
+                return engine
+
+            except Exception as ex:
+                print("Connection could not be made due to the following error: \n", ex)
 
-        except Exception as ex:
-            print("Connection could not be made due to the following error: \n", ex)
+    @staticmethod
+    def engine_options(settings: dict) -> dict:
+        '''
+        Returns the create_engine keyword arguments of the pool settings.
+        '''
+        connect_args = {}
+        if settings['RDS_STATEMENT_TIMEOUT_MS'] is not None:
+            connect_args['options'] = f"-c statement_timeout={int(settings['RDS_STATEMENT_TIMEOUT_MS'])}"
+
+        return {
+            'pool_size': settings['RDS_POOL_SIZE'],
+            'max_overflow': settings['RDS_MAX_OVERFLOW'],
+            'pool_timeout': settings['RDS_POOL_TIMEOUT'],
+            'pool_recycle': settings['RDS_POOL_RECYCLE'],
+            'pool_pre_ping': settings['RDS_POOL_PRE_PING'],
+            'executemany_mode': settings['RDS_EXECUTEMANY_MODE'],
+            'connect_args': connect_args,
+        }
     
     def list_db_tables(self) -> dict:
         '''
@@ -99,25 +174,279 @@ class DatabaseConnector():
         
         return self.db_tables
     
-    def upload_to_db(self, pd_df: pd.DataFrame, table_name: str):
+    def upload_to_db(self, pd_df: Union[pd.DataFrame, Iterable[pd.DataFrame]], table_name: str, chunksize: int = None,
+                     column_types: Dict[str, TypeEngine] = None):
         '''
         Upload a pandas dataframe to the database. If the table exists, replace.
+        The table is created with the given column types (e.g. from table_schemas.TABLE_SCHEMAS) before the rows are
+        loaded, so it does not need to be cast afterwards.
+
+        On PostgreSQL, the rows are bulk-loaded through COPY FROM STDIN (see copy_to_db). On other databases,
+        they are inserted with executemany, which SQLAlchemy batches into multi-row INSERT statements.
 
         Parameters:
         ----------
-        pd_df: str
+        pd_df: pd.DataFrame or Iterable[pd.DataFrame]
+            Pandas DataFrame to upload to the database. It can also be an iterable of DataFrame chunks
+            (e.g. streamed from DataExtractor.read_rds_table), which are uploaded one at a time.
+        table_name: str
+            Table name to use when uploading to the database
+        chunksize: int
+            Optional, number of rows sent in each COPY or INSERT batch. By default, all rows are sent at once.
+        column_types: Dict[str, TypeEngine]
+            Optional, SQLAlchemy type of the columns of the table. The other columns get the type pandas infers.
+        '''
+        chunks = [pd_df] if isinstance(pd_df, pd.DataFrame) else pd_df
+
+        # Replace the table with the first chunk, then append the others
+        num_rows = 0
+        for chunk_id, chunk in enumerate(chunks):
+            if_exists = 'replace' if chunk_id == 0 else 'append'
+
+            if self.engine.dialect.name == 'postgresql':
+                self.copy_to_db(chunk, table_name, if_exists=if_exists, chunksize=chunksize, column_types=column_types)
+            else:
+                chunk.to_sql(
+                    name=table_name,
+                    con=self.engine,
+                    if_exists=if_exists,
+                    index=False,
+                    chunksize=chunksize,
+                    dtype=self.frame_column_types(chunk, column_types),
+                )
+            num_rows += len(chunk)
+
+        print(f'Table {table_name} uploaded successfully to database! ({num_rows} rows)')
+
+    def copy_to_db(self, pd_df: pd.DataFrame, table_name: str, if_exists: str = 'replace', chunksize: int = None,
+                   column_types: Dict[str, TypeEngine] = None):
+        '''
+        Bulk-load a pandas dataframe into a PostgreSQL table through COPY FROM STDIN, in CSV format.
+        The table is created with the given column types, and the same types as pandas to_sql would use for
+        the other columns. The whole upload runs in a single transaction. When the table is replaced, the
+        foreign keys referencing it are dropped first (see drop_referencing_foreign_keys).
+
+        Parameters:
+        ----------
+        pd_df: pd.DataFrame
             Pandas DataFrame to upload to the database
         table_name: str
             Table name to use when uploading to the database
+        if_exists: str
+            'replace' to drop and recreate the table if it exists, or 'append' to add the rows to it
+        chunksize: int
+            Optional, number of rows sent in each COPY statement. By default, all rows are sent at once.
+        column_types: Dict[str, TypeEngine]
+            Optional, SQLAlchemy type of the columns of the table
+        '''
+        quoted_table_name = '"{}"'.format(table_name.replace('"', '""'))
+        columns = ', '.join('"{}"'.format(str(column).replace('"', '""')) for column in pd_df.columns)
+        sql = f"COPY {quoted_table_name} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+
+        chunksize = chunksize or max(1, len(pd_df))
+
+        with self.engine.begin() as connection:
+            # Create the table from the given and the dataframe column types, without inserting any rows
+            if if_exists == 'replace':
+                self.drop_referencing_foreign_keys(connection, quoted_table_name)
+                connection.exec_driver_sql(f'DROP TABLE IF EXISTS {quoted_table_name}')
+            if if_exists == 'replace' or not inspect(connection).has_table(table_name):
+                connection.exec_driver_sql(pd.io.sql.get_schema(pd_df, table_name, con=connection,
+                                                                dtype=self.frame_column_types(pd_df, column_types)))
+
+            # Stream the rows as CSV through the raw DBAPI connection
+            for start in range(0, len(pd_df), chunksize):
+                self.copy_from_buffer(connection, sql, self.to_copy_csv(pd_df.iloc[start:start + chunksize]))
+
+    def upsert_to_db(self, pd_df: Union[pd.DataFrame, Iterable[pd.DataFrame]], table_name: str, key_columns: List[str],
+                     column_types: Dict[str, TypeEngine] = None):
+        '''
+        Insert or update the rows of a pandas dataframe into a database table, matching rows on key_columns.
+        If the table does not exist, it is created with the given column types. Otherwise, the rows are
+        bulk-loaded into a staging table and merged with INSERT ... ON CONFLICT, so only the rows of the
+        dataframe are written.
+
+        Parameters:
+        ----------
+        pd_df: pd.DataFrame or Iterable[pd.DataFrame]
+            Pandas DataFrame (or iterable of DataFrame chunks) with the new or changed rows
+        table_name: str
+            Table name to use when uploading to the database
+        key_columns: List[str]
+            Columns identifying a row (e.g. the primary key of the table)
+        column_types: Dict[str, TypeEngine]
+            Optional, SQLAlchemy type of the columns of the table
+        '''
+        chunks = [pd_df] if isinstance(pd_df, pd.DataFrame) else pd_df
+        quote = self.engine.dialect.identifier_preparer.quote
+
+        for chunk in chunks:
+            # Only the last version of each row can be merged in a single statement
+            chunk = chunk.drop_duplicates(subset=key_columns, keep='last')
+
+            # New table: upload as a whole
+            if not inspect(self.engine).has_table(table_name):
+                self.upload_to_db(chunk, table_name, column_types=column_types)
+                self.create_unique_index(table_name, key_columns)
+                continue
+
+            if len(chunk) == 0:
+                continue
+
+            # Bulk-load the rows into a staging table
+            staging_table_name = f'{table_name}_staging'
+            self.upload_to_db(chunk, staging_table_name, column_types=column_types)
+            self.create_unique_index(table_name, key_columns)
+
+            # Add the columns missing from the table (e.g. tables created before a column was added), with their staging type
+            table_column_types = {column['name']: column['type'] for column in inspect(self.engine).get_columns(table_name)}
+            staging_column_types = {column['name']: column['type'] for column in inspect(self.engine).get_columns(staging_table_name)}
+            missing_columns = [column for column in chunk.columns if column not in table_column_types]
+            if missing_columns:
+                with self.engine.begin() as connection:
+                    for column in missing_columns:
+                        column_type = staging_column_types[column].compile(dialect=self.engine.dialect)
+                        connection.exec_driver_sql(f'ALTER TABLE {quote(table_name)} ADD COLUMN {quote(column)} {column_type}')
+                        table_column_types[column] = staging_column_types[column]
+
+            # Cast the staging columns to the types of the table (e.g. tables created before their column types were given).
+            # SQLite converts the inserted values to the type affinity of the table itself, and its CAST would turn
+            # dates into numbers (e.g. '1991-01-02' into 1991).
+            select_columns = [quote(column) for column in chunk.columns]
+            if self.engine.dialect.name != 'sqlite':
+                for position, column in enumerate(chunk.columns):
+                    try:
+                        column_type = table_column_types[column].compile(dialect=self.engine.dialect)
+                        select_columns[position] = f'CAST({quote(column)} AS {column_type})'
+                    except (KeyError, CompileError):
+                        pass
+
+            columns = ', '.join(quote(column) for column in chunk.columns)
+            keys = ', '.join(quote(column) for column in key_columns)
+            updates = ', '.join(f'{quote(column)} = EXCLUDED.{quote(column)}' for column in chunk.columns if column not in key_columns)
+            on_conflict = f'DO UPDATE SET {updates}' if updates else 'DO NOTHING'
+
+            # Note: 'WHERE true' is needed by SQLite to parse ON CONFLICT after a SELECT
+            sql = (
+                f'INSERT INTO {quote(table_name)} ({columns}) '
+                f'SELECT {", ".join(select_columns)} FROM {quote(staging_table_name)} WHERE true '
+                f'ON CONFLICT ({keys}) {on_conflict}'
+            )
+            with self.engine.begin() as connection:
+                connection.exec_driver_sql(sql)
+                connection.exec_driver_sql(f'DROP TABLE {quote(staging_table_name)}')
+
+            print(f'Table {table_name} upserted successfully! ({len(chunk)} rows)')
+
+    @staticmethod
+    def frame_column_types(pd_df: pd.DataFrame, column_types: Dict[str, TypeEngine] = None) -> Dict[str, TypeEngine]:
+        '''
+        Returns the column types of the columns in the dataframe, or None if no column types are given.
+        '''
+        if not column_types:
+            return None
+        return {column: column_type for column, column_type in column_types.items() if column in pd_df.columns}
+
+    def create_unique_index(self, table_name: str, key_columns: List[str]):
+        '''
+        Create a unique index on the key columns of a table, needed by INSERT ... ON CONFLICT, unless the
+        columns are already the primary key or have a unique constraint or index.
+        '''
+        inspector = inspect(self.engine)
+
+        unique_column_sets = [inspector.get_pk_constraint(table_name)['constrained_columns']]
+        unique_column_sets += [constraint['column_names'] for constraint in inspector.get_unique_constraints(table_name)]
+        unique_column_sets += [index['column_names'] for index in inspector.get_indexes(table_name) if index['unique']]
+        if any(set(column_set) == set(key_columns) for column_set in unique_column_sets):
+            return
+
+        quote = self.engine.dialect.identifier_preparer.quote
+        index_name = quote(f'{table_name}_{"_".join(key_columns)}_key')
+        columns = ', '.join(quote(column) for column in key_columns)
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(f'CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {quote(table_name)} ({columns})')
+
+    def execute_sql_file(self, filepath: str):
+        '''
+        Execute the SQL statements of a .sql file in a single transaction.
+
+        Parameters:
+        ----------
+        filepath: str
+            Path to the .sql file
+        '''
+        with open(filepath, 'r') as file:
+            sql = file.read()
+
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(sql)
+
+        print(f'SQL file {filepath} executed successfully!')
+
+    def explain_sql_file(self, filepath: str) -> dict:
+        '''
+        Run the query of a .sql file with EXPLAIN ANALYZE and return its query plan (in the JSON format of
+        PostgreSQL), with the actual rows and time of each step. The query is run in a transaction that is rolled back.
+
+        Parameters:
+        ----------
+        filepath: str
+            Path to the .sql file, holding a single query
+        '''
+        with open(filepath, 'r') as file:
+            sql = file.read().strip().rstrip(';')
+
+        # Run on the driver cursor without parameters, so the '%' of the queries (e.g. modulo) are not placeholders
+        with self.engine.connect() as connection:
+            with connection.connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)\n{sql}')
+                plan = cursor.fetchone()[0]
+            connection.rollback()
+
+        return plan[0]
+
+    @staticmethod
+    def drop_referencing_foreign_keys(connection: Connection, quoted_table_name: str):
+        '''
+        Drop the foreign keys of other tables referencing a PostgreSQL table (e.g. the foreign keys of orders_table,
+        when a dimension table is replaced), which would make dropping the table fail. They are added back by
+        sql_schema/foreign_keys.sql once the tables are loaded.
+        '''
+        foreign_keys = connection.exec_driver_sql(
+            "SELECT conrelid::regclass::text, quote_ident(conname) FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = to_regclass(%(table_name)s)", {'table_name': quoted_table_name}).all()
+
+        for referencing_table_name, constraint_name in foreign_keys:
+            connection.exec_driver_sql(f'ALTER TABLE {referencing_table_name} DROP CONSTRAINT {constraint_name}')
+            print(f'Foreign key {constraint_name} of {referencing_table_name} dropped to replace {quoted_table_name}')
+
+    @staticmethod
+    def to_copy_csv(pd_df: pd.DataFrame) -> io.StringIO:
+        '''
+        Returns the rows of a pandas dataframe as CSV, in the format read by COPY FROM STDIN (see copy_to_db): without
+        header, the NULL values written as COPY_NULL, and the values with separators, quotes or line breaks quoted.
+        '''
+        buffer = io.StringIO()
+        pd_df.to_csv(buffer, index=False, header=False, na_rep=COPY_NULL)
+        buffer.seek(0)
+        return buffer
+
+    @staticmethod
+    def copy_from_buffer(connection: Connection, sql: str, buffer: io.StringIO):
+        '''
+        Execute a COPY FROM STDIN statement, reading the data from the buffer.
         '''
-        pd_df.to_sql(
-            name=table_name,
-            con=self.engine,
-            if_exists='replace',
-            index=False,
-        )
+        add_bytes_transferred(buffer.seek(0, io.SEEK_END))
+        buffer.seek(0)
 
-        print(f'Table {table_name} uploaded successfully to database!')
+        with connection.connection.cursor() as cursor:
+            if hasattr(cursor, 'copy_expert'):
+                # psycopg2
+                cursor.copy_expert(sql, buffer)
+            else:
+                # psycopg 3
+                with cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,157 @@
+# Library imports
+from sqlalchemy import MetaData, Table, select
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+import pandas as pd
+import threading
+
+# Project class imports
+from data_cleaning import RowFilter
+from database_utils import DatabaseConnector
+from quarantine_utils import QuarantineStore
+
+
+# Foreign keys of each table (see sql_schema/foreign_keys.sql): {table: {column: dimension table}}.
+# Each column references the column of the same name, the primary key of the dimension table.
+FOREIGN_KEYS: Dict[str, Dict[str, str]] = {
+    'orders_table': {
+        'card_number': 'dim_card_details',
+        'date_uuid': 'dim_date_times',
+        'product_code': 'dim_products',
+        'store_code': 'dim_store_details',
+        'user_uuid': 'dim_users',
+    },
+}
+
+
+def key_column(table_name: str) -> str:
+    '''
+    Returns the primary key column of a dimension table, referenced by the foreign keys of FOREIGN_KEYS.
+    '''
+    for foreign_keys in FOREIGN_KEYS.values():
+        for column_name, dimension_table in foreign_keys.items():
+            if dimension_table == table_name:
+                return column_name
+    raise ValueError(f"'{table_name}' is not referenced by any foreign key")
+
+
+class ReferentialIntegrity():
+    '''
+    Utility class to remove the orphan rows of a table (e.g. the orders of a card or a store removed by the
+    dimension cleaners) before it is uploaded, so the foreign keys of sql_schema/foreign_keys.sql can be validated
+    without looking for the orphans with anti-joins in the database.
+
+    The keys of each dimension table are added as its cleaned data is produced (or read from the database),
+    and kept as a hash set (a unique pd.Index), so each row of the table is checked in O(1), in one vectorized
+    pass per foreign key. The orphan rows of each foreign key are counted in orphan_counts, and added to the
+    quarantine, if given.
+
+    Parameters:
+    ----------
+    quarantine: QuarantineStore
+        Quarantine of the orphan rows, tagged with their foreign key (default: the orphan rows are dropped)
+
+    Methods:
+    -------
+    add_keys() / collect_keys() / read_keys()
+        Add the keys of a dimension table, from a DataFrame, from each chunk of a stream, or from the database.
+    filter_orphans() / filter_chunks()
+        Remove the rows of a table (or of each chunk of a table) referencing keys missing from a dimension table.
+    print_orphan_counts()
+        Print the number of orphan rows of each foreign key.
+    '''
+    def __init__(self, quarantine: QuarantineStore = None) -> None:
+        self.quarantine = quarantine
+
+        # Keys of each dimension table, as they are added, and their hash set, built on first use
+        self._keys: Dict[str, List[np.ndarray]] = {}
+        self._key_sets: Dict[str, pd.Index] = {}
+
+        # Orphan rows of each foreign key, by table: {table: {column: rows}}. Tables may be loaded by several threads.
+        self.orphan_counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    # ------------- Dimension keys -------------
+    def add_keys(self, table_name: str, df: pd.DataFrame):
+        '''
+        Add the keys of the cleaned rows of a dimension table (or of a chunk of it).
+        '''
+        keys = df[key_column(table_name)].dropna().to_numpy(dtype=object)
+        with self._lock:
+            self._keys.setdefault(table_name, []).append(keys)
+            self._key_sets.pop(table_name, None)
+
+    def collect_keys(self, chunks: Iterable[pd.DataFrame], table_name: str) -> Iterator[pd.DataFrame]:
+        '''
+        Lazily add the keys of each chunk of a dimension table streamed in chunks, yielding the chunks unchanged.
+        '''
+        for chunk in chunks:
+            self.add_keys(table_name, chunk)
+            yield chunk
+
+    def read_keys(self, connector: DatabaseConnector, table_name: str):
+        '''
+        Add the keys of a dimension table of the database (e.g. once the new rows of the incremental pipeline are upserted).
+        '''
+        table = Table(table_name, MetaData(), autoload_with=connector.engine)
+        with connector.engine.connect() as connection:
+            keys = connection.execute(select(table.c[key_column(table_name)])).scalars().all()
+
+        # The uuid columns are read as uuid.UUID objects, and compared with the cleaned data as strings
+        keys = [key if isinstance(key, str) else str(key) for key in keys]
+        self.add_keys(table_name, pd.DataFrame({key_column(table_name): pd.Series(keys, dtype=object)}))
+
+    def _key_set(self, table_name: str) -> pd.Index:
+        '''
+        Returns the hash set of the keys of a dimension table.
+        '''
+        with self._lock:
+            if table_name not in self._keys:
+                raise KeyError(f"The keys of '{table_name}' were not added")
+            if table_name not in self._key_sets:
+                self._key_sets[table_name] = pd.Index(np.concatenate(self._keys[table_name])).unique()
+            return self._key_sets[table_name]
+
+    # ------------- Orphan rows -------------
+    def filter_orphans(self, df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+        '''
+        Returns the rows of the table whose foreign keys all reference an existing key of their dimension table.
+        The orphan rows of each foreign key are counted separately, so a row referencing several missing keys
+        is counted by each of them.
+        '''
+        rows = RowFilter(df)
+        counts = {}
+        for column_name, dimension_table in FOREIGN_KEYS[table_name].items():
+            # NULL foreign keys do not reference any row, so they are not orphans (as in the database)
+            values = df[column_name]
+            referenced = values.isin(self._key_set(dimension_table)).to_numpy(dtype=bool) | values.isna().to_numpy()
+            counts[column_name] = int(np.count_nonzero(~referenced))
+            rows.keep_rows(column_name, referenced, reason=f'{column_name} not in {dimension_table}')
+
+        with self._lock:
+            table_counts = self.orphan_counts.setdefault(table_name, {})
+            for column_name, orphans in counts.items():
+                table_counts[column_name] = table_counts.get(column_name, 0) + orphans
+
+        if self.quarantine is not None:
+            self.quarantine.add(table_name, rows.rejected_rows())
+        return rows.apply()
+
+    def filter_chunks(self, chunks: Iterable[pd.DataFrame], table_name: str) -> Iterator[pd.DataFrame]:
+        '''
+        Lazily remove the orphan rows of each chunk of a table streamed in chunks.
+        '''
+        for chunk in chunks:
+            yield self.filter_orphans(chunk, table_name)
+
+    def print_orphan_counts(self):
+        '''
+        Print the number of orphan rows of each foreign key, by table.
+        '''
+        print('\n----- ORPHAN ROWS OF EACH FOREIGN KEY: -----')
+        with self._lock:
+            for table_name, table_counts in self.orphan_counts.items():
+                print(f'{table_name}:')
+                for column_name, orphans in table_counts.items():
+                    print(f'  {column_name + " -> " + FOREIGN_KEYS[table_name][column_name]:<40} {orphans:>10}')
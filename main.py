@@ -3,118 +3,303 @@ Main file to create connections to databases (i.e. AWS), extract/process data
 and upload to local database (i.e. PostgreSQL)
 '''
 
+# Library imports
+from datetime import datetime
+from typing import Any, Callable, Iterator, List
+
+import argparse
+import os
+import pandas as pd
+
 # Project class imports
 from database_utils import DatabaseConnector
 from data_cleaning import DataCleaning
 from data_extraction import DataExtractor
+from data_loading import IncrementalLoader
+from integrity_utils import ReferentialIntegrity
+from metrics_utils import MetricsRecorder
+from pipeline import PipelineRunner
+from quarantine_utils import QuarantineStore
+from reporting_utils import QueryPlanReport, SalesReporting
+from staging_utils import StagingArea
+from table_schemas import TABLE_SCHEMAS
 
+# Number of rows read, cleaned and uploaded at a time for the large RDS tables
+RDS_CHUNKSIZE = 100000
 
-if __name__ == '__main__':
+# Number of key ranges orders_table is split into, read concurrently over the pooled RDS connections
+RDS_PARTITIONS = 8
+
+# Sources
+CARD_DETAILS_URL = 'https://data-handling-public.s3.eu-west-1.amazonaws.com/card_details.pdf'
+PRODUCTS_URL = 's3://data-handling-public/products.csv'
+DATE_DETAILS_URL = 'https://data-handling-public.s3.eu-west-1.amazonaws.com/date_details.json'
+
+# Tables of the local database. They are created with their final column types (see table_schemas.py).
+DIM_TABLES = ['dim_users', 'dim_card_details', 'dim_store_details', 'dim_products', 'dim_date_times']
+
+
+def add_staged_tasks(pipeline: PipelineRunner, staging: StagingArea, table_name: str, source: str,
+                     extract_function: Callable[[], pd.DataFrame], clean_function: Callable[[pd.DataFrame], pd.DataFrame],
+                     load_function: Callable[[pd.DataFrame], Any], load_dependencies: List[str] = None):
     '''
-    Extract, Process and Upload Data
+    Add the extract, clean and load tasks of a table held in memory to the pipeline. The extracted and the cleaned
+    data are staged, and a resumed table starts from its last completed stage, skipping the previous tasks.
+    The load task also waits for the given tasks (e.g. dropping the foreign keys referencing the table).
     '''
-    # Create connection to the databases
-    connector_aws_rds = DatabaseConnector('db_creds_aws_rds.yaml')
-    connector_local = DatabaseConnector('db_creds_local.yaml')
+    resume_stage = staging.resume_stage(table_name)
+
+    if resume_stage == 'cleaned':
+        pipeline.add_task(f'{table_name}.clean', lambda: staging.read(table_name, 'cleaned'))
+    else:
+        if resume_stage == 'extracted':
+            pipeline.add_task(f'{table_name}.extract', lambda: staging.read(table_name, 'extracted'))
+        else:
+            pipeline.add_task(f'{table_name}.extract', lambda: staging.stage(extract_function(), table_name, 'extracted', source))
+        pipeline.add_task(f'{table_name}.clean', lambda df: staging.stage(clean_function(df), table_name, 'cleaned', source),
+                          [f'{table_name}.extract'])
+
+    pipeline.add_task(f'{table_name}.load', lambda df, *_: load_function(df), [f'{table_name}.clean'] + list(load_dependencies or []))
 
-    # Prepare instances of extraction and cleaning utility classes
-    extractor = DataExtractor('db_creds_aws_sso.yaml')
-    cleaner = DataCleaning()
-    
-    # ------------------ User Data ------------------
-    print('\n----- USER DATA: -----')
-
-    # Extract table data
-    read_table_name = 'legacy_users'
-    
-    print('Extracting user data from AWS database...')
-    df_user = extractor.read_rds_table(connector_aws_rds, read_table_name)
-    print('DONE \n')
-
-    # Clean the data
-    print('Cleaning data...')
-    df_user = cleaner.clean_user_data(df_user)
-    print('DONE \n')
-
-    # Upload dataframe as table to the local PostgreSQL database
-    print('Uploading dataframe to local database...')
-    connector_local.upload_to_db(df_user, 'dim_users')
-    
-    # ------------------ Card Data ------------------
-    print('\n----- CARD DATA: -----')
 
-    # Extract table data from PDF
-    pdf_url = 'https://data-handling-public.s3.eu-west-1.amazonaws.com/card_details.pdf'
-    
-    print('Extracting card table from PDF...')
-    df_card = extractor.retrieve_pdf_data(pdf_url)
-    print('DONE \n')
+def staged_chunks(staging: StagingArea, cleaner: DataCleaning, table_name: str, source: str,
+                  extract_function: Callable[[], Iterator[pd.DataFrame]],
+                  clean_function: Callable[[pd.DataFrame], pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    '''
+    Returns the cleaned chunks of a table streamed in chunks. The extracted and the cleaned chunks are staged as
+    they stream, and a resumed table starts from its last completed stage.
+    '''
+    resume_stage = staging.resume_stage(table_name)
+
+    if resume_stage == 'cleaned':
+        return staging.read_chunks(table_name, 'cleaned')
+    if resume_stage == 'extracted':
+        chunks = staging.read_chunks(table_name, 'extracted')
+    else:
+        chunks = staging.stage_chunks(extract_function(), table_name, 'extracted', source)
+
+    return staging.stage_chunks(cleaner.clean_chunks(chunks, clean_function), table_name, 'cleaned', source)
+
+
+def consume_staged(staging: StagingArea, chunks: Iterator[pd.DataFrame], table_name: str):
+    '''
+    Consume the cleaned chunks of a table streamed in chunks, to stage all of them without holding them in memory.
+    Raises a RuntimeError if the chunks could not be staged, as the table is then uploaded from its cleaned stage.
+    '''
+    for _ in chunks:
+        pass
 
-    # Clean the data
-    print('Cleaning data...')
-    df_card = cleaner.clean_card_data(df_card)
-    print('DONE \n')
+    if staging.read_manifest(table_name, 'cleaned') is None:
+        raise RuntimeError(f"The cleaned chunks of '{table_name}' could not be staged, so the table cannot be uploaded "
+                           "from its cleaned stage (see the staging errors above)")
 
-    # Upload dataframe as table to the local PostgreSQL database
-    print('Uploading dataframe to local database...')
-    connector_local.upload_to_db(df_card, 'dim_card_details')
+
+def build_full_pipeline(connector_aws_rds: DatabaseConnector, connector_local: DatabaseConnector,
+                        extractor: DataExtractor, cleaner: DataCleaning, staging: StagingArea, integrity: ReferentialIntegrity,
+                        max_workers: int, cleaning_workers: int = 1) -> PipelineRunner:
+    '''
+    Build the pipeline extracting and cleaning all the data from each source, replacing the tables of the local
+    database (created with their final column types), applying the sql_schema/ scripts (primary and foreign keys, and
+    indexes) once the tables are bulk-loaded, and rebuilding the sales aggregates of the reports (see SalesReporting).
+    The chunks of the large RDS tables are cleaned in row shards by up to cleaning_workers processes.
+    The extracted and cleaned data of each table are staged as Parquet (see StagingArea), to resume failed runs.
+    The orders referencing keys removed from the dimension tables are removed before the upload (see ReferentialIntegrity).
+    '''
+    pipeline = PipelineRunner(max_workers)
+
+    # ------------------ Database Schema ------------------
+    # The foreign keys of the previous run are dropped before the tables they reference are replaced
+    pipeline.add_task('drop_foreign_keys', lambda: connector_local.execute_sql_file('sql_schema/drop_foreign_keys.sql'))
+
+    # ------------------ User Data ------------------
+    # The table is streamed in chunks: each chunk is extracted, cleaned and uploaded in turn
+    pipeline.add_task('dim_users.load', lambda *_: connector_local.upload_to_db(
+        integrity.collect_keys(staged_chunks(staging, cleaner, 'dim_users', 'legacy_users',
+                                             lambda: extractor.read_rds_table(connector_aws_rds, 'legacy_users', chunksize=RDS_CHUNKSIZE),
+                                             lambda df: cleaner.clean_parallel(df, 'clean_user_data', cleaning_workers)),
+                               'dim_users'),
+        'dim_users', column_types=TABLE_SCHEMAS['dim_users']), ['drop_foreign_keys'])
+
+    # ------------------ Card Data ------------------
+    add_staged_tasks(pipeline, staging, 'dim_card_details', CARD_DETAILS_URL,
+                     lambda: extractor.retrieve_pdf_data(CARD_DETAILS_URL), cleaner.clean_card_data,
+                     lambda df: connector_local.upload_to_db(df, 'dim_card_details', column_types=TABLE_SCHEMAS['dim_card_details']),
+                     ['drop_foreign_keys'])
 
     # ------------------ Store Data ------------------
-    print('\n----- STORE DATA: -----')
-
-    # Retrieve data from all stores from API  
-    print('Retrieving store data through API...')
-    df_stores = extractor.retrieve_stores_data()
-    
-    # Clean stores data
-    print('\nCleaning data...')
-    df_stores = cleaner.called_clean_store_data(df_stores)
-    
-    # Upload dataframe as table to the local PostgreSQL database
-    print('\nUploading dataframe to local database...')
-    connector_local.upload_to_db(df_stores, 'dim_store_details')
+    add_staged_tasks(pipeline, staging, 'dim_store_details', 'stores API',
+                     lambda: extractor.retrieve_stores_data(max_workers=16), cleaner.called_clean_store_data,
+                     lambda df: connector_local.upload_to_db(df, 'dim_store_details', column_types=TABLE_SCHEMAS['dim_store_details']),
+                     ['drop_foreign_keys'])
 
     # ------------------ Product Data ------------------
-    print('\n----- PRODUCT DATA: -----')
-
-    # Retrieve data for products from S3 Bucket 
-    print('Extracting product data from S3 Bucket...')
-    df_products = extractor.extract_from_s3('s3://data-handling-public/products.csv')
-    
-    # Clean products data
-    print('\nCleaning data...')
-    df_products = cleaner.clean_products_data(df_products)
-
-    # Upload dataframe as table to the local PostgreSQL database
-    print('\nUploading dataframe to local database...')
-    connector_local.upload_to_db(df_products, 'dim_products')
-    
+    add_staged_tasks(pipeline, staging, 'dim_products', PRODUCTS_URL,
+                     lambda: extractor.extract_from_s3(PRODUCTS_URL), cleaner.clean_products_data,
+                     lambda df: connector_local.upload_to_db(df, 'dim_products', column_types=TABLE_SCHEMAS['dim_products']),
+                     ['drop_foreign_keys'])
+
+    # ------------------ Event Dates Data ------------------
+    add_staged_tasks(pipeline, staging, 'dim_date_times', DATE_DETAILS_URL,
+                     lambda: extractor.extract_from_s3(DATE_DETAILS_URL), cleaner.clean_dates_data,
+                     lambda df: connector_local.upload_to_db(df, 'dim_date_times', column_types=TABLE_SCHEMAS['dim_date_times']),
+                     ['drop_foreign_keys'])
+
+    # ------------------ Referential Integrity ------------------
+    # The keys of the cleaned dimension tables held in memory (the keys of dim_users are added as it streams)
+    memory_dim_tables = [table_name for table_name in DIM_TABLES if table_name != 'dim_users']
+    pipeline.add_task('dimension_keys', lambda *dfs: [integrity.add_keys(table_name, df) for table_name, df in zip(memory_dim_tables, dfs)],
+                      [f'{table_name}.clean' for table_name in memory_dim_tables])
+
     # ------------------ Orders Data ------------------
-    print('\n----- ORDERS DATA: -----')
+    # The table is read in key ranges over concurrent connections, and each range is cleaned and staged as soon as it is
+    # read, while the dimension tables are loaded. The orders referencing keys removed from the dimension tables are then
+    # removed as the staged orders are uploaded, so the foreign keys can be validated.
+    pipeline.add_task('orders_table.clean', lambda: consume_staged(staging,
+        staged_chunks(staging, cleaner, 'orders_table', 'orders_table',
+                      lambda: extractor.read_rds_partitions(connector_aws_rds, 'orders_table', 'index', RDS_PARTITIONS),
+                      lambda df: cleaner.clean_parallel(df, 'clean_orders_data', cleaning_workers)),
+        'orders_table'))
+    pipeline.add_task('orders_table.load', lambda *_: connector_local.upload_to_db(
+        integrity.filter_chunks(staging.read_chunks('orders_table', 'cleaned'), 'orders_table'),
+        'orders_table', column_types=TABLE_SCHEMAS['orders_table']),
+                      ['orders_table.clean', 'dimension_keys', 'dim_users.load'])
 
-    # Extract orders data from RDS
-    print('Extracting orders data from AWS database...')
-    df_orders = extractor.read_rds_table(connector_aws_rds, 'orders_table')
+    # ------------------ Database Schema ------------------
+    # The tables are created with their final column types, so the keys only need all the tables to be loaded
+    dim_load_tasks = [f'{table_name}.load' for table_name in DIM_TABLES]
+    pipeline.add_task('primary_keys', lambda *_: connector_local.execute_sql_file('sql_schema/primary_keys.sql'), dim_load_tasks)
+    # The foreign keys are added NOT VALID, then validated in a separate step, which does not block the tables
+    pipeline.add_task('foreign_keys', lambda *_: connector_local.execute_sql_file('sql_schema/foreign_keys.sql'),
+                      ['primary_keys', 'orders_table.load'])
+    pipeline.add_task('validate_foreign_keys', lambda *_: connector_local.execute_sql_file('sql_schema/validate_foreign_keys.sql'),
+                      ['foreign_keys'])
 
-    # Clean orders data
-    print('\nCleaning data...')
-    df_orders = cleaner.clean_orders_data(df_orders)
+    pipeline.add_task('indexes', lambda *_: connector_local.execute_sql_file('sql_schema/indexes.sql'),
+                      ['dim_date_times.load', 'orders_table.load'])
 
-    # Upload dataframe as table to the local PostgreSQL database
-    print('\nUploading dataframe to local database...')
-    connector_local.upload_to_db(df_orders, 'orders_table')
+    # ------------------ Sales Aggregates ------------------
+    # orders_table was replaced, so the aggregates of the sales reports are rebuilt
+    pipeline.add_task('sales_aggregates', lambda *_: SalesReporting(connector_local).refresh(full=True), ['validate_foreign_keys'])
 
-    # ------------------ Event Dates Data ------------------
-    print('\n----- EVENT DATES DATA: -----')
+    return pipeline
+
+
+def add_query_plans_task(pipeline: PipelineRunner, connector_local: DatabaseConnector, filepath: str):
+    '''
+    Add a task running each query of sql_analysis/ with EXPLAIN ANALYZE once every other task is done, printing the
+    indexes each query uses and writing the query plans to a JSON file (see QueryPlanReport).
+    '''
+    def explain_queries(*_):
+        report = QueryPlanReport(connector_local)
+        report.run('sql_analysis')
+        report.print_summary()
+        report.write_json(filepath)
+
+    pipeline.add_task('query_plans', explain_queries, list(pipeline.tasks))
+
+
+def build_incremental_pipeline(connector_aws_rds: DatabaseConnector, connector_local: DatabaseConnector,
+                               extractor: DataExtractor, cleaner: DataCleaning, integrity: ReferentialIntegrity,
+                               max_workers: int) -> PipelineRunner:
+    '''
+    Build the pipeline extracting, cleaning and upserting only the new or changed rows of each source into the
+    local database. Each source is a single task, and the new orders are upserted once the dimension tables are, so
+    the orders referencing keys missing from them can be removed (see ReferentialIntegrity). The new orders are then
+    added to the sales aggregates of the reports (see SalesReporting).
+    '''
+    loader = IncrementalLoader(extractor, cleaner, connector_local)
+    pipeline = PipelineRunner(max_workers)
+
+    pipeline.add_task('dim_users.load', lambda: loader.load_rds_table(
+        connector_aws_rds, 'legacy_users', 'dim_users', 'index', ['user_uuid'], cleaner.clean_user_data, RDS_CHUNKSIZE))
+    pipeline.add_task('dim_card_details.load', lambda: loader.load_s3_object(
+        CARD_DETAILS_URL, 'dim_card_details', ['card_number'], cleaner.clean_card_data, extractor.retrieve_pdf_data))
+    pipeline.add_task('dim_store_details.load', lambda: loader.load_stores(
+        'dim_store_details', ['store_code'], cleaner.called_clean_store_data))
+    pipeline.add_task('dim_products.load', lambda: loader.load_s3_object(
+        PRODUCTS_URL, 'dim_products', ['product_code'], cleaner.clean_products_data))
+    pipeline.add_task('dim_date_times.load', lambda: loader.load_s3_object(
+        DATE_DETAILS_URL, 'dim_date_times', ['date_uuid'], cleaner.clean_dates_data))
+
+    # The keys of the dimension tables, with the rows upserted by this run
+    dim_load_tasks = [f'{table_name}.load' for table_name in DIM_TABLES]
+    pipeline.add_task('dimension_keys', lambda *_: [integrity.read_keys(connector_local, table_name) for table_name in DIM_TABLES],
+                      dim_load_tasks)
+    pipeline.add_task('orders_table.load', lambda *_: loader.load_rds_table(
+        connector_aws_rds, 'orders_table', 'orders_table', 'index', ['index'],
+        lambda df: integrity.filter_orphans(cleaner.clean_orders_data(df), 'orders_table'), RDS_CHUNKSIZE),
+                      ['dimension_keys'])
+
+    # The indexes of the analysis queries are only created if missing
+    pipeline.add_task('indexes', lambda *_: connector_local.execute_sql_file('sql_schema/indexes.sql'),
+                      ['dim_date_times.load', 'orders_table.load'])
+
+    # Only the new orders are added to the aggregates of the sales reports
+    load_tasks = [task_name for task_name in pipeline.tasks if task_name.endswith('.load')]
+    pipeline.add_task('sales_aggregates', lambda *_: SalesReporting(connector_local).refresh(), load_tasks)
+
+    return pipeline
+
+
+if __name__ == '__main__':
+    '''
+    Extract, Process and Upload Data
+    '''
+    parser = argparse.ArgumentParser(description='Extract, clean and upload the retail data to the local database.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only load the rows that are new or changed since the last run, instead of replacing every table')
+    parser.add_argument('--workers', type=int, default=6,
+                        help='Maximum number of pipeline tasks running in parallel')
+    parser.add_argument('--cleaning-workers', type=int, default=1,
+                        help='Number of processes cleaning the large RDS tables (legacy_users and orders_table) in row shards')
+    parser.add_argument('--resume', action='store_true',
+                        help='Resume each table from the last stage (extracted or cleaned data) staged by the previous run')
+    parser.add_argument('--staging-dir', type=str, default='staging',
+                        help='Directory where the extracted and cleaned data of each table are staged as Parquet')
+    parser.add_argument('--quarantine-dir', type=str, default='quarantine',
+                        help='Directory where the rows rejected by the cleaning rules (and the orphan orders) are written as Parquet')
+    parser.add_argument('--dtype-backend', choices=['numpy_nullable', 'pyarrow'], default=None,
+                        help="Dtype backend of the extracted data. 'pyarrow' uses less memory and speeds up the string validations")
+    parser.add_argument('--metrics', type=str, default=f'metrics/run_{datetime.now():%Y%m%d_%H%M%S}.json',
+                        help='JSON file where the metrics of each extraction, cleaning and upload stage are written')
+    parser.add_argument('--explain', action='store_true',
+                        help='Run each query of sql_analysis/ with EXPLAIN ANALYZE at the end of the run, to check the indexes they use')
+    parser.add_argument('--profile', type=str, default=None,
+                        help='Directory where a cProfile dump of each stage is written (disabled by default)')
+    args = parser.parse_args()
+
+    # Create connection to the databases
+    connector_aws_rds = DatabaseConnector('db_creds_aws_rds.yaml')
+    connector_local = DatabaseConnector('db_creds_local.yaml')
+
+    # Prepare instances of extraction and cleaning utility classes
+    extractor = DataExtractor('db_creds_aws_sso.yaml', dtype_backend=args.dtype_backend)
+    quarantine = QuarantineStore(args.quarantine_dir)
+    cleaner = DataCleaning(quarantine=quarantine)
+    staging = StagingArea(args.staging_dir, resume=args.resume)
+    integrity = ReferentialIntegrity(quarantine)
+
+    # Record the cost of every extraction, cleaning and upload method
+    recorder = MetricsRecorder(profile_dir=args.profile)
+    for instance in (connector_aws_rds, connector_local, extractor, cleaner, staging, integrity):
+        recorder.instrument(instance)
 
-    # Retrieve json for products from S3 Bucket 
-    print('Extracting dates data from S3 Bucket...')
-    df_dates = extractor.extract_from_s3('https://data-handling-public.s3.eu-west-1.amazonaws.com/date_details.json')
+    # Build and run the pipeline: independent sources run in parallel
+    if args.incremental:
+        pipeline = build_incremental_pipeline(connector_aws_rds, connector_local, extractor, cleaner, integrity, args.workers)
+    else:
+        pipeline = build_full_pipeline(connector_aws_rds, connector_local, extractor, cleaner, staging, integrity,
+                                       args.workers, args.cleaning_workers)
 
-    # Clean dates data
-    print('\nCleaning data...')
-    df_dates = cleaner.clean_dates_data(df_dates)
+    if args.explain:
+        add_query_plans_task(pipeline, connector_local, os.path.splitext(args.metrics)[0] + '_query_plans.json')
 
-    # Upload dataframe as table to the local PostgreSQL database
-    print('\nUploading dataframe to local database...')
-    connector_local.upload_to_db(df_dates, 'dim_date_times')
\ No newline at end of file
+    try:
+        pipeline.run()
+    finally:
+        cleaner.close_workers()
+        cleaner.print_rejection_counts()
+        integrity.print_orphan_counts()
+        quarantine.close()
+        recorder.print_summary()
+        recorder.write_json(args.metrics)
@@ -0,0 +1,328 @@
+# Library imports
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List
+
+import cProfile
+import functools
+import inspect
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows: the peak memory is not recorded
+    resource = None
+
+
+# Stack of the stages running in each thread, used to nest the stages and to attribute the bytes transferred
+_stage_stack = threading.local()
+
+
+def add_bytes_transferred(num_bytes: int):
+    '''
+    Add the bytes downloaded or uploaded to the stage running in the current thread. Does nothing if no stage
+    is being recorded, so the I/O methods can call it unconditionally.
+    '''
+    stack = getattr(_stage_stack, 'stages', None)
+    if stack:
+        stack[-1]['bytes_transferred'] += num_bytes
+
+
+def count_rows(value: Any) -> int:
+    '''
+    Returns the number of rows of a DataFrame or Series, or None for any other value.
+    '''
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+
+def peak_rss_mb() -> float:
+    '''
+    Returns the peak resident memory of the process so far in MB, or None if it cannot be measured.
+    '''
+    if resource is None:
+        return None
+
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / 1024 ** 2 if sys.platform == 'darwin' else peak_rss / 1024
+
+
+class MetricsRecorder():
+    '''
+    Utility class to record the cost of each stage (i.e. each call to a method) of the extraction, cleaning
+    and upload, and to write them as a JSON file for each run.
+
+    For each stage, the following metrics are recorded:
+    - wall_time_s and cpu_time_s: wall-clock time and CPU time of the thread running the stage
+      (the time spent in worker threads or processes started by the stage is not included in the CPU time)
+    - peak_rss_mb: peak resident memory of the process at the end of the stage
+    - rows_in and rows_out: rows of the first DataFrame argument and of the returned DataFrame
+      (or of all the chunks, for methods returning an iterator of DataFrames)
+    - bytes_transferred: bytes downloaded or uploaded (see add_bytes_transferred)
+
+    Stages called by other stages (e.g. the validators called by clean_user_data) are recorded too, with
+    the name of their parent stage.
+
+    Parameters:
+    ----------
+    profile_dir: str
+        Optional directory where a cProfile dump (.prof) of each stage is written, with the statistics of all
+        its calls. Only the top-level stages of each thread are profiled, as the profilers cannot be nested.
+
+    Methods:
+    -------
+    instrument()
+        Record every public method of an object (e.g. a DataExtractor instance).
+    record()
+        Context manager recording a block of code as a stage.
+    write_json()
+        Write the recorded stages of the run to a JSON file.
+    print_summary()
+        Print the total cost and rows dropped by each stage.
+    '''
+    def __init__(self, profile_dir: str = None) -> None:
+        self.profile_dir = profile_dir
+        self.run_started_at = datetime.now()
+        self.stages: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+        # Profiler of each stage in each thread: {(stage name, thread id): profiler}
+        self._profilers: Dict[tuple, cProfile.Profile] = {}
+
+    # ------------- Recording -------------
+    def instrument(self, obj: Any) -> Any:
+        '''
+        Replace every public method of the object by a wrapper recording each call as a stage named
+        '{class name}.{method name}'. The object is modified in place and returned.
+        '''
+        class_name = type(obj).__name__
+        for name, attribute in inspect.getmembers(type(obj)):
+            if name.startswith('_') or isinstance(attribute, property) or not callable(getattr(obj, name)):
+                continue
+            setattr(obj, name, self.wrap(getattr(obj, name), f'{class_name}.{name}'))
+
+        return obj
+
+    def wrap(self, function: Callable, stage_name: str) -> Callable:
+        '''
+        Returns a wrapper of the function recording each call as a stage. If the function returns an iterator
+        (e.g. chunks of a table), the stage is recorded when the iterator is exhausted, and it includes the time
+        spent producing every item.
+        '''
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            rows_in = next((count_rows(arg) for arg in args if count_rows(arg) is not None), None)
+
+            stage = self.start_stage(stage_name, rows_in)
+            try:
+                result = function(*args, **kwargs)
+            except Exception as ex:
+                self.end_stage(stage, error=ex)
+                raise
+
+            if inspect.isgenerator(result):
+                self.end_stage(stage, pause=True)
+                return self.wrap_iterator(result, stage)
+
+            self.end_stage(stage, rows_out=count_rows(result))
+            return result
+
+        return wrapper
+
+    def wrap_iterator(self, iterator: Iterator, stage: dict) -> Iterator:
+        '''
+        Yield the items of the iterator, adding the time spent producing each one to the stage.
+        '''
+        rows_out = 0
+        while True:
+            self.resume_stage(stage)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.end_stage(stage, rows_out=rows_out)
+                return
+            except Exception as ex:
+                self.end_stage(stage, error=ex)
+                raise
+
+            rows_out += count_rows(item) or 0
+            self.end_stage(stage, pause=True)
+            yield item
+
+    @staticmethod
+    def new_stage(stage_name: str, rows_in: int = None) -> dict:
+        return {
+            'stage': stage_name,
+            'parent': None,
+            'depth': 0,
+            'thread': threading.current_thread().name,
+            'started_at': datetime.now().isoformat(),
+            'wall_time_s': 0.0,
+            'cpu_time_s': 0.0,
+            'peak_rss_mb': None,
+            'rows_in': rows_in,
+            'rows_out': None,
+            'rows_dropped': None,
+            'bytes_transferred': 0,
+            'error': None,
+        }
+
+    def start_stage(self, stage_name: str, rows_in: int = None) -> dict:
+        '''
+        Start recording a stage in the current thread, nested in the stage already running in the thread (if any).
+        '''
+        stage = self.new_stage(stage_name, rows_in)
+        stack = getattr(_stage_stack, 'stages', None) or []
+        if stack:
+            stage['parent'] = stack[-1]['stage']
+            stage['depth'] = stack[-1]['depth'] + 1
+
+        self.resume_stage(stage)
+        return stage
+
+    def resume_stage(self, stage: dict):
+        '''
+        Start (or restart, for iterators) the clocks of the stage and push it on the stack of the current thread.
+        '''
+        if not hasattr(_stage_stack, 'stages'):
+            _stage_stack.stages = []
+        _stage_stack.stages.append(stage)
+
+        stage['_wall_start'] = time.perf_counter()
+        stage['_cpu_start'] = time.thread_time()
+
+        # Only the top-level stages of each thread are profiled, as the profilers cannot be nested
+        if self.profile_dir and len(_stage_stack.stages) == 1:
+            with self._lock:
+                profiler_key = (stage['stage'], threading.get_ident())
+                profiler = self._profilers.setdefault(profiler_key, cProfile.Profile())
+            try:
+                profiler.enable()
+                stage['_profiler'] = profiler
+            except ValueError:
+                # From Python 3.12, a single profiler can be enabled at a time in the whole process
+                pass
+
+    def end_stage(self, stage: dict, rows_out: int = None, error: Exception = None, pause: bool = False):
+        '''
+        Stop the clocks of the stage and pop it from the stack of the current thread. Unless paused (iterators
+        waiting for the next item to be requested), the stage is complete and added to the recorded stages.
+        '''
+        stage['wall_time_s'] += time.perf_counter() - stage.pop('_wall_start')
+        stage['cpu_time_s'] += time.thread_time() - stage.pop('_cpu_start')
+        _stage_stack.stages.pop()
+
+        profiler = stage.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+
+        if pause:
+            return
+
+        stage['peak_rss_mb'] = peak_rss_mb()
+        stage['rows_out'] = rows_out
+        if stage['rows_in'] is not None and rows_out is not None:
+            stage['rows_dropped'] = stage['rows_in'] - rows_out
+        if error is not None:
+            stage['error'] = repr(error)
+
+        with self._lock:
+            self.stages.append(stage)
+
+    def record(self, stage_name: str):
+        '''
+        Context manager recording the block of code as a stage, e.g.:
+
+            with recorder.record('primary_keys'):
+                connector.execute_sql_file('sql_schema/primary_keys.sql')
+        '''
+        return _RecordedBlock(self, stage_name)
+
+    def write_profiles(self):
+        '''
+        Write the cProfile statistics of each stage to '{profile_dir}/{stage}.prof', merging the profiles of all
+        the threads. They can be read with pstats or snakeviz.
+        '''
+        with self._lock:
+            profilers = dict(self._profilers)
+
+        stage_profilers = {}
+        for (stage_name, _), profiler in profilers.items():
+            stage_profilers.setdefault(stage_name, []).append(profiler)
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        for stage_name, profilers in stage_profilers.items():
+            pstats.Stats(*profilers).dump_stats(os.path.join(self.profile_dir, f'{stage_name}.prof'))
+
+        print(f'Profiles of {len(stage_profilers)} stages written to {self.profile_dir}')
+
+    # ------------- Reporting -------------
+    def to_dict(self) -> dict:
+        '''
+        Returns the run information and its recorded stages, in the order they finished.
+        '''
+        with self._lock:
+            stages = list(self.stages)
+
+        return {
+            'run_started_at': self.run_started_at.isoformat(),
+            'run_ended_at': datetime.now().isoformat(),
+            'stages': stages,
+        }
+
+    def write_json(self, filepath: str):
+        '''
+        Write the recorded stages of the run to a JSON file, and the profiles of the stages if enabled.
+        '''
+        if os.path.dirname(filepath):
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        with open(filepath, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+        print(f'Metrics written to {filepath}')
+
+        if self.profile_dir:
+            self.write_profiles()
+
+    def print_summary(self):
+        '''
+        Print the number of calls, total wall and CPU time, and rows dropped of each stage, sorted by wall time.
+        '''
+        df = pd.DataFrame(self.to_dict()['stages'])
+        if df.empty:
+            return
+        df['rows_dropped'] = pd.to_numeric(df['rows_dropped'])
+
+        summary = df.groupby('stage').agg(calls=('stage', 'size'), wall_time_s=('wall_time_s', 'sum'),
+                                          cpu_time_s=('cpu_time_s', 'sum'), rows_dropped=('rows_dropped', 'sum'),
+                                          bytes_transferred=('bytes_transferred', 'sum'))
+
+        print('\n----- STAGE METRICS: -----')
+        print(summary.sort_values('wall_time_s', ascending=False).to_string(float_format='{:.3f}'.format))
+
+
+class _RecordedBlock():
+    '''
+    Context manager returned by MetricsRecorder.record().
+    '''
+    def __init__(self, recorder: MetricsRecorder, stage_name: str) -> None:
+        self.recorder = recorder
+        self.stage_name = stage_name
+        self.stage = None
+
+    def __enter__(self) -> dict:
+        self.stage = self.recorder.start_stage(self.stage_name)
+        return self.stage
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.recorder.end_stage(self.stage, rows_out=self.stage['rows_out'], error=exc_value)
@@ -0,0 +1,151 @@
+# Library imports
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List
+
+import time
+
+
+class PipelineTask():
+    '''
+    A step of the pipeline (e.g. extracting, cleaning or uploading a table), with the names of the
+    tasks it depends on. When run, the function receives the results of its dependencies as arguments,
+    in the order they were declared.
+    '''
+    def __init__(self, name: str, function: Callable, dependencies: List[str] = None) -> None:
+        self.name = name
+        self.function = function
+        self.dependencies = list(dependencies or [])
+
+        # Wall-clock times in seconds since the start of the pipeline, set when run
+        self.start_time = None
+        self.end_time = None
+
+    @property
+    def duration(self) -> float:
+        return self.end_time - self.start_time
+
+
+class PipelineRunner():
+    '''
+    Utility class to run the extract, clean and upload tasks of each data source as a dependency graph.
+    Each task starts as soon as all its dependencies are done, so the independent sources run in parallel
+    in a pool of threads.
+
+    Parameters:
+    ----------
+    max_workers: int
+        Maximum number of tasks running at the same time
+
+    Methods:
+    -------
+    add_task()
+        Add a task to the pipeline, with the names of the tasks it depends on.
+    run()
+        Run all the tasks and return their results.
+    print_report()
+        Print the wall-clock timings of each task and mark the critical path.
+    '''
+    def __init__(self, max_workers: int = 6) -> None:
+        self.max_workers = max_workers
+        self.tasks: Dict[str, PipelineTask] = {}
+
+    def add_task(self, name: str, function: Callable, dependencies: List[str] = None) -> PipelineTask:
+        '''
+        Add a task to the pipeline. The dependencies must already be in the pipeline, which keeps the graph acyclic.
+        '''
+        if name in self.tasks:
+            raise ValueError(f"Task '{name}' is already in the pipeline")
+
+        for dependency in dependencies or []:
+            if dependency not in self.tasks:
+                raise ValueError(f"Task '{name}' depends on unknown task '{dependency}'")
+
+        task = PipelineTask(name, function, dependencies)
+        self.tasks[name] = task
+        return task
+
+    def run(self) -> Dict[str, Any]:
+        '''
+        Run all the tasks, each one as soon as its dependencies are done, and return the result of each task.
+        If a task fails, the tasks depending on it are skipped, the other ones run to completion, and a
+        RuntimeError listing the failed tasks is raised at the end.
+        '''
+        results = {}
+        errors = {}
+        pending = dict(self.tasks)
+        running = {}
+        pipeline_start = time.perf_counter()
+
+        def run_task(task: PipelineTask) -> Any:
+            task.start_time = time.perf_counter() - pipeline_start
+            try:
+                return task.function(*[results[dependency] for dependency in task.dependencies])
+            finally:
+                task.end_time = time.perf_counter() - pipeline_start
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                # Skip the tasks depending on a failed or skipped task
+                for name, task in list(pending.items()):
+                    if any(dependency in errors for dependency in task.dependencies):
+                        errors[name] = 'skipped (dependency failed)'
+                        del pending[name]
+
+                # Start the tasks whose dependencies are all done
+                for name, task in list(pending.items()):
+                    if all(dependency in results for dependency in task.dependencies):
+                        running[executor.submit(run_task, task)] = name
+                        del pending[name]
+
+                if not running:
+                    break
+
+                # Wait for at least one task to finish
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                        print(f"[pipeline] Task '{name}' done in {self.tasks[name].duration:.2f} s")
+                    except Exception as ex:
+                        errors[name] = ex
+                        print(f"[pipeline] Task '{name}' failed: {ex}")
+
+        self.print_report()
+
+        if errors:
+            raise RuntimeError(f'Pipeline failed: {errors}')
+
+        return results
+
+    def critical_path(self) -> List[str]:
+        '''
+        Returns the names of the tasks on the critical path: the chain of dependencies, ending with the last task
+        to finish, where each task waited for the last of its dependencies to finish.
+        '''
+        finished = [task for task in self.tasks.values() if task.end_time is not None]
+        if not finished:
+            return []
+
+        task = max(finished, key=lambda task: task.end_time)
+        path = [task.name]
+        while task.dependencies:
+            task = max((self.tasks[dependency] for dependency in task.dependencies), key=lambda task: task.end_time)
+            path.append(task.name)
+
+        return path[::-1]
+
+    def print_report(self):
+        '''
+        Print the start, end and duration of each task, in seconds since the start of the pipeline.
+        Tasks on the critical path are marked with '*'.
+        '''
+        critical_path = set(self.critical_path())
+        finished = sorted((task for task in self.tasks.values() if task.end_time is not None), key=lambda task: task.start_time)
+
+        print('\n----- PIPELINE TIMINGS (s): -----')
+        print(f'  {"task":<35} {"start":>8} {"end":>8} {"duration":>9}')
+        for task in finished:
+            marker = '*' if task.name in critical_path else ' '
+            print(f'{marker} {task.name:<35} {task.start_time:>8.2f} {task.end_time:>8.2f} {task.duration:>9.2f}')
+        print('(* critical path)')
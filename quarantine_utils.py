@@ -0,0 +1,130 @@
+# Library imports
+from datetime import datetime
+from typing import Dict, List
+
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class QuarantineStore():
+    '''
+    Utility class to keep the rows rejected by the cleaning rules of each table (and the orphan rows, see
+    ReferentialIntegrity) in a compact Parquet file, instead of dropping them, so a change of format of a source
+    (e.g. a new weight unit or phone number format) can be diagnosed from the rejected rows, without extracting
+    the source again.
+
+    The rejected rows are kept as read from the source, with every value as a string, and tagged with the rule that
+    rejected them and the reason, in the '_rule' and '_reason' columns. They are buffered, and written in bulk as row
+    groups of '{quarantine_dir}/{table}/rejects_{run_id}.parquet', one file per table and run.
+
+    Parameters:
+    ----------
+    quarantine_dir: str
+        Directory of the quarantine files. If None, the rejected rows are only buffered (see pop_rows), e.g. by the
+        worker processes of DataCleaning.clean_parallel, which send them to the main process.
+    flush_rows: int
+        Number of buffered rows of a table written at once
+    compression: str
+        Parquet compression codec of the files
+
+    Methods:
+    -------
+    add()
+        Add the rejected rows of a table (e.g. RowFilter.rejected_rows()).
+    flush() / close()
+        Write the buffered rows of every table, and close the files.
+    '''
+    def __init__(self, quarantine_dir: str = 'quarantine', flush_rows: int = 100000, compression: str = 'zstd') -> None:
+        self.quarantine_dir = quarantine_dir
+        self.flush_rows = flush_rows
+        self.compression = compression
+        self.run_id = f'{datetime.now():%Y%m%d_%H%M%S}'
+
+        # Buffered rows of each table, the open file of each table, and the rows written to it
+        self._buffers: Dict[str, List[pd.DataFrame]] = {}
+        self._writers: Dict[str, pq.ParquetWriter] = {}
+        self.row_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filepath(self, table_name: str) -> str:
+        return os.path.join(self.quarantine_dir, table_name, f'rejects_{self.run_id}.parquet')
+
+    def add(self, table_name: str, df: pd.DataFrame):
+        '''
+        Add the rejected rows of a table, with their '_rule' and '_reason' columns. The rows of the table are
+        written once flush_rows of them are buffered.
+        '''
+        if df.empty:
+            return
+
+        with self._lock:
+            buffer = self._buffers.setdefault(table_name, [])
+            buffer.append(self.to_strings(df))
+            if self.quarantine_dir is not None and sum(len(frame) for frame in buffer) >= self.flush_rows:
+                self._write(table_name)
+
+    def pop_rows(self) -> Dict[str, pd.DataFrame]:
+        '''
+        Returns the buffered rows of each table, and empties the buffers.
+        '''
+        with self._lock:
+            rows = {table_name: pd.concat(buffer, ignore_index=True) for table_name, buffer in self._buffers.items() if buffer}
+            self._buffers = {}
+        return rows
+
+    def flush(self):
+        '''
+        Write the buffered rows of every table.
+        '''
+        if self.quarantine_dir is None:
+            return
+
+        with self._lock:
+            for table_name in list(self._buffers):
+                self._write(table_name)
+
+    def close(self):
+        '''
+        Write the buffered rows of every table and close the files, printing the number of rows of each table.
+        '''
+        self.flush()
+        with self._lock:
+            for writer in self._writers.values():
+                writer.close()
+            self._writers = {}
+
+            for table_name, num_rows in self.row_counts.items():
+                print(f'{num_rows} rejected rows of {table_name} quarantined in {self.filepath(table_name)}')
+
+    def _write(self, table_name: str):
+        '''
+        Write the buffered rows of a table as a row group of its file. Must be called holding the lock.
+        '''
+        buffer = self._buffers.pop(table_name, [])
+        if not buffer:
+            return
+        df = pd.concat(buffer, ignore_index=True)
+
+        writer = self._writers.get(table_name)
+        if writer is None:
+            os.makedirs(os.path.dirname(self.filepath(table_name)), exist_ok=True)
+            schema = pa.schema([(column_name, pa.string()) for column_name in df.columns])
+            writer = self._writers[table_name] = pq.ParquetWriter(self.filepath(table_name), schema, compression=self.compression)
+
+        # Every chunk of a table has the same columns, but they are aligned with the file in case they differ
+        df = df.reindex(columns=writer.schema.names)
+        writer.write_table(pa.Table.from_pandas(df, schema=writer.schema, preserve_index=False))
+        self.row_counts[table_name] = self.row_counts.get(table_name, 0) + len(df)
+
+    @staticmethod
+    def to_strings(df: pd.DataFrame) -> pd.DataFrame:
+        '''
+        Returns the rows with every value as a string (nulls are kept), so the rows of a source mixing types in a
+        column (e.g. numbers and strings) can be written with the same schema.
+        '''
+        return pd.DataFrame({str(column_name): df.iloc[:, position].astype(pd.StringDtype('pyarrow')).array
+                             for position, column_name in enumerate(df.columns)})
@@ -0,0 +1,288 @@
+# Library imports
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, Float, MetaData, SmallInteger, String, Table, func, select, text
+from typing import Dict, Iterator, List
+
+import json
+import os
+import pandas as pd
+import sys
+
+# Project class imports
+from database_utils import DatabaseConnector
+
+
+# Sales aggregated by year, month and store, with the type and country of each store. Every sales report
+# (see REPORTS) can be answered from it without joining orders_table with the dimension tables. The year and
+# month are cast, as they are strings in the dim_date_times tables loaded before they were cast to integers.
+AGGREGATE_SALES_SQL = '''
+INSERT INTO agg_sales (year, month, store_code, store_type, country_code, number_of_sales, product_quantity, total_sales)
+SELECT CAST(dates.year AS SMALLINT),
+    CAST(dates.month AS SMALLINT),
+    orders.store_code,
+    stores.store_type,
+    stores.country_code,
+    COUNT(*),
+    SUM(orders.product_quantity),
+    SUM(orders.product_quantity * products.product_price_in_gbp)
+FROM orders_table AS orders
+    JOIN dim_date_times AS dates ON orders.date_uuid = dates.date_uuid
+    JOIN dim_store_details AS stores ON orders.store_code = stores.store_code
+    JOIN dim_products AS products ON orders.product_code = products.product_code
+WHERE orders."index" <= :up_to_index {after_index_condition}
+GROUP BY dates.year, dates.month, orders.store_code, stores.store_type, stores.country_code
+ON CONFLICT (year, month, store_code) DO UPDATE SET
+    number_of_sales = agg_sales.number_of_sales + EXCLUDED.number_of_sales,
+    product_quantity = agg_sales.product_quantity + EXCLUDED.product_quantity,
+    total_sales = agg_sales.total_sales + EXCLUDED.total_sales
+'''
+
+# Sales reports of sql_analysis/, answered from the aggregated sales: {report name: (query, default parameters)}
+REPORTS = {
+    'sales_per_month': ('''
+        SELECT ROUND(CAST(SUM(total_sales) AS numeric), 2) AS total_sales,
+            month AS "month"
+        FROM agg_sales
+        GROUP BY month
+        ORDER BY total_sales DESC
+        LIMIT :limit
+    ''', {'limit': 6}),
+    'sales_per_month_year': ('''
+        SELECT ROUND(CAST(SUM(total_sales) AS numeric), 2) AS total_sales,
+            year AS "year",
+            month AS "month"
+        FROM agg_sales
+        GROUP BY year, month
+        ORDER BY total_sales DESC
+        LIMIT :limit
+    ''', {'limit': 10}),
+    'sales_per_store_type': ('''
+        WITH SALES AS (
+            SELECT store_type,
+                ROUND(CAST(SUM(total_sales) AS numeric), 2) AS total_sales
+            FROM agg_sales
+            GROUP BY store_type
+        )
+        SELECT store_type,
+            total_sales,
+            ROUND((total_sales / (SELECT SUM(total_sales) FROM SALES)) * 100, 2) AS "percentage_total(%)"
+        FROM SALES
+        ORDER BY total_sales DESC
+    ''', {}),
+    'sales_per_store_type_germany': ('''
+        SELECT ROUND(CAST(SUM(total_sales) AS numeric), 2) AS total_sales,
+            store_type,
+            country_code
+        FROM agg_sales
+        WHERE country_code = :country_code
+        GROUP BY store_type, country_code
+        ORDER BY total_sales DESC
+    ''', {'country_code': 'DE'}),
+    'sales_online': ('''
+        SELECT CAST(SUM(number_of_sales) AS BIGINT) AS numbers_of_sales,
+            CAST(SUM(product_quantity) AS BIGINT) AS product_quantity_count,
+            CASE
+                WHEN store_type = 'Web Portal' THEN 'Web'
+                ELSE 'Offline'
+            END AS location
+        FROM agg_sales
+        GROUP BY location
+    ''', {}),
+}
+
+
+class SalesReporting():
+    '''
+    Utility class to keep the sales aggregated by year, month and store in the 'agg_sales' table of the local
+    database, and to run the sales reports of sql_analysis/ against it, instead of joining orders_table with
+    the dimension tables on every report.
+
+    The aggregates are refreshed incrementally: only the orders with an index greater than the last one
+    aggregated (stored in the 'agg_sales_refresh' table) are added. As in the reports of sql_analysis/, the orders
+    are joined with their date, store and product, so the foreign keys of orders_table must be in place.
+
+    Parameters:
+    ----------
+    connector: DatabaseConnector
+        Connector to the local database
+
+    Methods:
+    -------
+    refresh()
+        Add the orders loaded since the last refresh to the aggregates, or rebuild them.
+    run_report()
+        Run one of the sales reports (see REPORTS) against the aggregates.
+    '''
+    def __init__(self, connector: DatabaseConnector) -> None:
+        self.connector = connector
+
+        self.metadata = MetaData()
+        self.aggregates_table = Table(
+            'agg_sales', self.metadata,
+            Column('year', SmallInteger, primary_key=True),
+            Column('month', SmallInteger, primary_key=True),
+            Column('store_code', String(12), primary_key=True),
+            Column('store_type', String(255)),
+            Column('country_code', String(3)),
+            Column('number_of_sales', BigInteger),
+            Column('product_quantity', BigInteger),
+            Column('total_sales', Float),
+        )
+        # Highest index of orders_table aggregated so far
+        self.refresh_table = Table(
+            'agg_sales_refresh', self.metadata,
+            Column('last_order_index', BigInteger),
+            Column('refreshed_at', DateTime),
+        )
+        self.metadata.create_all(self.connector.engine, checkfirst=True)
+
+    # ------------- Aggregates -------------
+    def refresh(self, full: bool = False) -> int:
+        '''
+        Add the orders loaded since the last refresh to the aggregates, in a single transaction, and return the
+        number of orders added. With full=True (e.g. after orders_table or a dimension table was replaced), the
+        aggregate tables are recreated, with their current column types, and rebuilt from every order.
+        '''
+        orders = Table('orders_table', MetaData(), autoload_with=self.connector.engine)
+
+        with self.connector.engine.begin() as connection:
+            last_order_index = None
+            if full:
+                self.metadata.drop_all(connection)
+                self.metadata.create_all(connection)
+            else:
+                last_order_index = connection.execute(select(self.refresh_table.c.last_order_index)).scalar()
+
+            new_orders = select(func.max(orders.c['index']), func.count())
+            if last_order_index is not None:
+                new_orders = new_orders.where(orders.c['index'] > last_order_index)
+            up_to_index, num_orders = connection.execute(new_orders).one()
+
+            if num_orders == 0:
+                print('No new orders to aggregate')
+                return 0
+
+            after_index_condition = 'AND orders."index" > :after_index' if last_order_index is not None else ''
+            connection.execute(text(AGGREGATE_SALES_SQL.format(after_index_condition=after_index_condition)),
+                               {'up_to_index': up_to_index, 'after_index': last_order_index})
+
+            connection.execute(self.refresh_table.delete())
+            connection.execute(self.refresh_table.insert().values(last_order_index=up_to_index, refreshed_at=datetime.now()))
+
+        print(f'{num_orders} orders added to the sales aggregates')
+        return num_orders
+
+    # ------------- Reports -------------
+    @staticmethod
+    def list_reports() -> List[str]:
+        return list(REPORTS)
+
+    def run_report(self, report_name: str, **params) -> pd.DataFrame:
+        '''
+        Run one of the sales reports against the aggregates, e.g.:
+
+            reporting.run_report('sales_per_store_type_germany', country_code='FR')
+
+        Parameters:
+        ----------
+        report_name: str
+            Name of the report (see REPORTS), as the query of sql_analysis/ it answers
+        params:
+            Parameters of the report overriding its defaults (e.g. limit, country_code)
+
+        Returns:
+        -------
+        pd.DataFrame
+            Rows of the report
+        '''
+        if report_name not in REPORTS:
+            raise ValueError(f"Unknown report '{report_name}', expected one of {self.list_reports()}")
+
+        query, default_params = REPORTS[report_name]
+        with self.connector.engine.connect() as connection:
+            return pd.read_sql(text(query), connection, params={**default_params, **params})
+
+
+class QueryPlanReport():
+    '''
+    Utility class to run each query of sql_analysis/ with EXPLAIN ANALYZE, to check which indexes the queries
+    use (and which tables they scan in full) once the keys and indexes of the star schema are created.
+    PostgreSQL only.
+
+    Parameters:
+    ----------
+    connector: DatabaseConnector
+        Connector to the local database
+
+    Methods:
+    -------
+    run()
+        Run every query of a directory with EXPLAIN ANALYZE.
+    print_summary()
+        Print the time, indexes used and tables scanned in full of each query.
+    write_json()
+        Write the query plans to a JSON file.
+    '''
+    def __init__(self, connector: DatabaseConnector) -> None:
+        self.connector = connector
+        self.plans: Dict[str, dict] = {}
+
+    def run(self, sql_dir: str = 'sql_analysis') -> Dict[str, dict]:
+        '''
+        Run every .sql query of the directory with EXPLAIN ANALYZE, and return their query plans by query name.
+        '''
+        for filename in sorted(os.listdir(sql_dir)):
+            if filename.endswith('.sql'):
+                self.plans[filename[:-len('.sql')]] = self.connector.explain_sql_file(os.path.join(sql_dir, filename))
+
+        return self.plans
+
+    @classmethod
+    def plan_nodes(cls, node: dict) -> Iterator[dict]:
+        '''
+        Yield a node of a query plan and all the nodes under it.
+        '''
+        yield node
+        for child in node.get('Plans', []):
+            yield from cls.plan_nodes(child)
+
+    def to_frame(self) -> pd.DataFrame:
+        '''
+        Returns the execution time, the indexes used and the tables scanned in full (sequential scans) of each query.
+        '''
+        rows = []
+        for query_name, plan in self.plans.items():
+            nodes = list(self.plan_nodes(plan['Plan']))
+            rows.append({
+                'query': query_name,
+                'execution_time_ms': plan['Execution Time'],
+                'indexes_used': ', '.join(sorted({node['Index Name'] for node in nodes if 'Index Name' in node})),
+                'seq_scans': ', '.join(sorted({node['Relation Name'] for node in nodes if node['Node Type'] == 'Seq Scan'})),
+            })
+
+        return pd.DataFrame(rows, columns=['query', 'execution_time_ms', 'indexes_used', 'seq_scans'])
+
+    def print_summary(self):
+        print('\n----- QUERY PLANS OF THE ANALYSIS QUERIES: -----')
+        print(self.to_frame().to_string(index=False, float_format='{:.1f}'.format))
+
+    def write_json(self, filepath: str):
+        '''
+        Write the query plan of each query to a JSON file.
+        '''
+        if os.path.dirname(filepath):
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        with open(filepath, 'w') as file:
+            json.dump(self.plans, file, indent=2)
+
+        print(f'Query plans written to {filepath}')
+
+
+if __name__ == '__main__':
+    reporting = SalesReporting(DatabaseConnector('db_creds_local.yaml'))
+    reporting.refresh()
+
+    for report_name in sys.argv[1:] or reporting.list_reports():
+        print(f'\n----- {report_name}: -----')
+        print(reporting.run_report(report_name).to_string(index=False))
@@ -1,26 +1,16 @@
 -- Get average time between sales per year
+-- The sales of each year are read in time order from the (year, sale_ts) index of dim_date_times
 WITH TIME_BETWEEN_SALES AS (
     SELECT dates.year,
-        LEAD(
-            TO_TIMESTAMP(
-                dates.year || '-' || dates.month || '-' || dates.day || ' ' || dates.timestamp,
-                'YYYY-MM-DD HH24:MI:SS.FF'
-            )
-        ) OVER (
+        LEAD(dates.sale_ts) OVER (
             PARTITION BY dates.year
-            ORDER BY TO_TIMESTAMP(
-                    dates.year || '-' || dates.month || '-' || dates.day || ' ' || dates.timestamp,
-                    'YYYY-MM-DD HH24:MI:SS.FF'
-                )
-        ) - TO_TIMESTAMP(
-            dates.year || '-' || dates.month || '-' || dates.day || ' ' || dates.timestamp,
-            'YYYY-MM-DD HH24:MI:SS.FF'
-        ) AS time_between_sales
+            ORDER BY dates.sale_ts
+        ) - dates.sale_ts AS time_between_sales
     FROM orders_table orders
     JOIN dim_date_times dates ON orders.date_uuid = dates.date_uuid
 ),
 AVG_TIME_BETWEEN_SALES AS (
-    SELECT CAST(year AS int),
+    SELECT year,
         AVG(time_between_sales) AS avg_time_between_sales
     FROM TIME_BETWEEN_SALES
     GROUP BY year
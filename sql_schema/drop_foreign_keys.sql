@@ -0,0 +1,10 @@
+-- Main source: orders_table
+-- Drop the foreign key constraints of the orders_table, so a new run can replace the tables they reference
+-- They are added back by foreign_keys.sql once the tables are loaded
+
+ALTER TABLE IF EXISTS orders_table
+    DROP CONSTRAINT IF EXISTS card_number_fkey,
+    DROP CONSTRAINT IF EXISTS date_uuid_fkey,
+    DROP CONSTRAINT IF EXISTS product_code_fkey,
+    DROP CONSTRAINT IF EXISTS store_code_fkey,
+    DROP CONSTRAINT IF EXISTS user_uuid_fkey;
\ No newline at end of file
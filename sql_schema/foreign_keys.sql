@@ -1,9 +1,11 @@
 -- Main source: orders_table
 -- Add the foreign key constraints to the orders_table
+-- The constraints are added as NOT VALID, so adding them does not scan orders_table while holding a lock
+-- blocking its writes. The existing rows are then checked by validate_foreign_keys.sql.
 
 ALTER TABLE orders_table
-    ADD CONSTRAINT card_number_fkey FOREIGN KEY (card_number) REFERENCES dim_card_details(card_number),
-    ADD CONSTRAINT date_uuid_fkey FOREIGN KEY (date_uuid) REFERENCES dim_date_times(date_uuid),
-    ADD CONSTRAINT product_code_fkey FOREIGN KEY (product_code) REFERENCES dim_products(product_code),
-    ADD CONSTRAINT store_code_fkey FOREIGN KEY (store_code) REFERENCES dim_store_details(store_code),
-    ADD CONSTRAINT user_uuid_fkey FOREIGN KEY (user_uuid) REFERENCES dim_users(user_uuid);
+    ADD CONSTRAINT card_number_fkey FOREIGN KEY (card_number) REFERENCES dim_card_details(card_number) NOT VALID,
+    ADD CONSTRAINT date_uuid_fkey FOREIGN KEY (date_uuid) REFERENCES dim_date_times(date_uuid) NOT VALID,
+    ADD CONSTRAINT product_code_fkey FOREIGN KEY (product_code) REFERENCES dim_products(product_code) NOT VALID,
+    ADD CONSTRAINT store_code_fkey FOREIGN KEY (store_code) REFERENCES dim_store_details(store_code) NOT VALID,
+    ADD CONSTRAINT user_uuid_fkey FOREIGN KEY (user_uuid) REFERENCES dim_users(user_uuid) NOT VALID;
\ No newline at end of file
@@ -0,0 +1,12 @@
+-- Main source: orders_table
+-- Add the indexes of the join paths of the star schema, used by the sql_analysis/ queries
+
+-- Foreign keys of orders_table, joining each order with its dimensions
+CREATE INDEX IF NOT EXISTS orders_table_card_number_idx ON orders_table (card_number);
+CREATE INDEX IF NOT EXISTS orders_table_date_uuid_idx ON orders_table (date_uuid);
+CREATE INDEX IF NOT EXISTS orders_table_product_code_idx ON orders_table (product_code);
+CREATE INDEX IF NOT EXISTS orders_table_store_code_idx ON orders_table (store_code);
+CREATE INDEX IF NOT EXISTS orders_table_user_uuid_idx ON orders_table (user_uuid);
+
+-- Sales of each year in time order (time_between_sales_per_year.sql)
+CREATE INDEX IF NOT EXISTS dim_date_times_year_sale_ts_idx ON dim_date_times (year, sale_ts) INCLUDE (date_uuid);
@@ -0,0 +1,9 @@
+-- Main source: orders_table
+-- Check the existing rows of orders_table against the foreign keys added as NOT VALID by foreign_keys.sql
+-- Validating a constraint does not block the reads and writes of orders_table while its rows are checked
+
+ALTER TABLE orders_table VALIDATE CONSTRAINT card_number_fkey;
+ALTER TABLE orders_table VALIDATE CONSTRAINT date_uuid_fkey;
+ALTER TABLE orders_table VALIDATE CONSTRAINT product_code_fkey;
+ALTER TABLE orders_table VALIDATE CONSTRAINT store_code_fkey;
+ALTER TABLE orders_table VALIDATE CONSTRAINT user_uuid_fkey;
@@ -0,0 +1,219 @@
+# Library imports
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+import json
+import os
+import shutil
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Stages of each table kept in the staging area, in pipeline order
+STAGES = ('extracted', 'cleaned')
+
+
+def frame_to_arrow(df: pd.DataFrame) -> pa.Table:
+    '''
+    Convert a DataFrame to an Arrow table, keeping the string dtype of each column in the schema metadata.
+    The pandas metadata of Arrow does not tell the string dtypes apart (ArrowDtype strings are read back as
+    string[pyarrow], and string[pyarrow] as string[python]), so they are restored by arrow_to_frame.
+    '''
+    table = pa.Table.from_pandas(df)
+
+    string_dtypes = {str(column_name): 'arrow' if isinstance(dtype, pd.ArrowDtype) else dtype.storage
+                     for column_name, dtype in df.dtypes.items()
+                     if isinstance(dtype, pd.StringDtype) or (isinstance(dtype, pd.ArrowDtype) and dtype.kind == 'U')}
+    return table.replace_schema_metadata({**table.schema.metadata, b'string_dtypes': json.dumps(string_dtypes)})
+
+
+def arrow_to_frame(table: pa.Table) -> pd.DataFrame:
+    '''
+    Convert an Arrow table written by frame_to_arrow back to a DataFrame, with the same index and column dtypes.
+    '''
+    df = table.to_pandas()
+
+    string_dtypes = json.loads((table.schema.metadata or {}).get(b'string_dtypes', b'{}'))
+    for position, column_name in enumerate(df.columns):
+        storage = string_dtypes.get(str(column_name))
+        if storage is not None:
+            dtype = pd.ArrowDtype(table.schema.field(str(column_name)).type) if storage == 'arrow' else pd.StringDtype(storage)
+            df.isetitem(position, df.iloc[:, position].astype(dtype))
+    return df
+
+
+class StagingArea():
+    '''
+    Utility class to keep the output of each stage of the pipeline (the extracted and the cleaned data of each
+    table) as compressed Parquet, so a failed run can resume from the last stage completed by the previous run,
+    instead of extracting every source again.
+
+    Each stage of a table is a directory of Parquet parts ('{staging_dir}/{table}/{stage}/part-00000.parquet'),
+    one for each chunk of the tables streamed in chunks, with a manifest listing them. The parts are written to a
+    temporary directory, which replaces the previous version of the stage only once all of them are written, so
+    an interrupted stage is never resumed from.
+
+    Parameters:
+    ----------
+    staging_dir: str
+        Directory of the staging area
+    resume: bool
+        Whether the pipeline resumes each table from its last completed stage (see resume_stage)
+    compression: str
+        Parquet compression codec of the parts
+
+    Methods:
+    -------
+    stage() / stage_chunks()
+        Write a DataFrame (or each chunk of a table) to a stage of the table, passing it through.
+    read() / read_chunks()
+        Read a completed stage of a table, with only the given columns.
+    resume_stage()
+        Returns the last completed stage of a table, to resume from.
+    '''
+    def __init__(self, staging_dir: str = 'staging', resume: bool = False, compression: str = 'zstd') -> None:
+        self.staging_dir = staging_dir
+        self.resume = resume
+        self.compression = compression
+
+    # ------------- Paths -------------
+    def stage_dir(self, table_name: str, stage: str) -> str:
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage '{stage}', expected one of {STAGES}")
+        return os.path.join(self.staging_dir, table_name, stage)
+
+    def read_manifest(self, table_name: str, stage: str) -> Optional[dict]:
+        '''
+        Returns the manifest of a completed stage of a table ({'parts', 'rows', 'source', 'written_at'}),
+        or None if the stage was never completed.
+        '''
+        manifest_filepath = os.path.join(self.stage_dir(table_name, stage), 'manifest.json')
+        if not os.path.exists(manifest_filepath):
+            return None
+
+        with open(manifest_filepath, 'r') as file:
+            return json.load(file)
+
+    def last_stage(self, table_name: str) -> Optional[str]:
+        '''
+        Returns the last completed stage of the table (e.g. 'cleaned'), or None if no stage was completed.
+        '''
+        completed = [stage for stage in STAGES if self.read_manifest(table_name, stage) is not None]
+        return completed[-1] if completed else None
+
+    def resume_stage(self, table_name: str) -> Optional[str]:
+        '''
+        Returns the stage the table resumes from (its last completed stage), or None if the table is not resumed.
+        '''
+        stage = self.last_stage(table_name) if self.resume else None
+        if stage is not None:
+            print(f"Resuming {table_name} from its '{stage}' stage")
+        return stage
+
+    # ------------- Writing -------------
+    def stage(self, df: pd.DataFrame, table_name: str, stage: str, source: str = None) -> pd.DataFrame:
+        '''
+        Write the DataFrame to a stage of the table, and return it unchanged, e.g.:
+
+            pipeline.add_task('dim_products.extract', lambda: staging.stage(extractor.extract_from_s3(url), 'dim_products', 'extracted'))
+        '''
+        for _ in self.stage_chunks([df], table_name, stage, source):
+            pass
+        return df
+
+    def stage_chunks(self, chunks: Iterable[pd.DataFrame], table_name: str, stage: str, source: str = None) -> Iterator[pd.DataFrame]:
+        '''
+        Lazily write each chunk of a table streamed in chunks to a part of a stage of the table, yielding the
+        chunks unchanged. The stage is only completed once every chunk is written.
+        '''
+        stage_dir = self.stage_dir(table_name, stage)
+        tmp_dir = f'{stage_dir}.{uuid.uuid4().hex}.tmp'
+        os.makedirs(tmp_dir)
+
+        parts: List[dict] = []
+        staging = True
+        try:
+            for chunk in chunks:
+                if staging:
+                    try:
+                        arrow_table = frame_to_arrow(chunk)
+                    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as ex:
+                        # e.g. object columns mixing numbers and strings: the chunks are passed through unstaged,
+                        # and the previous version of the stage is removed, as it is out of date
+                        print(f"Stage '{stage}' of table '{table_name}' could not be staged: {ex}")
+                        staging = False
+                        shutil.rmtree(tmp_dir, ignore_errors=True)
+                        self.remove_stages(table_name, stage)
+
+                if staging:
+                    part_filename = f'part-{len(parts):05d}.parquet'
+                    arrow_table = arrow_table.replace_schema_metadata({
+                        **arrow_table.schema.metadata,
+                        b'staging': json.dumps({'table': table_name, 'stage': stage, 'source': source, 'part': len(parts)}),
+                    })
+                    pq.write_table(arrow_table, os.path.join(tmp_dir, part_filename), compression=self.compression)
+                    parts.append({'filename': part_filename, 'rows': len(chunk)})
+                yield chunk
+
+            if not staging:
+                return
+
+            manifest = {
+                'parts': parts,
+                'rows': sum(part['rows'] for part in parts),
+                'source': source,
+                'written_at': datetime.now().isoformat(timespec='seconds'),
+            }
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as file:
+                json.dump(manifest, file, indent=2)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        # Replace the previous version of the stage, and the following stages, which were produced from it
+        old_dir = f'{stage_dir}.{uuid.uuid4().hex}.old'
+        if os.path.exists(stage_dir):
+            os.replace(stage_dir, old_dir)
+        os.replace(tmp_dir, stage_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if stage != STAGES[-1]:
+            self.remove_stages(table_name, STAGES[STAGES.index(stage) + 1])
+
+    # ------------- Reading -------------
+    def read_chunks(self, table_name: str, stage: str, columns: List[str] = None) -> Iterator[pd.DataFrame]:
+        '''
+        Lazily read each part of a completed stage of the table, with only the given columns (default: all).
+        The parts are memory-mapped, and only the requested columns (and the index) are decoded.
+        '''
+        manifest = self.read_manifest(table_name, stage)
+        if manifest is None:
+            raise FileNotFoundError(f"Stage '{stage}' of table '{table_name}' was not completed")
+
+        stage_dir = self.stage_dir(table_name, stage)
+        for part in manifest['parts']:
+            yield arrow_to_frame(pq.read_pandas(os.path.join(stage_dir, part['filename']), columns=columns, memory_map=True))
+
+    def read(self, table_name: str, stage: str, columns: List[str] = None) -> pd.DataFrame:
+        '''
+        Read a completed stage of the table as a single DataFrame, with only the given columns (default: all).
+        '''
+        chunks = list(self.read_chunks(table_name, stage, columns))
+        if not chunks:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(chunks) if len(chunks) > 1 else chunks[0]
+
+    def remove_stages(self, table_name: str, first_stage: str):
+        '''
+        Remove a stage of the table and all the following ones.
+        '''
+        for stage in STAGES[STAGES.index(first_stage):]:
+            shutil.rmtree(self.stage_dir(table_name, stage), ignore_errors=True)
+
+    def clear(self, table_name: str = None):
+        '''
+        Remove every stage of the table, or of all the tables.
+        '''
+        shutil.rmtree(os.path.join(self.staging_dir, table_name) if table_name else self.staging_dir, ignore_errors=True)
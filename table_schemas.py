@@ -0,0 +1,61 @@
+# Library imports
+from sqlalchemy import Boolean, Date, DateTime, Float, SmallInteger, String, Uuid
+from sqlalchemy.types import TypeEngine
+from typing import Dict
+
+
+# Final column types of each table of the local database. The tables are created with these types before
+# the cleaned data is bulk-loaded, so the data is written once, without casting the tables after the upload.
+# Columns not listed keep the type pandas infers from the cleaned data (e.g. text for strings).
+TABLE_SCHEMAS: Dict[str, Dict[str, TypeEngine]] = {
+    'dim_users': {
+        'first_name': String(255),
+        'last_name': String(255),
+        'date_of_birth': Date(),
+        'country_code': String(3),
+        'user_uuid': Uuid(as_uuid=False),
+        'join_date': Date(),
+    },
+    'dim_card_details': {
+        'card_number': String(19),
+        'expiry_date': Date(),
+        'date_payment_confirmed': Date(),
+    },
+    'dim_store_details': {
+        'longitude': Float(),
+        'latitude': Float(),
+        'locality': String(255),
+        'store_code': String(12),
+        'staff_numbers': SmallInteger(),
+        'opening_date': Date(),
+        'store_type': String(255),
+        'country_code': String(3),
+        'continent': String(255),
+    },
+    'dim_products': {
+        'product_price_in_gbp': Float(),
+        'weight_in_kg': Float(),
+        'weight_class': String(255),
+        'EAN': String(18),
+        'product_code': String(12),
+        'date_added': Date(),
+        'uuid': Uuid(as_uuid=False),
+        'still_available': Boolean(),
+    },
+    'orders_table': {
+        'date_uuid': Uuid(as_uuid=False),
+        'user_uuid': Uuid(as_uuid=False),
+        'card_number': String(19),
+        'store_code': String(12),
+        'product_code': String(12),
+        'product_quantity': SmallInteger(),
+    },
+    'dim_date_times': {
+        'month': SmallInteger(),
+        'year': SmallInteger(),
+        'day': SmallInteger(),
+        'time_period': String(255),
+        'date_uuid': Uuid(as_uuid=False),
+        'sale_ts': DateTime(),
+    },
+}
@@ -0,0 +1,22 @@
+'''
+Configuration of the tests: the modules of the project are imported from the root of the repository, and the tests
+run from it, as main.py does, so the relative paths (e.g. validation_utils.yaml) are found.
+'''
+
+# Library imports
+import os
+import sys
+
+import pytest
+
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_ROOT)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def run_from_repository_root():
+    working_dir = os.getcwd()
+    os.chdir(REPOSITORY_ROOT)
+    yield
+    os.chdir(working_dir)
@@ -0,0 +1,26 @@
+# Library imports
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+# Project class imports
+from data_cleaning import DataCleaning
+
+
+TIMES = ['22:00:06', '22:00:06.123456', '22:00:06.5', '22:00:06.', '22:00', 'not a time', None]
+EXPECTED = np.array(['2012-09-19T22:00:06', '2012-09-19T22:00:06.123456', '2012-09-19T22:00:06.5',
+                     'NaT', 'NaT', 'NaT', 'NaT'], dtype='datetime64[ns]')
+
+
+@pytest.mark.parametrize('dtype', [pd.ArrowDtype(pa.string()), pd.StringDtype('pyarrow'), object],
+                         ids=['arrow', 'string_pyarrow', 'object'])
+def test_parse_sale_timestamps_fractional_seconds(dtype):
+    '''
+    The times of day with fractional seconds are parsed with their fraction, by the Arrow and the pandas paths.
+    '''
+    num_rows = len(TIMES)
+    columns = [pd.Series([value] * num_rows, dtype=dtype) for value in ('2012', '9', '19')]
+    timestamps = DataCleaning.parse_sale_timestamps(*columns, pd.Series(TIMES, dtype=dtype))
+
+    np.testing.assert_array_equal(timestamps, EXPECTED)
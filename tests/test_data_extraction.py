@@ -0,0 +1,132 @@
+# Library imports
+import pandas as pd
+import pytest
+import requests
+import yaml
+
+# Project class imports
+import data_extraction
+from data_extraction import DataExtractor
+
+
+URL = 'https://data-handling-public.s3.eu-west-1.amazonaws.com/date_details.json'
+
+
+@pytest.fixture
+def extractor(tmp_path) -> DataExtractor:
+    credentials_filepath = tmp_path / 'creds.yaml'
+    credentials_filepath.write_text(yaml.safe_dump({'X_API_KEY': 'key', 'AWS_ACCESS_KEY': 'key', 'AWS_SECRET_ACCESS_KEY': 'secret'}))
+    return DataExtractor(str(credentials_filepath), api_credentials_filepath=str(credentials_filepath),
+                         cache_dir=str(tmp_path / 'download_cache'))
+
+
+class Response():
+    '''
+    Streamed HTTP response, whose download fails with the given exception (if any) after the first chunk.
+    '''
+    def __init__(self, chunks: list, error: Exception = None) -> None:
+        self.status_code = 200
+        self.headers = {'ETag': '"etag-1"'}
+        self.chunks = chunks
+        self.error = error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size: int):
+        for chunk in self.chunks:
+            yield chunk
+            if self.error is not None:
+                raise self.error
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> list:
+    '''
+    Backoff waits of the retries, which are recorded instead of waited.
+    '''
+    sleeps = []
+    monkeypatch.setattr(data_extraction.time, 'sleep', sleeps.append)
+    return sleeps
+
+
+def test_download_url_retries_timeouts(extractor, monkeypatch, sleeps):
+    '''
+    A connection timeout and a download stalled part way are retried with backoff, and only the complete file is cached.
+    '''
+    outcomes = [requests.exceptions.ConnectTimeout('connect timeout'),
+                Response([b'{"timestamp": '], requests.exceptions.ConnectionError('read timeout')),
+                Response([b'{"timestamp": ', b'"22:00:06"}'])]
+    timeouts = []
+
+    def get(url, headers, stream, timeout):
+        timeouts.append(timeout)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(data_extraction.requests, 'get', get)
+    cache_entry = extractor.download_url(URL)
+
+    with open(cache_entry['filepath'], 'rb') as file:
+        assert file.read() == b'{"timestamp": "22:00:06"}'
+    assert cache_entry['etag'] == '"etag-1"'
+    assert timeouts == [(10, 60)] * 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_download_url_gives_up(extractor, monkeypatch, sleeps):
+    '''
+    The last timeout is raised once the retries are exhausted.
+    '''
+    def get(url, headers, stream, timeout):
+        raise requests.exceptions.ReadTimeout('read timeout')
+
+    monkeypatch.setattr(data_extraction.requests, 'get', get)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        extractor.download_url(URL, max_retries=2, timeout=(1, 5))
+    assert sleeps == [0.5, 1.0]
+
+
+def pdf_page(rows: list) -> pd.DataFrame:
+    '''
+    Returns a table of a page of the card details PDF, as read by read_pdf_pages: without a header, as strings.
+    '''
+    return pd.DataFrame(rows, dtype=object)
+
+
+HEADER = ['card_number', 'expiry_date', 'card_provider']
+
+
+def test_concat_pdf_tables():
+    '''
+    The header rows repeated on each page are removed.
+    '''
+    df = DataExtractor.concat_pdf_tables([pdf_page([HEADER, ['4971858637664481', '09/26', 'VISA 16 digit']]),
+                                          pdf_page([HEADER, ['3554954842403145', '10/23', 'JCB 16 digit']])])
+
+    pd.testing.assert_frame_equal(df, pd.DataFrame([['4971858637664481', '09/26', 'VISA 16 digit'],
+                                                    ['3554954842403145', '10/23', 'JCB 16 digit']], columns=HEADER, dtype=object))
+
+
+def test_concat_pdf_tables_mismatched_columns(capsys):
+    '''
+    A page read with an extra empty column is aligned to the columns of the first page, and a page with other
+    columns is skipped with a warning, instead of aborting the extraction.
+    '''
+    df = DataExtractor.concat_pdf_tables([
+        pdf_page([HEADER, ['4971858637664481', '09/26', 'VISA 16 digit']]),
+        pdf_page([['3554954842403145', None, '10/23', 'JCB 16 digit']]),
+        pdf_page([['213142929492281', '09/27 Diners', 'Club / Carte Blanche', 'extra']]),
+    ])
+
+    pd.testing.assert_frame_equal(df, pd.DataFrame([['4971858637664481', '09/26', 'VISA 16 digit'],
+                                                    ['3554954842403145', '10/23', 'JCB 16 digit']], columns=HEADER, dtype=object))
+    assert 'PDF table 2 skipped: 4 non-empty columns instead of 3, 1 rows not extracted' in capsys.readouterr().out
@@ -0,0 +1,106 @@
+# Library imports
+from sqlalchemy import create_engine
+
+import pandas as pd
+import pytest
+
+# Project class imports
+from data_loading import IncrementalLoader
+from database_utils import DatabaseConnector
+
+
+class SourceExtractor():
+    '''
+    Extractor of an RDS table and an S3 object held in memory, with the interface of DataExtractor used by
+    IncrementalLoader.
+    '''
+    def __init__(self, rds_table: pd.DataFrame, s3_object: pd.DataFrame, etag: str) -> None:
+        self.rds_table = rds_table
+        self.s3_object = s3_object
+        self.etag = etag
+        self.watermarks = []
+        self.s3_extractions = 0
+
+    def read_rds_table(self, rds_connector, table_name: str, chunksize: int, key_column: str, watermark=None):
+        self.watermarks.append(watermark)
+        rows = self.rds_table if watermark is None else self.rds_table[self.rds_table[key_column] > watermark]
+        for start in range(0, len(rows), chunksize):
+            yield rows.iloc[start:start + chunksize]
+
+    def get_s3_etag(self, s3_url: str) -> str:
+        return self.etag
+
+    def extract_from_s3(self, s3_url: str) -> pd.DataFrame:
+        self.s3_extractions += 1
+        return self.s3_object
+
+
+@pytest.fixture
+def connector(tmp_path) -> DatabaseConnector:
+    return DatabaseConnector(engine=create_engine(f'sqlite:///{tmp_path / "test.db"}'))
+
+
+def orders(first_index: int, num_rows: int) -> pd.DataFrame:
+    return pd.DataFrame({'index': range(first_index, first_index + num_rows),
+                         'product_quantity': [index % 5 + 1 for index in range(first_index, first_index + num_rows)]})
+
+
+def drop_odd_quantities(df: pd.DataFrame) -> pd.DataFrame:
+    return df[df['product_quantity'] % 2 == 0]
+
+
+def test_rds_watermark_advances(connector):
+    '''
+    The watermark of an RDS table is the highest key extracted, including the rows rejected by the cleaning, and
+    the next run only extracts and upserts the rows with a greater key.
+    '''
+    extractor = SourceExtractor(orders(0, 10), None, None)
+    loader = IncrementalLoader(extractor, None, connector)
+
+    loader.load_rds_table(None, 'orders_table', 'test_orders', 'index', ['index'], drop_odd_quantities, chunksize=4)
+    assert loader.read_watermark('rds:orders_table') == 9
+
+    extractor.rds_table = orders(0, 15)
+    loader.load_rds_table(None, 'orders_table', 'test_orders', 'index', ['index'], drop_odd_quantities, chunksize=4)
+    assert loader.read_watermark('rds:orders_table') == 14
+    assert extractor.watermarks == [None, 9]
+
+    loaded = pd.read_sql_table('test_orders', connector.engine).sort_values('index', ignore_index=True)
+    pd.testing.assert_frame_equal(loaded, drop_odd_quantities(orders(0, 15)).reset_index(drop=True))
+
+
+def test_rds_watermark_without_new_rows(connector):
+    '''
+    A run without new rows keeps the watermark.
+    '''
+    extractor = SourceExtractor(orders(0, 5), None, None)
+    loader = IncrementalLoader(extractor, None, connector)
+
+    loader.load_rds_table(None, 'orders_table', 'test_orders', 'index', ['index'], drop_odd_quantities)
+    loader.load_rds_table(None, 'orders_table', 'test_orders', 'index', ['index'], drop_odd_quantities)
+
+    assert loader.read_watermark('rds:orders_table') == 4
+    assert extractor.watermarks == [None, 4]
+
+
+def test_s3_watermark_advances(connector):
+    '''
+    An S3 object is only extracted and upserted again once its ETag changes.
+    '''
+    extractor = SourceExtractor(None, pd.DataFrame({'product_code': ['a1', 'b2'], 'weight_in_kg': [1.0, 2.0]}), '"etag-1"')
+    loader = IncrementalLoader(extractor, None, connector)
+    s3_url = 's3://data-handling-public/products.csv'
+
+    loader.load_s3_object(s3_url, 'test_products', ['product_code'], lambda df: df)
+    loader.load_s3_object(s3_url, 'test_products', ['product_code'], lambda df: df)
+    assert extractor.s3_extractions == 1
+    assert loader.read_watermark(f's3:{s3_url}') == '"etag-1"'
+
+    extractor.etag = '"etag-2"'
+    extractor.s3_object = pd.DataFrame({'product_code': ['b2', 'c3'], 'weight_in_kg': [2.5, 3.0]})
+    loader.load_s3_object(s3_url, 'test_products', ['product_code'], lambda df: df)
+    assert extractor.s3_extractions == 2
+    assert loader.read_watermark(f's3:{s3_url}') == '"etag-2"'
+
+    loaded = pd.read_sql_table('test_products', connector.engine).sort_values('product_code', ignore_index=True)
+    pd.testing.assert_frame_equal(loaded, pd.DataFrame({'product_code': ['a1', 'b2', 'c3'], 'weight_in_kg': [1.0, 2.5, 3.0]}))
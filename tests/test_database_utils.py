@@ -0,0 +1,165 @@
+# Library imports
+from datetime import date
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.types import TypeEngine
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Project class imports
+from database_utils import DatabaseConnector
+from table_schemas import TABLE_SCHEMAS
+
+
+# PostgreSQL database of the round-trip tests through COPY (e.g. 'postgresql+psycopg2://postgres@localhost/test'),
+# skipped if not set. Its 'test_*' tables are replaced by the tests.
+POSTGRES_TEST_URL = os.environ.get('POSTGRES_TEST_URL')
+
+DTYPE_BACKENDS = [None, 'numpy_nullable', 'pyarrow']
+
+
+def card_details() -> pd.DataFrame:
+    '''
+    Returns cleaned card details, with NULL values, empty strings and values with separators, quotes and line breaks.
+    '''
+    return pd.DataFrame({
+        'card_number': ['4971858637664481', None, '', '12,34', 'say "hi"', 'two\nlines', np.nan],
+        'expiry_date': [date(2026, 9, 1), None, date(2024, 1, 1), date(2024, 1, 1), date(2024, 1, 1), date(2024, 1, 1), date(2024, 1, 1)],
+        'card_provider': ['VISA 16 digit', 'JCB', None, 'Diners Club / Carte Blanche', 'Mastercard', 'Maestro', 'VISA'],
+        'product_quantity': pd.array([1, None, 3, 4, 5, 6, 7], dtype='Int64'),
+    })
+
+
+@pytest.mark.parametrize('dtype_backend', DTYPE_BACKENDS, ids=str)
+def test_to_copy_csv_nulls_and_escaping(dtype_backend):
+    '''
+    NULL values are written as the COPY NULL marker, so they are not read as empty strings, and the values with
+    separators, quotes or line breaks are quoted.
+    '''
+    df = card_details()
+    if dtype_backend is not None:
+        df = df.convert_dtypes(dtype_backend=dtype_backend)
+
+    assert DatabaseConnector.to_copy_csv(df).getvalue() == (
+        '4971858637664481,2026-09-01,VISA 16 digit,1\n'
+        '\\N,\\N,JCB,\\N\n'
+        ',2024-01-01,\\N,3\n'
+        '"12,34",2024-01-01,Diners Club / Carte Blanche,4\n'
+        '"say ""hi""",2024-01-01,Mastercard,5\n'
+        '"two\nlines",2024-01-01,Maestro,6\n'
+        '\\N,2024-01-01,VISA,7\n'
+    )
+
+
+def column_types(connector: DatabaseConnector, table_name: str) -> dict:
+    '''
+    Returns the type of each column of a table of the database, compiled for its dialect (e.g. 'VARCHAR(19)').
+    '''
+    return {column['name']: column['type'].compile(dialect=connector.engine.dialect)
+            for column in inspect(connector.engine).get_columns(table_name)}
+
+
+def compiled(connector: DatabaseConnector, column_type: TypeEngine) -> str:
+    return column_type.compile(dialect=connector.engine.dialect)
+
+
+def check_upload(connector: DatabaseConnector):
+    '''
+    Upload the card details in two chunks, and check the declared column types, the NULL values and the values
+    read back from the table.
+    '''
+    df = card_details()
+    connector.upload_to_db([df.iloc[:4], df.iloc[4:]], 'test_card_details', column_types=TABLE_SCHEMAS['dim_card_details'])
+
+    table_column_types = column_types(connector, 'test_card_details')
+    assert table_column_types['card_number'] == compiled(connector, TABLE_SCHEMAS['dim_card_details']['card_number'])
+    assert table_column_types['expiry_date'] == compiled(connector, TABLE_SCHEMAS['dim_card_details']['expiry_date'])
+
+    with connector.engine.connect() as connection:
+        rows = connection.execute(text('SELECT card_number, expiry_date, card_provider, product_quantity FROM test_card_details')).all()
+
+    expected = [tuple(None if pd.isna(value) else value for value in row) for row in df.itertuples(index=False)]
+    # SQLite has no date type: the dates are stored as text
+    rows = [tuple(date.fromisoformat(value) if isinstance(value, str) and column == 1 else value for column, value in enumerate(row))
+            for row in rows]
+    assert rows == expected
+
+
+def test_upload_to_db_sqlite(tmp_path):
+    '''
+    The tables are created with the declared column types, and the chunks after the first one are appended.
+    '''
+    connector = DatabaseConnector(engine=create_engine(f'sqlite:///{tmp_path / "test.db"}'))
+    check_upload(connector)
+
+
+@pytest.mark.skipif(POSTGRES_TEST_URL is None, reason='POSTGRES_TEST_URL is not set')
+def test_upload_to_db_postgres():
+    '''
+    The rows bulk-loaded through COPY keep their NULL values, empty strings, separators, quotes and line breaks.
+    '''
+    connector = DatabaseConnector(engine=create_engine(POSTGRES_TEST_URL))
+    check_upload(connector)
+
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def connector(request, tmp_path) -> DatabaseConnector:
+    '''
+    Connector to an empty SQLite database, or to the PostgreSQL test database without the test_users table.
+    '''
+    if request.param == 'sqlite':
+        return DatabaseConnector(engine=create_engine(f'sqlite:///{tmp_path / "test.db"}'))
+
+    if POSTGRES_TEST_URL is None:
+        pytest.skip('POSTGRES_TEST_URL is not set')
+    connector = DatabaseConnector(engine=create_engine(POSTGRES_TEST_URL))
+    with connector.engine.begin() as connection:
+        connection.exec_driver_sql('DROP TABLE IF EXISTS test_users, test_users_staging')
+    return connector
+
+
+def read_table(connector: DatabaseConnector, table_name: str) -> pd.DataFrame:
+    return pd.read_sql_table(table_name, connector.engine).sort_values('user_uuid', ignore_index=True)
+
+
+def test_upsert_to_db_second_chunk(connector):
+    '''
+    The first chunk creates the table. The rows of the next chunks update the rows with the same key (the last
+    version of a key repeated in a chunk wins) and the other rows are inserted.
+    '''
+    first_chunk = pd.DataFrame({'user_uuid': ['a', 'b'], 'first_name': ['Ann', 'Bob'], 'staff_numbers': [1, 2]})
+    second_chunk = pd.DataFrame({'user_uuid': ['b', 'c', 'c'], 'first_name': ['Bobby', 'Cy', 'Cyril'], 'staff_numbers': [20, 3, 30]})
+    connector.upsert_to_db([first_chunk, second_chunk], 'test_users', ['user_uuid'])
+
+    pd.testing.assert_frame_equal(read_table(connector, 'test_users'), pd.DataFrame({
+        'user_uuid': ['a', 'b', 'c'], 'first_name': ['Ann', 'Bobby', 'Cyril'], 'staff_numbers': [1, 20, 30]}))
+    assert not inspect(connector.engine).has_table('test_users_staging')
+
+
+def test_upsert_to_db_missing_column(connector):
+    '''
+    The columns missing from an existing table are added, NULL for its previous rows.
+    '''
+    connector.upsert_to_db(pd.DataFrame({'user_uuid': ['a', 'b'], 'first_name': ['Ann', 'Bob']}), 'test_users', ['user_uuid'])
+    connector.upsert_to_db(pd.DataFrame({'user_uuid': ['b', 'c'], 'first_name': ['Bobby', 'Cy'], 'country_code': ['GB', 'DE']}),
+                                  'test_users', ['user_uuid'])
+
+    pd.testing.assert_frame_equal(read_table(connector, 'test_users'), pd.DataFrame({
+        'user_uuid': ['a', 'b', 'c'], 'first_name': ['Ann', 'Bobby', 'Cy'], 'country_code': [None, 'GB', 'DE']}))
+
+
+def test_upsert_to_db_keeps_table_column_types(connector):
+    '''
+    The rows are cast to the column types of the existing table.
+    '''
+    declared_types = {'user_uuid': TABLE_SCHEMAS['dim_users']['first_name'], 'date_of_birth': TABLE_SCHEMAS['dim_users']['date_of_birth']}
+    connector.upsert_to_db(pd.DataFrame({'user_uuid': ['a'], 'date_of_birth': [date(1990, 1, 2)]}), 'test_users', ['user_uuid'],
+                                  column_types=declared_types)
+    connector.upsert_to_db(pd.DataFrame({'user_uuid': ['a', 'b'], 'date_of_birth': [date(1991, 1, 2), date(1992, 1, 2)]}),
+                                  'test_users', ['user_uuid'], column_types=declared_types)
+
+    assert column_types(connector, 'test_users') == {column: compiled(connector, column_type) for column, column_type in declared_types.items()}
+    assert read_table(connector, 'test_users')['date_of_birth'].tolist() == [pd.Timestamp(1991, 1, 2), pd.Timestamp(1992, 1, 2)]
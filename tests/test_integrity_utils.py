@@ -0,0 +1,122 @@
+# Library imports
+from sqlalchemy import create_engine
+
+import pandas as pd
+import pytest
+
+# Project class imports
+from database_utils import DatabaseConnector
+from integrity_utils import FOREIGN_KEYS, ReferentialIntegrity, key_column
+from quarantine_utils import QuarantineStore
+
+
+# Keys of the cleaned rows of each dimension table
+DIMENSION_KEYS = {
+    'dim_card_details': ['1111222233334444', '5555666677778888'],
+    'dim_date_times': ['d1', 'd2'],
+    'dim_products': ['P1', 'P2'],
+    'dim_store_details': ['WEB-1388012W', 'CH-99475026'],
+    'dim_users': ['u1', 'u2'],
+}
+
+
+def orders() -> pd.DataFrame:
+    '''
+    Returns cleaned orders, with a few orphan foreign keys per dimension table (orders 106 and 108 have two) and a NULL
+    foreign key, which is not an orphan.
+    '''
+    return pd.DataFrame({
+        'card_number': ['1111222233334444', 'removed card', 'removed card', '5555666677778888', '1111222233334444',
+                        '1111222233334444', '1111222233334444', None, 'removed card', '5555666677778888'],
+        'date_uuid': ['d1', 'd2', 'd1', 'd3', 'd1', 'd2', 'd1', 'd2', 'd1', 'd2'],
+        'product_code': ['P1', 'P2', 'P1', 'P2', 'P3', 'P1', 'P2', 'P1', 'P1', 'P2'],
+        'store_code': ['WEB-1388012W', 'CH-99475026', 'WEB-1388012W', 'CH-99475026', 'CH-99475026',
+                       'XX-00000000', 'XX-00000000', 'WEB-1388012W', 'XX-00000000', 'WEB-1388012W'],
+        'user_uuid': ['u1', 'u2', 'u1', 'u2', 'u1', 'u2', 'u3', 'u1', 'u2', 'u1'],
+        'product_quantity': range(1, 11),
+    }, index=range(100, 110))
+
+
+ORPHAN_COUNTS = {'card_number': 3, 'date_uuid': 1, 'product_code': 1, 'store_code': 3, 'user_uuid': 1}
+
+# Rows of the orders kept, and the foreign key of the rows removed (the first one checked, for the orders with two)
+KEPT_ROWS = [100, 107, 109]
+REJECTED_BY = {101: 'card_number', 102: 'card_number', 103: 'date_uuid', 104: 'product_code', 105: 'store_code',
+               106: 'store_code', 108: 'card_number'}
+
+
+def integrity_with_keys(quarantine: QuarantineStore = None, *table_names: str) -> ReferentialIntegrity:
+    '''
+    Returns a ReferentialIntegrity with the keys of the given dimension tables added (default: all of them).
+    '''
+    integrity = ReferentialIntegrity(quarantine)
+    for table_name in table_names or DIMENSION_KEYS:
+        integrity.add_keys(table_name, pd.DataFrame({key_column(table_name): DIMENSION_KEYS[table_name]}))
+    return integrity
+
+
+def test_filter_orphans():
+    '''
+    The orphan rows are removed, and counted by each of their orphan foreign keys.
+    '''
+    integrity = integrity_with_keys()
+    df = orders()
+
+    filtered = integrity.filter_orphans(df, 'orders_table')
+
+    pd.testing.assert_frame_equal(filtered, df.loc[KEPT_ROWS])
+    assert integrity.orphan_counts == {'orders_table': ORPHAN_COUNTS}
+
+
+def test_filter_chunks():
+    '''
+    The orphan rows of each chunk are removed, and the orphan counts add up over the chunks, with the keys of a
+    dimension table added from several chunks.
+    '''
+    integrity = ReferentialIntegrity()
+    for table_name, keys in DIMENSION_KEYS.items():
+        chunks = [pd.DataFrame({key_column(table_name): [key]}) for key in keys]
+        assert list(integrity.collect_keys(chunks, table_name)) == chunks
+    df = orders()
+
+    filtered = pd.concat(integrity.filter_chunks([df.iloc[:4], df.iloc[4:7], df.iloc[7:]], 'orders_table'))
+
+    pd.testing.assert_frame_equal(filtered, df.loc[KEPT_ROWS])
+    assert integrity.orphan_counts == {'orders_table': ORPHAN_COUNTS}
+
+
+def test_orphans_quarantined():
+    '''
+    The orphan rows are quarantined with the foreign key rejecting them.
+    '''
+    quarantine = QuarantineStore(quarantine_dir=None)
+    integrity = integrity_with_keys(quarantine)
+
+    integrity.filter_orphans(orders(), 'orders_table')
+
+    quarantined = quarantine.pop_rows()['orders_table']
+    assert quarantined['product_quantity'].tolist() == [str(row - 99) for row in REJECTED_BY]
+    assert quarantined['_rule'].tolist() == list(REJECTED_BY.values())
+    assert quarantined['_reason'].tolist() == [f'{column_name} not in {FOREIGN_KEYS["orders_table"][column_name]}'
+                                               for column_name in REJECTED_BY.values()]
+
+
+def test_read_keys(tmp_path):
+    '''
+    The keys of a dimension table can be read from the database.
+    '''
+    connector = DatabaseConnector(engine=create_engine(f'sqlite:///{tmp_path / "test.db"}'))
+    pd.DataFrame({'user_uuid': DIMENSION_KEYS['dim_users'], 'first_name': ['Ann', 'Bob']}).to_sql('dim_users', connector.engine, index=False)
+    integrity = integrity_with_keys(None, *[table_name for table_name in DIMENSION_KEYS if table_name != 'dim_users'])
+    integrity.read_keys(connector, 'dim_users')
+
+    filtered = integrity.filter_orphans(orders(), 'orders_table')
+    assert filtered.index.tolist() == KEPT_ROWS
+
+
+def test_missing_dimension_keys():
+    '''
+    Filtering a table before the keys of its dimension tables are added fails, instead of removing every row.
+    '''
+    with pytest.raises(KeyError):
+        ReferentialIntegrity().filter_orphans(orders(), 'orders_table')
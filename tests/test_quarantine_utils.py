@@ -0,0 +1,84 @@
+# Library imports
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+# Project class imports
+from benchmarks import synthetic_data
+import data_cleaning
+from data_cleaning import NULL_STRINGS_ANY_CASE, DataCleaning
+from quarantine_utils import QuarantineStore
+
+
+SAMPLE_ROWS = 2000
+
+# Data cleanser and synthetic source of each table
+TABLES = {
+    'users': ('clean_user_data', synthetic_data.generate_users),
+    'cards': ('clean_card_data', synthetic_data.generate_cards),
+}
+
+
+def read_quarantine(quarantine: QuarantineStore, table_name: str) -> pd.DataFrame:
+    '''
+    Read back the quarantined rows of a table, with the string dtype they are quarantined with.
+    '''
+    return pq.read_table(quarantine.filepath(table_name)).to_pandas().astype(pd.StringDtype('pyarrow'))
+
+
+@pytest.mark.parametrize('table_name', list(TABLES))
+def test_quarantined_rows_rule_and_reason(tmp_path, table_name):
+    '''
+    The rows removed by the cleaning are quarantined as read from the source, with the rule rejecting each row in
+    the '_rule' column, counted by rejection_counts, and the reason in the '_reason' column.
+    '''
+    clean_method_name, generate = TABLES[table_name]
+    df = generate(SAMPLE_ROWS, seed=7)
+    quarantine = QuarantineStore(str(tmp_path), flush_rows=100)
+    cleaner = DataCleaning(quarantine=quarantine)
+
+    cleaned = getattr(cleaner, clean_method_name)(df)
+    quarantine.close()
+    quarantined = read_quarantine(quarantine, table_name)
+
+    assert quarantined.columns.tolist() == [*df.columns, '_rule', '_reason']
+    pd.testing.assert_frame_equal(quarantined[df.columns], QuarantineStore.to_strings(df.drop(index=cleaned.index)).reset_index(drop=True))
+
+    rule_counts = {rule_name: count for rule_name, count in cleaner.rejection_counts[table_name].items() if count}
+    assert quarantined['_rule'].value_counts().to_dict() == rule_counts
+    assert quarantine.row_counts == {table_name: len(df) - len(cleaned)}
+
+    for row in quarantined.to_dict('records'):
+        if row['_rule'] == 'nulls':
+            value = row[row['_reason'].removeprefix('NULL value in ')]
+            assert pd.isna(value) or value in NULL_STRINGS_ANY_CASE
+        else:
+            assert row['_reason'].startswith(f"{row['_rule']} fails: ")
+
+
+@pytest.mark.parametrize('table_name', list(TABLES))
+def test_clean_parallel_quarantine_matches_serial(tmp_path, monkeypatch, table_name):
+    '''
+    Cleaning a table in parallel shards returns the same rows, rejection counts and quarantined rows (in the same
+    order) as cleaning it in this process.
+    '''
+    clean_method_name, generate = TABLES[table_name]
+    df = generate(SAMPLE_ROWS, seed=7)
+    serial_quarantine = QuarantineStore(str(tmp_path / 'serial'))
+    serial_cleaner = DataCleaning(quarantine=serial_quarantine)
+    parallel_quarantine = QuarantineStore(str(tmp_path / 'parallel'))
+    parallel_cleaner = DataCleaning(quarantine=parallel_quarantine)
+
+    expected = getattr(serial_cleaner, clean_method_name)(df)
+    # Small shards, so the sample is split between the workers
+    monkeypatch.setattr(data_cleaning, 'MIN_SHARD_ROWS', SAMPLE_ROWS // 4)
+    try:
+        cleaned = parallel_cleaner.clean_parallel(df, clean_method_name, max_workers=3)
+    finally:
+        parallel_cleaner.close_workers()
+    serial_quarantine.close()
+    parallel_quarantine.close()
+
+    pd.testing.assert_frame_equal(cleaned, expected)
+    assert parallel_cleaner.rejection_counts == serial_cleaner.rejection_counts
+    pd.testing.assert_frame_equal(read_quarantine(parallel_quarantine, table_name), read_quarantine(serial_quarantine, table_name))
@@ -0,0 +1,106 @@
+# Library imports
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Project class imports
+from benchmarks import synthetic_data
+from data_cleaning import PRODUCT_AVAILABILITY, TABLE_SCHEMAS, TARGET_TABLES, DataCleaning, RowFilter
+
+
+SAMPLE_ROWS = 2000
+
+
+def sample(table_name: str) -> pd.DataFrame:
+    '''
+    Returns a fixed sample of the source of the table, with NaN and pd.NA values in some rows of every column.
+    '''
+    generate = {'users': synthetic_data.generate_users, 'cards': synthetic_data.generate_cards,
+                'stores': synthetic_data.generate_stores, 'products': synthetic_data.generate_products,
+                'orders': synthetic_data.generate_orders, 'dates': synthetic_data.generate_dates}[table_name]
+    df = generate(SAMPLE_ROWS, seed=7)
+
+    for position, column in enumerate(df.columns):
+        if df[column].dtype == object:
+            df.loc[[3 * position + 1, 500 + position], column] = np.nan
+            df.loc[[3 * position + 2, 1000 + position], column] = pd.NA
+    return df
+
+
+def cleaning_steps(cleaner: DataCleaning, table_name: str) -> List[Callable[[RowFilter], None]]:
+    '''
+    Returns the steps of the data cleanser of the table, in order, each applied to a RowFilter.
+    '''
+    def rules(rows: RowFilter):
+        cleaner.apply_rules(rows, table_name)
+
+    steps = {
+        'users': [cleaner.clean_nulls, rules,
+                  lambda rows: cleaner.clean_nulls(rows, 'date_of_birth', 'join_date', rule_name='nulls after conversion')],
+        'cards': [cleaner.clean_nulls, rules,
+                  lambda rows: cleaner.clean_nulls(rows, 'expiry_date', 'date_payment_confirmed', rule_name='nulls after conversion')],
+        'stores': [lambda rows: rows.drop_columns('lat'), rules],
+        'products': [cleaner.clean_nulls,
+                     lambda rows: cleaner.convert_product_weights(rows, 'weight'),
+                     lambda rows: cleaner.add_weight_class(rows, 'weight'),
+                     lambda rows: cleaner.convert_product_prices(rows, 'product_price'),
+                     lambda rows: rows.convert_column('removed', rows.column('removed').map(PRODUCT_AVAILABILITY).astype('boolean')),
+                     rules,
+                     lambda rows: cleaner.clean_nulls(rows, 'weight', 'product_price', 'date_added', rule_name='nulls after conversion'),
+                     lambda rows: rows.rename_columns({'weight': 'weight_in_kg', 'product_price': 'product_price_in_gbp', 'removed': 'still_available'})],
+        'orders': [lambda rows: rows.drop_columns('first_name', 'last_name', '1', 'level_0'), cleaner.clean_nulls, rules],
+        'dates': [cleaner.clean_nulls, rules, cleaner.add_sale_timestamps],
+    }
+    return steps[table_name]
+
+
+def clean_by_steps(cleaner: DataCleaning, table_name: str, df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Clean the table as before the RowFilter: the rows rejected by each step are dropped (and the DataFrame copied)
+    before the next step.
+    '''
+    for step in cleaning_steps(cleaner, table_name):
+        rows = RowFilter(df)
+        step(rows)
+        df = rows.apply()
+    return cleaner.cast_to_schema(df, TABLE_SCHEMAS.get(TARGET_TABLES.get(table_name), {}))
+
+
+CLEANERS: Dict[str, str] = {
+    'users': 'clean_user_data',
+    'cards': 'clean_card_data',
+    'stores': 'called_clean_store_data',
+    'products': 'clean_products_data',
+    'orders': 'clean_orders_data',
+    'dates': 'clean_dates_data',
+}
+
+
+@pytest.mark.parametrize('table_name', list(CLEANERS))
+def test_row_filter_matches_drop_by_step(table_name):
+    '''
+    The data cleanser of each table, cleaning the rows through a single keep-mask, returns the same rows and values
+    as dropping the rows rejected by each step in turn.
+    '''
+    cleaner = DataCleaning()
+    df = sample(table_name)
+    expected = clean_by_steps(cleaner, table_name, df.copy())
+
+    cleaned = getattr(cleaner, CLEANERS[table_name])(df)
+
+    assert 0 < len(cleaned) < len(df)
+    pd.testing.assert_frame_equal(cleaned, expected)
+
+
+@pytest.mark.parametrize('table_name', list(CLEANERS))
+def test_rejection_counts_add_up(table_name):
+    '''
+    Each removed row is counted once, by the first rule rejecting it.
+    '''
+    cleaner = DataCleaning()
+    df = sample(table_name)
+    cleaned = getattr(cleaner, CLEANERS[table_name])(df)
+
+    assert sum(cleaner.rejection_counts[table_name].values()) == len(df) - len(cleaned)
@@ -0,0 +1,173 @@
+# Library imports
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Project class imports
+from main import add_staged_tasks, staged_chunks
+from pipeline import PipelineRunner
+from staging_utils import StagingArea
+
+
+DTYPE_BACKENDS = [None, 'numpy_nullable', 'pyarrow']
+
+
+def cleaned_table() -> pd.DataFrame:
+    '''
+    Returns a cleaned table, with the index of the rows kept and a column of each type produced by the cleaning.
+    '''
+    return pd.DataFrame({
+        'card_number': ['4971858637664481', None, '', 'say "hi"'],
+        'expiry_date': [date(2026, 9, 1), date(2024, 1, 1), None, date(2025, 2, 1)],
+        'sale_ts': pd.to_datetime(['2012-09-19 22:00:06', None, '2013-01-01', '2014-05-06 07:08:09.5'], format='ISO8601'),
+        'weight_in_kg': [1.6, np.nan, 0.45, 0.077],
+        'staff_numbers': pd.array([34, None, 12, 7], dtype='Int16'),
+        'product_quantity': [1, 2, 3, 4],
+        'still_available': pd.array([True, None, False, True], dtype='boolean'),
+    }, index=[3, 7, 8, 12])
+
+
+@pytest.mark.parametrize('dtype_backend', DTYPE_BACKENDS, ids=str)
+def test_stage_read_round_trip(tmp_path, dtype_backend):
+    '''
+    A staged table is read back with the same index, values and column dtypes, whatever the dtype backend.
+    '''
+    df = cleaned_table()
+    if dtype_backend is not None:
+        df = df.convert_dtypes(dtype_backend=dtype_backend)
+    staging = StagingArea(str(tmp_path))
+
+    assert staging.stage(df, 'dim_card_details', 'cleaned') is df
+    pd.testing.assert_frame_equal(staging.read('dim_card_details', 'cleaned'), df)
+    pd.testing.assert_frame_equal(staging.read('dim_card_details', 'cleaned', columns=['card_number', 'sale_ts']),
+                                  df[['card_number', 'sale_ts']])
+
+
+def test_stage_chunks_manifest(tmp_path):
+    '''
+    Each chunk is a part of the stage, listed in its manifest with its rows. The chunks are passed through.
+    '''
+    staging = StagingArea(str(tmp_path))
+    chunks = [cleaned_table().iloc[:2], cleaned_table().iloc[2:3], cleaned_table().iloc[3:]]
+
+    passed_through = list(staging.stage_chunks(iter(chunks), 'orders_table', 'extracted', source='orders_table'))
+
+    assert all(passed is chunk for passed, chunk in zip(passed_through, chunks))
+    manifest = staging.read_manifest('orders_table', 'extracted')
+    assert [part['rows'] for part in manifest['parts']] == [2, 1, 1]
+    assert manifest['rows'] == 4
+    assert manifest['source'] == 'orders_table'
+    for chunk, read_chunk in zip(chunks, staging.read_chunks('orders_table', 'extracted')):
+        pd.testing.assert_frame_equal(read_chunk, chunk)
+
+
+def test_interrupted_stage_is_not_completed(tmp_path):
+    '''
+    A stage interrupted before its last chunk keeps the previous version of the stage, and a new version of a
+    stage removes the following stages, which were produced from the previous one.
+    '''
+    staging = StagingArea(str(tmp_path))
+    staging.stage(cleaned_table(), 'dim_users', 'extracted')
+    staging.stage(cleaned_table(), 'dim_users', 'cleaned')
+
+    def failing_chunks():
+        yield cleaned_table().iloc[:1]
+        raise ConnectionError('connection lost')
+
+    with pytest.raises(ConnectionError):
+        list(staging.stage_chunks(failing_chunks(), 'dim_users', 'extracted'))
+    assert staging.read_manifest('dim_users', 'extracted')['rows'] == 4
+    assert staging.last_stage('dim_users') == 'cleaned'
+
+    staging.stage(cleaned_table().iloc[:1], 'dim_users', 'extracted')
+    assert staging.read_manifest('dim_users', 'extracted')['rows'] == 1
+    assert staging.last_stage('dim_users') == 'extracted'
+    assert sorted(path.name for path in (tmp_path / 'dim_users').iterdir()) == ['extracted']
+
+
+class Source():
+    '''
+    Source of a table counting its extractions and cleanings.
+    '''
+    def __init__(self) -> None:
+        self.extractions = 0
+        self.cleanings = 0
+
+    def extract(self) -> pd.DataFrame:
+        self.extractions += 1
+        return cleaned_table()
+
+    def extract_chunks(self):
+        self.extractions += 1
+        yield cleaned_table().iloc[:2]
+        yield cleaned_table().iloc[2:]
+
+    def clean(self, df: pd.DataFrame) -> pd.DataFrame:
+        self.cleanings += 1
+        return df[df['product_quantity'] > 1]
+
+
+class ChunkCleaner():
+    '''
+    Cleaner of the chunks of a table, with the interface of DataCleaning used by staged_chunks.
+    '''
+    @staticmethod
+    def clean_chunks(chunks, clean_function):
+        return (clean_function(chunk) for chunk in chunks)
+
+
+def run_staged_tasks(staging: StagingArea, source: Source) -> pd.DataFrame:
+    '''
+    Run the tasks of main.add_staged_tasks for a table, returning the loaded table.
+    '''
+    loaded = []
+    pipeline = PipelineRunner(max_workers=2)
+    add_staged_tasks(pipeline, staging, 'dim_products', 'products.csv', source.extract, source.clean, loaded.append)
+    pipeline.run()
+    return loaded[0]
+
+
+def test_resume_skips_completed_stages(tmp_path):
+    '''
+    With --resume, each table resumes from its last completed stage: a cleaned table is neither extracted nor cleaned
+    again, and an extracted table is only cleaned.
+    '''
+    source = Source()
+    expected = source.clean(cleaned_table())
+    source.cleanings = 0
+
+    pd.testing.assert_frame_equal(run_staged_tasks(StagingArea(str(tmp_path)), source), expected)
+    assert (source.extractions, source.cleanings) == (1, 1)
+
+    pd.testing.assert_frame_equal(run_staged_tasks(StagingArea(str(tmp_path), resume=True), source), expected)
+    assert (source.extractions, source.cleanings) == (1, 1)
+
+    StagingArea(str(tmp_path)).remove_stages('dim_products', 'cleaned')
+    pd.testing.assert_frame_equal(run_staged_tasks(StagingArea(str(tmp_path), resume=True), source), expected)
+    assert (source.extractions, source.cleanings) == (1, 2)
+
+    # Without --resume, the table is extracted again
+    pd.testing.assert_frame_equal(run_staged_tasks(StagingArea(str(tmp_path)), source), expected)
+    assert (source.extractions, source.cleanings) == (2, 3)
+
+
+def test_resume_skips_completed_stages_of_chunked_tables(tmp_path):
+    '''
+    The tables streamed in chunks resume from their last completed stage in the same way.
+    '''
+    source = Source()
+
+    def run(staging: StagingArea) -> pd.DataFrame:
+        return pd.concat(list(staged_chunks(staging, ChunkCleaner(), 'orders_table', 'orders_table', source.extract_chunks, source.clean)))
+
+    expected = run(StagingArea(str(tmp_path)))
+    assert (source.extractions, source.cleanings) == (1, 2)
+
+    pd.testing.assert_frame_equal(run(StagingArea(str(tmp_path), resume=True)), expected)
+    assert (source.extractions, source.cleanings) == (1, 2)
+
+    StagingArea(str(tmp_path)).remove_stages('orders_table', 'cleaned')
+    pd.testing.assert_frame_equal(run(StagingArea(str(tmp_path), resume=True)), expected)
+    assert (source.extractions, source.cleanings) == (1, 4)
@@ -0,0 +1,156 @@
+# Library imports
+import pandas as pd
+import pytest
+
+# Project class imports
+from data_cleaning import DataCleaning, RowFilter
+
+
+# A valid row of each table, with the columns checked by its validation rules
+VALID_ROWS = {
+    'users': {'date_of_birth': '1968-10-16', 'join_date': '1990-12-04', 'first_name': 'John', 'last_name': 'Smith',
+              'phone_number': '01632 960123'},
+    'cards': {'card_number': '4971858637664481', 'expiry_date': '09/26', 'date_payment_confirmed': '2015-11-25'},
+    'stores': {'store_code': 'CH-99475026', 'continent': 'Europe', 'opening_date': '2006-10-04', 'latitude': '51.52',
+               'longitude': '-0.13', 'staff_numbers': '34'},
+    'products': {'uuid': 'acde070d-8c4c-4f0d-9d8a-162843c10333', 'date_added': '2005-12-02'},
+    'dates': {'date_uuid': 'acde070d-8c4c-4f0d-9d8a-162843c10333'},
+}
+
+# Edge cases of the validators replaced by the validation rules: (table, column, value, kept), where kept is the
+# result of the baseline is_valid_* predicate (or filter) of the column for the value
+EDGE_CASES = [
+    # Names are valid once accents are removed
+    ('users', 'first_name', 'Émile', True),
+    ('users', 'first_name', 'Zoë', True),
+    ('users', 'first_name', 'Łukasz', True),
+    ('users', 'last_name', '王', True),
+    ('users', 'last_name', 'Ærø', True),
+    ('users', 'last_name', 'Mary-Ann', True),
+    ('users', 'last_name', 'Anna Lena', True),
+    ('users', 'last_name', "O'Brien", False),
+    ('users', 'first_name', 'Smith2', False),
+    # UK phone numbers, with an optional international code and extension
+    ('users', 'phone_number', '+44(0)1632 960123', True),
+    ('users', 'phone_number', '0044 1632 960123', True),
+    ('users', 'phone_number', '(01632) 960123', True),
+    ('users', 'phone_number', '01632 960123 x123', True),
+    ('users', 'phone_number', '01632 960123 ext.1234', True),
+    ('users', 'phone_number', '020 7946 0958 #123', True),
+    ('users', 'phone_number', '01632 960123 ext 123', False),
+    ('users', 'phone_number', '01632 960123x12345', False),
+    ('users', 'phone_number', '001-555-0123x88', False),
+    ('users', 'phone_number', '+49 30 901820', False),
+    # Dates
+    ('users', 'join_date', '1960-01-01', False),
+    ('users', 'date_of_birth', '2100-01-01', False),
+    ('cards', 'date_payment_confirmed', '2100-01-01', False),
+    # Card numbers are positive integers of 8 to 19 digits
+    ('cards', 'card_number', '12345678', True),
+    ('cards', 'card_number', '00000001', True),
+    ('cards', 'card_number', '1111111111111111111', True),
+    ('cards', 'card_number', '0000000000000000', False),
+    ('cards', 'card_number', '00000000', False),
+    ('cards', 'card_number', '1234567', False),
+    ('cards', 'card_number', '11111111111111111111', False),
+    ('cards', 'card_number', '?4971858637664481', False),
+    ('cards', 'card_number', '4971 8586', False),
+    ('cards', 'card_number', '-12345678', False),
+    # Store codes: 2 or 3 letters, then 8 letters or numbers (any further part is ignored)
+    ('stores', 'store_code', 'MUN-1234abcd', True),
+    ('stores', 'store_code', 'WEB-1388012W', True),
+    ('stores', 'store_code', 'ch-abcdefgh', True),
+    ('stores', 'store_code', 'CH-99475026-X', True),
+    ('stores', 'store_code', 'ABCD-12345678', False),
+    ('stores', 'store_code', 'C-12345678', False),
+    ('stores', 'store_code', 'C1-12345678', False),
+    ('stores', 'store_code', 'CH-9947502', False),
+    ('stores', 'store_code', 'CH-994750266', False),
+    ('stores', 'store_code', 'CH99475026', False),
+    ('stores', 'store_code', 'CH-9947_026', False),
+    # Continents, with the 'eeEurope' typo fixed
+    ('stores', 'continent', 'eeEurope', True),
+    ('stores', 'continent', 'europe', True),
+    ('stores', 'continent', 'North America', True),
+    ('stores', 'continent', 'eeAmerica', False),
+    ('stores', 'continent', 'Atlantis', False),
+    ('stores', 'opening_date', '2100-01-01', False),
+    # UUIDs, with optional extra groups
+    ('products', 'uuid', 'ACDE070D-8C4C-4F0D-9D8A-162843C10333', True),
+    ('products', 'uuid', 'acde070d-8c4c-4f0d-9d8a-162843c10333-extra', True),
+    ('products', 'uuid', 'acde070d-8c4c-4f0d-9d8a-162843c10333-ab-cd', True),
+    ('products', 'uuid', 'acde070d-8c4c-4f0d-9d8a-162843c10333-', True),
+    ('products', 'uuid', 'acde070d-8c4c-4f0d-9d8a', False),
+    ('products', 'uuid', 'acde070d-8c4c-4f0d-9d8a-162843c1033', False),
+    ('products', 'uuid', 'acde070d-8c4c-4f0d-9d8a-162843c1033_', False),
+    ('products', 'uuid', 'acde070d-8c4c-4f0d-9d8a-162843c10333-a_b', False),
+    ('products', 'uuid', 'acde070d8c4c4f0d9d8a162843c10333', False),
+    ('products', 'date_added', '2100-01-01', False),
+    ('dates', 'date_uuid', 'acde070d-8c4c-4f0d-9d8a-162843c10333-extra', True),
+    ('dates', 'date_uuid', 'acde070d-8c4c-4f0d-9d8a', False),
+]
+
+
+# dtype backends of the extracted tables (see DataExtractor.convert_dtype_backend), None for the default object columns
+DTYPE_BACKENDS = [None, 'numpy_nullable', 'pyarrow']
+
+
+@pytest.fixture(scope='module')
+def cleaner():
+    return DataCleaning()
+
+
+def rows_kept(cleaner: DataCleaning, table_name: str, df: pd.DataFrame, dtype_backend: str = None) -> list:
+    '''
+    Returns whether each row of the table, converted to the dtype backend, is kept by the validation rules of the table.
+    '''
+    if dtype_backend is not None:
+        df = df.convert_dtypes(dtype_backend=dtype_backend)
+    rows = RowFilter(df)
+    cleaner.apply_rules(rows, table_name)
+    return rows.keep.tolist()
+
+
+@pytest.mark.parametrize('dtype_backend', DTYPE_BACKENDS, ids=str)
+@pytest.mark.parametrize('table_name', list(VALID_ROWS))
+def test_valid_rows_are_kept(cleaner, table_name, dtype_backend):
+    df = pd.DataFrame([VALID_ROWS[table_name]])
+    assert rows_kept(cleaner, table_name, df, dtype_backend) == [True]
+
+
+@pytest.mark.parametrize('dtype_backend', DTYPE_BACKENDS, ids=str)
+@pytest.mark.parametrize('table_name, column_name, value, kept', EDGE_CASES,
+                         ids=[f'{table_name}.{column_name}={value}' for table_name, column_name, value, _ in EDGE_CASES])
+def test_edge_cases(cleaner, table_name, column_name, value, kept, dtype_backend):
+    '''
+    The validation rules keep or remove the edge cases as the baseline predicates did, whatever the dtype backend.
+    '''
+    df = pd.DataFrame([{**VALID_ROWS[table_name], column_name: value}])
+    assert rows_kept(cleaner, table_name, df, dtype_backend) == [kept]
+
+
+@pytest.mark.parametrize('dtype_backend', DTYPE_BACKENDS, ids=str)
+@pytest.mark.parametrize('table_name', list(VALID_ROWS))
+def test_edge_cases_in_one_table(cleaner, table_name, dtype_backend):
+    '''
+    The edge cases of a table are kept or removed in the same way when they are validated together, with nulls.
+    '''
+    cases = [(column_name, value, kept) for case_table, column_name, value, kept in EDGE_CASES if case_table == table_name]
+    df = pd.DataFrame([{**VALID_ROWS[table_name], column_name: value} for column_name, value, _ in cases]
+                      + [{**VALID_ROWS[table_name], column_name: None} for column_name in VALID_ROWS[table_name]])
+    # Null values are removed by clean_nulls, but the rules must not fail on them
+    kept = rows_kept(cleaner, table_name, df, dtype_backend)
+
+    assert kept[:len(cases)] == [kept for _, _, kept in cases]
+
+
+@pytest.mark.parametrize('dtype_backend', DTYPE_BACKENDS, ids=str)
+@pytest.mark.parametrize('table_name, column_name', [('users', 'date_of_birth'), ('users', 'join_date'), ('cards', 'date_payment_confirmed'),
+                                                      ('stores', 'opening_date'), ('products', 'date_added')])
+def test_no_valid_date(cleaner, table_name, column_name, dtype_backend):
+    '''
+    The dates which cannot be parsed are left as NaT by the date rules (and removed as nulls after the conversion),
+    even when no date of the table (e.g. of a chunk) is valid.
+    '''
+    df = pd.DataFrame([{**VALID_ROWS[table_name], column_name: 'not a date'}] * 2)
+    assert rows_kept(cleaner, table_name, df, dtype_backend) == [True, True]